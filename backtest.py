@@ -1,108 +1,434 @@
-from dataclasses import dataclass
+import heapq
+import math
+from dataclasses import dataclass, replace
+import numpy as np
 import pandas as pd
 
-from metrics import get_metrics
+from backtest_cache import backtest_cache, copy_result
+from metrics import get_metrics_from_flags, get_batch_metrics
 from config import BacktestConfig
-from utils import get_portfolio_value
-from indicators import get_signals
+from indicators import get_signal_arrays, get_signals
+from indicator_cache import IndicatorCache, indicator_cache
+from profiling import profiled
+from trade_ledger import LONG, SHORT, TradeLedger, get_bar_times, get_win_flags
 
 
-@dataclass
+@dataclass(slots=True)
 class Position:
     """
-    Represents a trading position.
+    Represents an open trading position. Closed trades are kept in a TradeLedger.
     Attributes:
         ticker (str): The ticker symbol of the asset.
         quantity (float): The quantity of the asset held in the position.
-        price (pd.Series): The entry price of the position.
+        price (float): The entry price of the position.
         sl (float): The stop-loss price.
         tp (float): The take-profit price.
-        time (pd.Series): The time the position was opened.
+        time (int): The time the position was opened, in nanoseconds since the epoch.
         is_win (bool): Indicates if the position was closed at a profit.
         type (str): The type of position ('long' or 'short').
+        bar (int): The index of the bar the position was opened on.
     """
     ticker: str
     quantity: float
     price: float
     sl: float
     tp: float
-    time: pd.Timestamp
+    time: int
     is_win: bool = None
     type: str = None
+    bar: int = None
+
+
+class TriggerIndex:
+    """
+    The open positions of one side, indexed by their exit levels. One heap holds the levels
+    that close a position when the price rises above them and another the levels that close
+    it when the price falls below them, so a bar only touches the positions it triggers.
+    Iterating yields the open positions in the order they were opened.
+    """
+
+    def __init__(self):
+        self._positions: dict[int, Position] = {}
+        self._above: list[tuple[float, int]] = []
+        self._below: list[tuple[float, int]] = []
+        self._count = 0
+
+    def add(self, position: Position, above: float, below: float) -> None:
+        """
+        Add an open position.
+        Args:
+            position (Position): The position.
+            above (float): The position is closed when the price is above this level.
+            below (float): The position is closed when the price is below this level.
+        """
+        key = self._count
+        self._count += 1
+        self._positions[key] = position
+        heapq.heappush(self._above, (above, key))
+        heapq.heappush(self._below, (-below, key))
+
+    def pop_triggered(self, high: float, low: float) -> list[Position]:
+        """
+        Remove and return the positions whose exit level the price crossed.
+        Args:
+            high (float): The highest price of the bar, checked against the levels above.
+            low (float): The lowest price of the bar, checked against the levels below.
+        Returns:
+            list[Position]: The triggered positions, in the order they were opened.
+        """
+        triggered = set()
+        # Entries of positions already closed through their other level are skipped
+        while self._above and self._above[0][0] < high:
+            key = heapq.heappop(self._above)[1]
+            if key in self._positions:
+                triggered.add(key)
+        while self._below and -self._below[0][0] > low:
+            key = heapq.heappop(self._below)[1]
+            if key in self._positions:
+                triggered.add(key)
+        return [self._positions.pop(key) for key in sorted(triggered)]
+
+    def levels(self) -> tuple[float, float]:
+        """
+        Return the nearest exit levels: no open position is closed before the price rises
+        above the first one or falls below the second. Levels of positions already closed
+        through their other level may still be returned, which only makes them tighter.
+        Returns:
+            above (float): The lowest level above, inf without open positions.
+            below (float): The highest level below, -inf without open positions.
+        """
+        if not self._positions:
+            return math.inf, -math.inf
+        return self._above[0][0], -self._below[0][0]
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __iter__(self):
+        return iter(self._positions.values())
+
+
+@profiled('prepare_signals')
+def prepare_signals(
+        data: pd.DataFrame, config: BacktestConfig, params: dict,
+        cache: IndicatorCache | None = None
+) -> pd.DataFrame:
+    """
+    Compute the trading signals a backtest runs on.
+    Args:
+        data (pd.DataFrame): The historical price data for backtesting.
+        config (BacktestConfig): Configuration for the backtest.
+        params (dict): Hyperparameters for the trading strategy.
+        cache (IndicatorCache | None): Source of raw indicator series (IndicatorCache or
+            IndicatorTable). Defaults to the shared cache if config.cache_indicators is set.
+    Returns:
+        pd.DataFrame: The price data with 'buy_signal' and 'sell_signal' columns. The price
+            columns are shared with data, not copied.
+    """
+    if cache is None and config.cache_indicators:
+        cache = indicator_cache
+
+    signals = get_signals(data, params, cache)
+    if signals['Close'].dtype != np.float64:
+        signals['Close'] = signals['Close'].astype(float)
+    return signals
+
+
+def _validate_config(config: BacktestConfig) -> None:
+    """
+    Check the engine and the execution mode of a backtest configuration.
+    Args:
+        config (BacktestConfig): Configuration for the backtest.
+    Raises:
+        ValueError: If the engine or the execution mode is unknown.
+    """
+    if config.engine not in BACKTEST_ENGINES:
+        raise ValueError(
+            f"Unknown backtest engine '{config.engine}'. Choose from {list(BACKTEST_ENGINES)}."
+        )
+    if config.execution not in EXECUTION_MODES:
+        raise ValueError(
+            f"Unknown execution mode '{config.execution}'. Choose from {list(EXECUTION_MODES)}."
+        )
+
+
+def run_backtest_on_signals(
+        signals: pd.DataFrame, config: BacktestConfig, params: dict
+) -> tuple[dict, int, int, list, float, np.ndarray]:
+    """
+    Backtest a trading strategy on data whose signals were already computed, e.g. a slice of
+    a longer series so that the indicators keep their warm-up history.
+    Args:
+        signals (pd.DataFrame): The output of prepare_signals, or a slice of it.
+        config (BacktestConfig): Configuration for the backtest.
+        params (dict): Hyperparameters for the trading strategy.
+    Returns:
+        The same tuple as run_backtest.
+    """
+    return run_backtest_on_arrays(
+        signals, signals['buy_signal'].to_numpy(dtype=bool), signals['sell_signal'].to_numpy(dtype=bool),
+        config, params
+    )
+
+
+def run_backtest_on_arrays(
+        data: pd.DataFrame, buy_signal: np.ndarray, sell_signal: np.ndarray,
+        config: BacktestConfig, params: dict
+) -> tuple[dict, int, int, list, float, np.ndarray]:
+    """
+    Backtest a trading strategy on price data and separately computed signal arrays, without
+    building a signals DataFrame. With config.cache_backtests set, a backtest whose signals,
+    execution parameters and configuration were already simulated on the same prices is
+    served from the shared BacktestCache.
+    Args:
+        data (pd.DataFrame): The price data, one row per bar.
+        buy_signal (np.ndarray): True on the bars with a buy signal.
+        sell_signal (np.ndarray): True on the bars with a sell signal.
+        config (BacktestConfig): Configuration for the backtest.
+        params (dict): Hyperparameters for the trading strategy.
+    Returns:
+        The same tuple as run_backtest.
+    """
+    _validate_config(config)
+    if not config.cache_backtests:
+        return BACKTEST_ENGINES[config.engine](data, buy_signal, sell_signal, config, params)
+
+    key = backtest_cache.key(data, buy_signal, sell_signal, config, params)
+    result = backtest_cache.get(key)
+    if result is None:
+        result = BACKTEST_ENGINES[config.engine](data, buy_signal, sell_signal, config, params)
+        backtest_cache.put(key, result)
+    return result
 
 
 def run_backtest(
-        data: pd.DataFrame,  config: BacktestConfig, params: dict
-) -> tuple[dict, int, int, list, float]:
+        data: pd.DataFrame,  config: BacktestConfig, params: dict,
+        cache: IndicatorCache | None = None
+) -> tuple[dict, int, int, list, float, np.ndarray]:
     """
     Backtest a trading strategy on historical data.
     Args:
         data (pd.DataFrame): The historical price data for backtesting.
         config (BacktestConfig): Configuration for the backtest.
         params (dict): Hyperparameters for the trading strategy.
+        cache (IndicatorCache | None): Source of raw indicator series (IndicatorCache or
+            IndicatorTable). Defaults to the shared cache if config.cache_indicators is set.
     Returns:
         metrics (dict): A dictionary containing performance metrics.
         n_long_trades (int): The number of long trades executed.
         n_short_trades (int): The number of short trades executed.
         portfolio_value (list): The portfolio value over time.
         final_capital (float): The final capital after backtesting.
+        trades (np.ndarray): The trade ledger, one TRADE_DTYPE record per trade (see trade_ledger).
+    """
+    if cache is None and config.cache_indicators:
+        cache = indicator_cache
+    buy_signal, sell_signal = get_signal_arrays(data, params, cache)
+    return run_backtest_on_arrays(data, buy_signal, sell_signal, config, params)
+
+
+def run_backtest_batch_on_signals(
+        signals_list: list[pd.DataFrame], config: BacktestConfig, params_list: list[dict]
+) -> list[tuple[dict, int, int, list, float, np.ndarray]]:
+    """
+    Backtest many parameter sets whose signals were already computed, stepping all the
+    simulations over the bars together (see _run_batch_backtest).
+    Args:
+        signals_list (list[pd.DataFrame]): The output of prepare_signals for every parameter set.
+        config (BacktestConfig): Configuration for the backtest.
+        params_list (list[dict]): Hyperparameters of every simulation.
+    Returns:
+        list[tuple]: The run_backtest tuple of every parameter set, in order.
     """
-    data = data.copy()
-    data['Close'] = data['Close'].astype(float)
+    _validate_config(config)
+    if not signals_list:
+        return []
+    if len({len(signals) for signals in signals_list}) > 1:
+        # The simulations must share their bars; run them one by one otherwise
+        return [
+            run_backtest_on_signals(signals, config, params)
+            for signals, params in zip(signals_list, params_list)
+        ]
 
+    buy_signals = np.stack([signals['buy_signal'].to_numpy(dtype=bool) for signals in signals_list])
+    sell_signals = np.stack([signals['sell_signal'].to_numpy(dtype=bool) for signals in signals_list])
+    return _run_batch_with_cache(signals_list[0], buy_signals, sell_signals, config, params_list)
+
+
+def run_backtest_batch(
+        data: pd.DataFrame, config: BacktestConfig, params_list: list[dict],
+        cache: IndicatorCache | None = None
+) -> list[tuple[dict, int, int, list, float, np.ndarray]]:
+    """
+    Backtest many parameter sets on the same data in one pass.
+    Indicators with the same windows are computed once for the whole batch, and the
+    simulations are stepped over the bars together with their state held in arrays.
+    The results are the ones the vectorized engine gives for each parameter set.
+    Args:
+        data (pd.DataFrame): The historical price data for backtesting.
+        config (BacktestConfig): Configuration for the backtest.
+        params_list (list[dict]): Hyperparameters of every simulation.
+        cache (IndicatorCache | None): Source of raw indicator series (IndicatorCache or
+            IndicatorTable). Defaults to the shared cache if config.cache_indicators is set,
+            and to a cache local to the batch otherwise.
+    Returns:
+        list[tuple]: The run_backtest tuple of every parameter set, in order.
+    """
+    if cache is None:
+        cache = indicator_cache if config.cache_indicators else IndicatorCache()
+    _validate_config(config)
+    if not params_list:
+        return []
+    signals = [get_signal_arrays(data, params, cache) for params in params_list]
+    buy_signals = np.stack([buy_signal for buy_signal, _ in signals])
+    sell_signals = np.stack([sell_signal for _, sell_signal in signals])
+    return _run_batch_with_cache(data, buy_signals, sell_signals, config, params_list)
+
+
+def _run_batch_with_cache(
+        data: pd.DataFrame, buy_signals: np.ndarray, sell_signals: np.ndarray,
+        config: BacktestConfig, params_list: list[dict]
+) -> list[tuple[dict, int, int, list, float, np.ndarray]]:
+    """
+    Run the batch engine, only on the simulations the shared BacktestCache doesn't hold when
+    config.cache_backtests is set. Simulations repeated within the batch run once.
+    Args:
+        data (pd.DataFrame): The price data shared by the simulations.
+        buy_signals (np.ndarray): Simulations x bars array of buy signals.
+        sell_signals (np.ndarray): Simulations x bars array of sell signals.
+        config (BacktestConfig): Configuration for the backtest.
+        params_list (list[dict]): Hyperparameters of every simulation.
+    Returns:
+        list[tuple]: The run_backtest tuple of every simulation, in order.
+    """
+    if not config.cache_backtests:
+        return _run_batch_backtest(data, buy_signals, sell_signals, config, params_list)
+
+    # The batch engine gives exactly the results of the vectorized engine
+    key_config = replace(config, engine='vectorized')
+    keys = [
+        backtest_cache.key(data, buy_signal, sell_signal, key_config, params)
+        for buy_signal, sell_signal, params in zip(buy_signals, sell_signals, params_list)
+    ]
+    results = [backtest_cache.get(key) for key in keys]
+    # Key -> simulations that need it, the first one is run
+    pending: dict[str, list[int]] = {}
+    for sim, result in enumerate(results):
+        if result is None:
+            pending.setdefault(keys[sim], []).append(sim)
+    if pending:
+        sims = [indices[0] for indices in pending.values()]
+        simulated = _run_batch_backtest(
+            data, buy_signals[sims], sell_signals[sims], config, [params_list[sim] for sim in sims]
+        )
+        for (key, indices), result in zip(pending.items(), simulated):
+            backtest_cache.put(key, result)
+            results[indices[0]] = result
+            for sim in indices[1:]:
+                results[sim] = copy_result(result)
+    return results
+
+
+@profiled('backtest.loop')
+def _run_loop_backtest(
+        data: pd.DataFrame, buy_signal: np.ndarray, sell_signal: np.ndarray,
+        config: BacktestConfig, params: dict
+) -> tuple[dict, int, int, list, float, np.ndarray]:
+    """
+    Loop engine: keeps open trades as Position objects and steps from event to event.
+    After every event it jumps to the next bar that can change the book: the next signal, or
+    the first bar whose price crosses the nearest exit level of an open position. The cash
+    of the bars in between is filled in one array operation, and the portfolio values are
+    marked to market from the cash and the trades like the array engines do.
+    Args:
+        data (pd.DataFrame): The price data, one row per bar.
+        buy_signal (np.ndarray): True on the bars with a buy signal.
+        sell_signal (np.ndarray): True on the bars with a sell signal.
+        config (BacktestConfig): Configuration for the backtest.
+        params (dict): Hyperparameters for the trading strategy.
+    Returns:
+        The same tuple as run_backtest.
+    """
     # Get parameters
     stop_loss = params['stop_loss']
     take_profit = params['take_profit']
     capital_fraction = params['capital_fraction']
     #n_shares = params['n_shares'] # If n_shares is needed in the future
 
-    # Get Signals
-    data = get_signals(data, params)
-
     # Initial capital and commission
     capital = float(config.initial_capital)
     commission = float(config.commission)
 
     # Initialize portfolio
-    portfolio_value = [capital]
-    active_long_positions: list[Position] = []
-    active_short_positions: list[Position] = []
+    active_long_positions = TriggerIndex()
+    active_short_positions = TriggerIndex()
 
     n_long_trades = 0
     n_short_trades = 0
-    closed_long_positions: list[Position] = []
-    closed_short_positions: list[Position] = []
+    # At most one trade per signal
+    times = get_bar_times(data)
+    trades = TradeLedger(
+        int(np.count_nonzero(buy_signal)) + int(np.count_nonzero(sell_signal)), times, commission
+    )
+
+    intrabar = config.execution == 'intrabar'
+
+    # Prices the exit levels are checked against, and plain lists for fast access per bar
+    close = data['Close'].to_numpy(dtype=float)
+    high_prices, low_prices = _trigger_prices(data, config)
+    prices = close.tolist()
+    highs = high_prices.tolist()
+    lows = low_prices.tolist()
+    opens = data['Open'].to_numpy(dtype=float).tolist() if intrabar else prices
+    buys = buy_signal.tolist()
+    sells = sell_signal.tolist()
+    n = len(prices)
+
+    # Signal bars, ending with n as a sentinel
+    signal_bars = np.flatnonzero(buy_signal | sell_signal).tolist() + [n]
+    next_signal = 0
+
+    # Cash at the end of every bar, filled up to (not including) bar filled
+    capital_path = np.empty(n)
+    filled = 0
+
+    # Nothing happens before the first signal
+    t = signal_bars[0]
 
     # Start backtesting
-    for row in data.itertuples():
-        price = row.Close
+    while t < n:
+        # The cash doesn't change between events
+        capital_path[filled:t] = capital
+        price, high, low, bar_open = prices[t], highs[t], lows[t], opens[t]
         # ---- LONG ACTIVE ORDERS
-        for position in active_long_positions.copy():
-            # Stop Loss or take profit Check
-            if price > position.tp or price < position.sl:
-                # Add profits / losses to capital
-                capital += price * position.quantity * (1-commission)
-                # Register exit price and if it was a win
-                position.is_win = price > position.price  # True if we closed with profit
-                # Remove position from active positions and add to closed positions
-                active_long_positions.remove(position)
-                closed_long_positions.append(position)
+        # Stop Loss or take profit Check: only the positions whose level was crossed come back
+        for position in active_long_positions.pop_triggered(high, low):
+            exit_price = price
+            if intrabar:
+                exit_price = float(_intrabar_fill(True, bar_open, high, low, position.sl, position.tp))
+            # Add profits / losses to capital
+            capital += exit_price * position.quantity * (1-commission)
+            # Register exit price and if it was a win
+            position.is_win = exit_price > position.price  # True if we closed with profit
+            # Record the closed trade
+            trades.record(LONG, position.bar, t, position.price, exit_price, position.quantity, position.is_win)
 
         # ---- SHORT ACTIVE ORDERS
-        for position in active_short_positions.copy():
-            # Stop Loss or take profit Check
-            if price > position.sl or price < position.tp:
-                # Add profits / losses to capital
-                pnl = (position.price-price) * position.quantity * (1-commission)
-                capital += position.price * position.quantity + pnl
-                # Register exit price and if it was a win
-                position.is_win = price < position.price # True if we closed with profit
-                # Remove position from active positions and add to closed positions
-                active_short_positions.remove(position)
-                closed_short_positions.append(position)
+        # Stop Loss or take profit Check: only the positions whose level was crossed come back
+        for position in active_short_positions.pop_triggered(high, low):
+            exit_price = price
+            if intrabar:
+                exit_price = float(_intrabar_fill(False, bar_open, high, low, position.sl, position.tp))
+            # Add profits / losses to capital
+            pnl = (position.price-exit_price) * position.quantity * (1-commission)
+            capital += position.price * position.quantity + pnl
+            # Register exit price and if it was a win
+            position.is_win = exit_price < position.price # True if we closed with profit
+            # Record the closed trade
+            trades.record(SHORT, position.bar, t, position.price, exit_price, position.quantity, position.is_win)
 
         # ---- CHECK FOR NEW LONG ORDERS
-        if row.buy_signal:
+        if buys[t]:
             # Calculate BTC position size based on capital fraction
             quantity = (capital * capital_fraction) / price
             #quantity = n_shares # If n_shares is needed in the future
@@ -113,19 +439,20 @@ def run_backtest(
                 capital -= cost
                 # Add position to portfolio
                 pos = Position(
-                    ticker='BTCUSDT',
+                    ticker=config.ticker,
                     quantity=quantity,
                     price=price,
                     sl=price * (1-stop_loss),
                     tp=price * (1+take_profit),
-                    time=row.Datetime,
-                    type='long'
+                    time=int(times[t]),
+                    type='long',
+                    bar=t
                 )
-                active_long_positions.append(pos)
+                active_long_positions.add(pos, above=pos.tp, below=pos.sl)
                 n_long_trades += 1
 
         # ---- CHECK FOR NEW SHORT ORDERS
-        if row.sell_signal:
+        if sells[t]:
             # Calculate BTC position size based on capital fraction
             quantity = (capital*capital_fraction) / price
             #quantity = n_shares # If n_shares is needed in the future
@@ -136,40 +463,637 @@ def run_backtest(
                 capital -= cost
                 # Add position to portfolio
                 pos = Position(
-                    ticker='BTCUSDT',
+                    ticker=config.ticker,
                     quantity=quantity,
                     price=price,
                     sl=price * (1+stop_loss),
                     tp=price * (1-take_profit),
-                    time=row.Datetime,
-                    type='short'
+                    time=int(times[t]),
+                    type='short',
+                    bar=t
                 )
-                active_short_positions.append(pos)
+                active_short_positions.add(pos, above=pos.sl, below=pos.tp)
                 n_short_trades += 1
 
-        current_value = get_portfolio_value(
-            capital, active_long_positions, active_short_positions, price, commission
-        )
-        portfolio_value.append(current_value)
+        capital_path[t] = capital
+        filled = t + 1
+
+        # ---- SKIP AHEAD to the next signal or exit level crossing
+        while signal_bars[next_signal] <= t:
+            next_signal += 1
+        next_t = signal_bars[next_signal]
+        long_above, long_below = active_long_positions.levels()
+        short_above, short_below = active_short_positions.levels()
+        upper, lower = min(long_above, short_above), max(long_below, short_below)
+        if upper < math.inf or lower > -math.inf:
+            next_t = _first_touch(high_prices, low_prices, t + 1, upper, lower, next_t)
+        t = next_t
+    capital_path[filled:] = capital
 
     # Calculate the portfolio value at the end of the backtest with all active positions
-    last_price = data.iloc[-1].Close
+    last_price = prices[-1]
+    last_bar = n - 1
 
     for position in active_long_positions:
         position.is_win = last_price > position.price
         capital += last_price * position.quantity # No commsion since position isn't actualy closed
-        closed_long_positions.append(position)
-    active_long_positions = []
+        trades.record(
+            LONG, position.bar, last_bar, position.price, last_price, position.quantity,
+            position.is_win, closed=False
+        )
+    active_long_positions = TriggerIndex()
 
     for position in active_short_positions:
         position.is_win = last_price < position.price
         pnl = (position.price-last_price) * position.quantity # No commsion since position isn't actualy closed
         capital += position.price * position.quantity + pnl
-        closed_short_positions.append(position)
-    active_short_positions = []
+        trades.record(
+            SHORT, position.bar, last_bar, position.price, last_price, position.quantity,
+            position.is_win, closed=False
+        )
+    active_short_positions = TriggerIndex()
 
-    metrics = get_metrics(
-        portfolio_value, closed_long_positions, closed_short_positions
+    trades = trades.finish()
+    long_qty, long_price, long_entry, long_exit = _ledger_positions(trades, LONG, n)
+    short_qty, short_price, short_entry, short_exit = _ledger_positions(trades, SHORT, n)
+    portfolio_value = _mark_to_market(
+        float(config.initial_capital), close, capital_path,
+        long_qty, long_entry, long_exit, short_qty, short_price, short_entry, short_exit
     )
+    metrics = get_metrics_from_flags(portfolio_value, *get_win_flags(trades), config.periods_per_year)
+
+    return metrics, n_long_trades, n_short_trades, portfolio_value, capital, trades
+
+
+def _intrabar_fill(is_long: bool, bar_open, high, low, sl, tp):
+    """
+    Fill price of positions whose stop-loss or take-profit was touched inside a bar.
+    A bar touching both levels is assumed to hit the stop-loss first, and a bar that opens
+    beyond a level fills at its open. Works on floats and on NumPy arrays.
+    Args:
+        is_long (bool): Whether the positions are long.
+        bar_open, high, low: The open, high and low prices of the exit bar.
+        sl, tp: The stop-loss and take-profit levels of the positions.
+    Returns:
+        The fill prices.
+    """
+    if is_long:
+        return np.where(low < sl, np.minimum(sl, bar_open), np.maximum(tp, bar_open))
+    return np.where(high > sl, np.maximum(sl, bar_open), np.minimum(tp, bar_open))
+
+
+def _trigger_prices(data: pd.DataFrame, config: BacktestConfig) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Return the prices the exit levels are checked against for the execution mode.
+    Args:
+        data (pd.DataFrame): The price data.
+        config (BacktestConfig): Configuration for the backtest.
+    Returns:
+        high (np.ndarray): The prices checked against the levels above the entry price.
+        low (np.ndarray): The prices checked against the levels below the entry price.
+    """
+    if config.execution == 'intrabar':
+        return data['High'].to_numpy(dtype=float), data['Low'].to_numpy(dtype=float)
+    close = data['Close'].to_numpy(dtype=float)
+    return close, close
+
+
+def _first_touch(
+        high: np.ndarray, low: np.ndarray, start: int, upper: float, lower: float,
+        stop: int | None = None
+) -> int:
+    """
+    Find the first bar at or after start whose price crosses out of the (lower, upper) range.
+    The search scans growing blocks so nearby exits only touch a few bars.
+    Args:
+        high (np.ndarray): The prices checked against the upper level (High, or the close).
+        low (np.ndarray): The prices checked against the lower level (Low, or the close).
+        start (int): The first bar to check.
+        upper (float): An exit is triggered when the price is above this level.
+        lower (float): An exit is triggered when the price is below this level.
+        stop (int | None): The bar the search ends at, len(high) by default.
+    Returns:
+        int: The index of the exit bar, or stop if no bar before it crosses a level
+            (len(high): the position is never closed).
+    """
+    n = len(high) if stop is None else stop
+    block = 64
+    while start < n:
+        block_stop = min(start + block, n)
+        hits = np.flatnonzero((high[start:block_stop] > upper) | (low[start:block_stop] < lower))
+        if hits.size:
+            return start + int(hits[0])
+        start = block_stop
+        block *= 2
+    return n
+
+
+def _exit_prices(
+        is_long: bool, exit_bars, close: np.ndarray, bar_open: np.ndarray | None,
+        high: np.ndarray, low: np.ndarray, sl, tp
+):
+    """
+    Fill prices of positions at their exit bars, for an int or an array of exit bars.
+    Args:
+        is_long (bool): Whether the positions are long.
+        exit_bars: The exit bars, len(close) for positions that are never closed.
+        close (np.ndarray): The close prices.
+        bar_open (np.ndarray | None): The open prices for intrabar execution, None to fill at the close.
+        high, low (np.ndarray): The high and low prices.
+        sl, tp: The stop-loss and take-profit levels of the positions.
+    Returns:
+        The fill prices. Positions that are never closed get the last close, which is unused.
+    """
+    bars = np.minimum(exit_bars, len(close) - 1)
+    if bar_open is None:
+        return close[bars]
+    return _intrabar_fill(is_long, bar_open[bars], high[bars], low[bars], sl, tp)
+
+
+@profiled('backtest.vectorized')
+def _run_vectorized_backtest(
+        data: pd.DataFrame, buy_signal: np.ndarray, sell_signal: np.ndarray,
+        config: BacktestConfig, params: dict
+) -> tuple[dict, int, int, list, float, np.ndarray]:
+    """
+    Array engine: same trading rules as the loop engine, with positions kept in NumPy arrays.
+    The exit bar of every position is found with a vectorized search when it is opened,
+    so the loop only steps through events (signal bars and scheduled exits), the cash of
+    the bars in between is filled in bulk, and the portfolio value is marked to market by
+    _mark_to_market like the loop engine. Capital, trade counts, win flags, portfolio values
+    and metrics match the loop engine exactly.
+    Args:
+        data (pd.DataFrame): The price data, one row per bar.
+        buy_signal (np.ndarray): True on the bars with a buy signal.
+        sell_signal (np.ndarray): True on the bars with a sell signal.
+        config (BacktestConfig): Configuration for the backtest.
+        params (dict): Hyperparameters for the trading strategy.
+    Returns:
+        The same tuple as run_backtest.
+    """
+    # Get parameters
+    stop_loss = params['stop_loss']
+    take_profit = params['take_profit']
+    capital_fraction = params['capital_fraction']
+
+    close = data['Close'].to_numpy(dtype=float)
+    buy_signal = np.asarray(buy_signal, dtype=bool)
+    sell_signal = np.asarray(sell_signal, dtype=bool)
+    n = len(close)
+
+    # Initial capital and commission
+    capital = float(config.initial_capital)
+    commission = float(config.commission)
+
+    # Array-backed position books, at most one position per signal bar
+    long_qty = np.zeros(int(buy_signal.sum()))
+    long_price = np.zeros_like(long_qty)
+    long_entry = np.zeros(len(long_qty), dtype=np.int64)
+    long_exit = np.zeros(len(long_qty), dtype=np.int64)
+    long_exit_price = np.zeros_like(long_qty)
+    long_is_win = np.zeros(len(long_qty), dtype=bool)
+
+    short_qty = np.zeros(int(sell_signal.sum()))
+    short_price = np.zeros_like(short_qty)
+    short_entry = np.zeros(len(short_qty), dtype=np.int64)
+    short_exit = np.zeros(len(short_qty), dtype=np.int64)
+    short_exit_price = np.zeros_like(short_qty)
+    short_is_win = np.zeros(len(short_qty), dtype=bool)
+
+    # Prices the exit levels are checked against, and the open prices intrabar fills need
+    high, low = _trigger_prices(data, config)
+    bar_open = data['Open'].to_numpy(dtype=float) if config.execution == 'intrabar' else None
+
+    # Exit bar -> slots closing on that bar, in the order they were opened
+    long_exits: dict[int, list[int]] = {}
+    short_exits: dict[int, list[int]] = {}
+
+    n_long_trades = 0
+    n_short_trades = 0
+    capital_path = np.empty(n)
+
+    prices = close.tolist()
+    buys = buy_signal.tolist()
+    sells = sell_signal.tolist()
+
+    # Signal bars ending with n as a sentinel, and a heap of the bars with scheduled exits
+    signal_bars = np.flatnonzero(buy_signal | sell_signal).tolist() + [n]
+    next_signal = 0
+    exit_queue: list[int] = []
+    filled = 0
+
+    # Start backtesting
+    while True:
+        t = signal_bars[next_signal]
+        if exit_queue and exit_queue[0] < t:
+            t = exit_queue[0]
+        if t >= n:
+            break
+        while exit_queue and exit_queue[0] == t:
+            heapq.heappop(exit_queue)
+        if signal_bars[next_signal] == t:
+            next_signal += 1
+        # The cash doesn't change between events
+        capital_path[filled:t] = capital
+        price = prices[t]
+        # ---- LONG ACTIVE ORDERS
+        for k in long_exits.pop(t, ()):
+            capital += long_exit_price[k] * long_qty[k] * (1-commission)
+            long_is_win[k] = long_exit_price[k] > long_price[k]
+
+        # ---- SHORT ACTIVE ORDERS
+        for k in short_exits.pop(t, ()):
+            pnl = (short_price[k]-short_exit_price[k]) * short_qty[k] * (1-commission)
+            capital += short_price[k] * short_qty[k] + pnl
+            short_is_win[k] = short_exit_price[k] < short_price[k]
+
+        # ---- CHECK FOR NEW LONG ORDERS
+        if buys[t]:
+            quantity = (capital * capital_fraction) / price
+            cost = quantity * price * (1+commission)
+            if capital >= cost:
+                capital -= cost
+                k = n_long_trades
+                sl, tp = price * (1-stop_loss), price * (1+take_profit)
+                exit_bar = _first_touch(high, low, t + 1, tp, sl)
+                long_exit_price[k] = _exit_prices(True, exit_bar, close, bar_open, high, low, sl, tp)
+                long_qty[k], long_price[k] = quantity, price
+                long_entry[k], long_exit[k] = t, exit_bar
+                _schedule_exit(long_exits, exit_queue, exit_bar, k, n)
+                n_long_trades += 1
+
+        # ---- CHECK FOR NEW SHORT ORDERS
+        if sells[t]:
+            quantity = (capital*capital_fraction) / price
+            cost = quantity * price * (1+commission)
+            if capital >= cost:
+                capital -= cost
+                k = n_short_trades
+                sl, tp = price * (1+stop_loss), price * (1-take_profit)
+                exit_bar = _first_touch(high, low, t + 1, sl, tp)
+                short_exit_price[k] = _exit_prices(False, exit_bar, close, bar_open, high, low, sl, tp)
+                short_qty[k], short_price[k] = quantity, price
+                short_entry[k], short_exit[k] = t, exit_bar
+                _schedule_exit(short_exits, exit_queue, exit_bar, k, n)
+                n_short_trades += 1
+
+        capital_path[t] = capital
+        filled = t + 1
+    capital_path[filled:] = capital
+
+    portfolio_value = _mark_to_market(
+        float(config.initial_capital), close, capital_path,
+        long_qty[:n_long_trades], long_entry[:n_long_trades], long_exit[:n_long_trades],
+        short_qty[:n_short_trades], short_price[:n_short_trades],
+        short_entry[:n_short_trades], short_exit[:n_short_trades]
+    )
+
+    # Calculate the portfolio value at the end of the backtest with all active positions
+    last_price = prices[-1]
+
+    for k in long_exits.pop(n, ()):
+        long_is_win[k] = last_price > long_price[k]
+        capital += last_price * long_qty[k] # No commsion since position isn't actualy closed
+
+    for k in short_exits.pop(n, ()):
+        short_is_win[k] = last_price < short_price[k]
+        pnl = (short_price[k]-last_price) * short_qty[k] # No commsion since position isn't actualy closed
+        capital += short_price[k] * short_qty[k] + pnl
+
+    trades = TradeLedger(n_long_trades + n_short_trades, get_bar_times(data), commission)
+    _record_trades(
+        trades, LONG, close, long_qty[:n_long_trades], long_price[:n_long_trades], long_entry[:n_long_trades],
+        long_exit[:n_long_trades], long_exit_price[:n_long_trades], long_is_win[:n_long_trades]
+    )
+    _record_trades(
+        trades, SHORT, close, short_qty[:n_short_trades], short_price[:n_short_trades], short_entry[:n_short_trades],
+        short_exit[:n_short_trades], short_exit_price[:n_short_trades], short_is_win[:n_short_trades]
+    )
+    trades = trades.finish()
+
+    metrics = get_metrics_from_flags(
+        portfolio_value, long_is_win[:n_long_trades], short_is_win[:n_short_trades],
+        config.periods_per_year
+    )
+
+    return metrics, n_long_trades, n_short_trades, portfolio_value, float(capital), trades
+
+
+def _schedule_exit(exits: dict, exit_queue: list, exit_bar: int, slot, n: int) -> None:
+    """
+    Schedule the exit of a position of an array engine.
+    Args:
+        exits (dict): Exit bar -> slots closing on that bar, of one side.
+        exit_queue (list): Heap of the bars with scheduled exits, shared by both sides.
+        exit_bar (int): The exit bar, n if the position is never closed.
+        slot: The slot of the position in its book.
+        n (int): The number of bars.
+    """
+    if exit_bar not in exits:
+        exits[exit_bar] = []
+        if exit_bar < n:
+            heapq.heappush(exit_queue, exit_bar)
+    exits[exit_bar].append(slot)
+
+
+def _record_trades(
+        trades: TradeLedger, side: int, close: np.ndarray, qty: np.ndarray, price: np.ndarray,
+        entry: np.ndarray, exit: np.ndarray, exit_price: np.ndarray, is_win: np.ndarray
+) -> None:
+    """
+    Record the positions of one side of an array engine in a trade ledger.
+    Args:
+        trades (TradeLedger): The ledger.
+        side (int): LONG or SHORT.
+        close (np.ndarray): The close prices. Positions with exit bar len(close) were still open
+            at the end and are recorded at the last bar and close.
+        qty, price, entry, exit, exit_price, is_win (np.ndarray): Quantity, entry price, entry
+            bar, exit bar, exit price and win flag of every position.
+    """
+    n = len(close)
+    closed = exit < n
+    trades.record_many(
+        side, entry, np.where(closed, exit, n - 1), price, np.where(closed, exit_price, close[-1]),
+        qty, is_win, closed
+    )
+
+
+def _ledger_positions(
+        trades: np.ndarray, side: int, n: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Return the positions of one side of a finished trade ledger in the order they were opened.
+    Args:
+        trades (np.ndarray): The finished ledger.
+        side (int): LONG or SHORT.
+        n (int): The number of bars.
+    Returns:
+        qty, price, entry, exit (np.ndarray): Quantity, entry price, entry bar and exit bar of
+            every position, exit bar n if it was never closed.
+    """
+    positions = trades[trades['side'] == side]
+    # A side opens at most one position per bar
+    positions = positions[np.argsort(positions['entry_bar'], kind='stable')]
+    exit = np.where(positions['closed'], positions['exit_bar'], n)
+    return positions['quantity'], positions['entry_price'], positions['entry_bar'], exit
+
+
+@profiled('backtest.mark_to_market')
+def _mark_to_market(
+        initial_capital: float, close: np.ndarray, capital_path: np.ndarray,
+        long_qty: np.ndarray, long_entry: np.ndarray, long_exit: np.ndarray,
+        short_qty: np.ndarray, short_price: np.ndarray,
+        short_entry: np.ndarray, short_exit: np.ndarray
+) -> list:
+    """
+    Build the portfolio value series of an engine from its cash and its positions.
+    Every bar sums the open positions in the order they were opened, value = (cash + longs)
+    + shorts, so the values are bit-for-bit those of walking the open positions on every bar,
+    whichever engine produced them. Each position adds one array operation over the bars it
+    is open: from its entry bar up to, not including, its exit bar.
+    Args:
+        initial_capital (float): The capital before the first bar.
+        close (np.ndarray): The close prices.
+        capital_path (np.ndarray): The cash held at the end of each bar.
+        long_qty, long_entry, long_exit (np.ndarray): Quantity, entry and exit bar of long
+            positions, in the order they were opened (exit bar len(close) if never closed).
+        short_qty, short_price, short_entry, short_exit (np.ndarray): The same for short positions,
+            plus their entry price.
+    Returns:
+        list: The portfolio value over time, starting with the initial capital.
+    """
+    long_value = np.zeros(len(close))
+    for quantity, entry, exit in zip(long_qty.tolist(), long_entry.tolist(), long_exit.tolist()):
+        long_value[entry:exit] += quantity * close[entry:exit]
+    short_value = np.zeros(len(close))
+    for quantity, price, entry, exit in zip(
+            short_qty.tolist(), short_price.tolist(), short_entry.tolist(), short_exit.tolist()
+    ):
+        short_value[entry:exit] += quantity * (price - close[entry:exit]) + price * quantity
+
+    value = capital_path + long_value + short_value
+    return [initial_capital] + value.tolist()
+
+
+def _first_touch_many(
+        high: np.ndarray, low: np.ndarray, start: int, upper: np.ndarray, lower: np.ndarray
+) -> np.ndarray:
+    """
+    Vectorized _first_touch for several positions opened on the same bar.
+    Args:
+        high (np.ndarray): The prices checked against the upper levels (High, or the close).
+        low (np.ndarray): The prices checked against the lower levels (Low, or the close).
+        start (int): The first bar to check.
+        upper (np.ndarray): The upper exit level of every position.
+        lower (np.ndarray): The lower exit level of every position.
+    Returns:
+        np.ndarray: The exit bar of every position, len(high) if it is never closed.
+    """
+    n = len(high)
+    exit_bars = np.full(len(upper), n, dtype=np.int64)
+    pending = np.arange(len(upper))
+    block = 64
+    while start < n and pending.size:
+        block_stop = min(start + block, n)
+        hits = (high[start:block_stop] > upper[pending, None]) | (low[start:block_stop] < lower[pending, None])
+        found = hits.any(axis=1)
+        exit_bars[pending[found]] = start + hits[found].argmax(axis=1)
+        pending = pending[~found]
+        start = block_stop
+        block *= 2
+    return exit_bars
+
+
+@profiled('backtest.batch')
+def _run_batch_backtest(
+        data: pd.DataFrame, buy_signals: np.ndarray, sell_signals: np.ndarray,
+        config: BacktestConfig, params_list: list[dict]
+) -> list[tuple[dict, int, int, list, float, np.ndarray]]:
+    """
+    Batch engine: the vectorized engine run for many simulations at once. Capital is an
+    array with one entry per simulation and every event updates all of them together; the
+    positions of all simulations share one book, and exits scheduled on a bar are applied
+    in the order the positions were opened, so each simulation gets exactly the results
+    of the vectorized engine.
+    Args:
+        data (pd.DataFrame): The price data shared by the simulations.
+        buy_signals (np.ndarray): Simulations x bars array of buy signals.
+        sell_signals (np.ndarray): Simulations x bars array of sell signals.
+        config (BacktestConfig): Configuration for the backtest.
+        params_list (list[dict]): Hyperparameters of every simulation.
+    Returns:
+        list[tuple]: The run_backtest tuple of every simulation, in order.
+    """
+    n_sims, n = buy_signals.shape
+    stop_loss = np.array([params['stop_loss'] for params in params_list], dtype=float)
+    take_profit = np.array([params['take_profit'] for params in params_list], dtype=float)
+    capital_fraction = np.array([params['capital_fraction'] for params in params_list], dtype=float)
+
+    close = data['Close'].to_numpy(dtype=float)
+    high, low = _trigger_prices(data, config)
+    bar_open = data['Open'].to_numpy(dtype=float) if config.execution == 'intrabar' else None
+
+    # Initial capital and commission
+    capital = np.full(n_sims, float(config.initial_capital))
+    commission = float(config.commission)
+
+    # Shared position books, at most one position per signal
+    books = {}
+    for side, signals in (('long', buy_signals), ('short', sell_signals)):
+        size = int(signals.sum())
+        books[side] = {
+            'sim': np.zeros(size, dtype=np.int64),
+            'qty': np.zeros(size),
+            'price': np.zeros(size),
+            'entry': np.zeros(size, dtype=np.int64),
+            'exit': np.zeros(size, dtype=np.int64),
+            'exit_price': np.zeros(size),
+            'is_win': np.zeros(size, dtype=bool),
+            'count': 0,
+            # Exit bar -> slots closing on that bar, in the order they were opened
+            'exits': {},
+        }
+    long_book, short_book = books['long'], books['short']
+
+    capital_path = np.empty((n_sims, n))
+    prices = close.tolist()
+    any_buy_mask = buy_signals.any(axis=0)
+    any_sell_mask = sell_signals.any(axis=0)
+    any_buy = any_buy_mask.tolist()
+    any_sell = any_sell_mask.tolist()
+
+    def open_positions(book: dict, signals: np.ndarray, t: int, sl: np.ndarray, tp: np.ndarray):
+        is_long = book is long_book
+        price = prices[t]
+        sims = np.flatnonzero(signals[:, t])
+        quantity = (capital[sims] * capital_fraction[sims]) / price
+        cost = quantity * price * (1+commission)
+        enough = capital[sims] >= cost
+        sims, quantity, cost = sims[enough], quantity[enough], cost[enough]
+        if not sims.size:
+            return
+        capital[sims] -= cost
+        sl, tp = sl[sims], tp[sims]
+        upper, lower = (tp, sl) if is_long else (sl, tp)
+        exit_bars = _first_touch_many(high, low, t + 1, upper, lower)
+        book['exit_price'][book['count']:book['count'] + sims.size] = _exit_prices(
+            is_long, exit_bars, close, bar_open, high, low, sl, tp
+        )
+        slots = np.arange(book['count'], book['count'] + sims.size)
+        book['count'] += sims.size
+        book['sim'][slots], book['qty'][slots], book['price'][slots] = sims, quantity, price
+        book['entry'][slots], book['exit'][slots] = t, exit_bars
+        for slot, exit_bar in zip(slots.tolist(), exit_bars.tolist()):
+            _schedule_exit(book['exits'], exit_queue, exit_bar, slot, n)
+
+    # Bars where any simulation has a signal, ending with n as a sentinel, and a heap of
+    # the bars with scheduled exits
+    signal_bars = np.flatnonzero(any_buy_mask | any_sell_mask).tolist() + [n]
+    next_signal = 0
+    exit_queue: list[int] = []
+    filled = 0
+
+    # Start backtesting
+    while True:
+        t = signal_bars[next_signal]
+        if exit_queue and exit_queue[0] < t:
+            t = exit_queue[0]
+        if t >= n:
+            break
+        while exit_queue and exit_queue[0] == t:
+            heapq.heappop(exit_queue)
+        if signal_bars[next_signal] == t:
+            next_signal += 1
+        # The cash doesn't change between events
+        capital_path[:, filled:t] = capital[:, None]
+        price = prices[t]
+        # ---- LONG ACTIVE ORDERS
+        slots = long_book['exits'].pop(t, None)
+        if slots is not None:
+            # np.add.at adds repeated simulations one after another, in slot order
+            exit_price = long_book['exit_price'][slots]
+            np.add.at(capital, long_book['sim'][slots], exit_price * long_book['qty'][slots] * (1-commission))
+            long_book['is_win'][slots] = exit_price > long_book['price'][slots]
+
+        # ---- SHORT ACTIVE ORDERS
+        slots = short_book['exits'].pop(t, None)
+        if slots is not None:
+            entry_price, quantity = short_book['price'][slots], short_book['qty'][slots]
+            exit_price = short_book['exit_price'][slots]
+            pnl = (entry_price-exit_price) * quantity * (1-commission)
+            np.add.at(capital, short_book['sim'][slots], entry_price * quantity + pnl)
+            short_book['is_win'][slots] = exit_price < entry_price
+
+        # ---- CHECK FOR NEW LONG ORDERS
+        if any_buy[t]:
+            open_positions(long_book, buy_signals, t, price * (1-stop_loss), price * (1+take_profit))
+
+        # ---- CHECK FOR NEW SHORT ORDERS
+        if any_sell[t]:
+            open_positions(short_book, sell_signals, t, price * (1+stop_loss), price * (1-take_profit))
+
+        capital_path[:, t] = capital
+        filled = t + 1
+    capital_path[:, filled:] = capital[:, None]
+
+    # Close the remaining positions at the last price, without commission
+    last_price = prices[-1]
+    slots = long_book['exits'].pop(n, None)
+    if slots is not None:
+        long_book['is_win'][slots] = last_price > long_book['price'][slots]
+        np.add.at(capital, long_book['sim'][slots], last_price * long_book['qty'][slots])
+    slots = short_book['exits'].pop(n, None)
+    if slots is not None:
+        entry_price, quantity = short_book['price'][slots], short_book['qty'][slots]
+        short_book['is_win'][slots] = last_price < entry_price
+        np.add.at(capital, short_book['sim'][slots], entry_price * quantity + (entry_price-last_price) * quantity)
+
+    # Split the shared books back into one set of positions per simulation
+    for book in books.values():
+        count = book['count']
+        order = np.argsort(book['sim'][:count], kind='stable')
+        bounds = np.searchsorted(book['sim'][:count][order], np.arange(n_sims + 1))
+        book['by_sim'] = [order[bounds[sim]:bounds[sim + 1]] for sim in range(n_sims)]
+
+    times = get_bar_times(data)
+    portfolio_values = []
+    ledgers = []
+    for sim in range(n_sims):
+        longs, shorts = long_book['by_sim'][sim], short_book['by_sim'][sim]
+        portfolio_values.append(_mark_to_market(
+            float(config.initial_capital), close, capital_path[sim],
+            long_book['qty'][longs], long_book['entry'][longs], long_book['exit'][longs],
+            short_book['qty'][shorts], short_book['price'][shorts],
+            short_book['entry'][shorts], short_book['exit'][shorts]
+        ))
+        trades = TradeLedger(len(longs) + len(shorts), times, commission)
+        for side, book, slots in ((LONG, long_book, longs), (SHORT, short_book, shorts)):
+            _record_trades(
+                trades, side, close, book['qty'][slots], book['price'][slots], book['entry'][slots],
+                book['exit'][slots], book['exit_price'][slots], book['is_win'][slots]
+            )
+        ledgers.append(trades.finish())
+
+    metrics = get_batch_metrics(
+        np.array(portfolio_values),
+        [long_book['is_win'][longs] for longs in long_book['by_sim']],
+        [short_book['is_win'][shorts] for shorts in short_book['by_sim']],
+        config.periods_per_year
+    )
+    return [
+        (
+            {name: float(values[sim]) for name, values in metrics.items()},
+            len(long_book['by_sim'][sim]), len(short_book['by_sim'][sim]),
+            portfolio_values[sim], float(capital[sim]), ledgers[sim]
+        )
+        for sim in range(n_sims)
+    ]
+
+
+BACKTEST_ENGINES = {
+    'loop': _run_loop_backtest,
+    'vectorized': _run_vectorized_backtest,
+}
 
-    return metrics, n_long_trades, n_short_trades, portfolio_value, capital
\ No newline at end of file
+# How stop-losses and take-profits are checked and filled, see BacktestConfig.execution
+EXECUTION_MODES = ('close', 'intrabar')
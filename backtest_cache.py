@@ -0,0 +1,176 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import asdict
+
+import numpy as np
+import pandas as pd
+
+from config import BacktestConfig
+
+# The strategy parameters the simulation depends on besides the signals
+EXECUTION_PARAMS = ('stop_loss', 'take_profit', 'capital_fraction')
+
+
+class BacktestCache:
+    """
+    Bounded LRU cache of backtest results keyed by what the simulation actually depends on:
+    the price data, the final buy and sell signal masks, the execution parameters and the
+    backtest configuration. Parameter sets that differ only in indicator thresholds or
+    windows but give the same signals share one simulation. The cache is safe to share
+    between threads.
+    Attributes:
+        max_bytes (int): The memory budget of the stored results. Every result holds a
+            portfolio value per bar (stored as a float64 array) and its trade ledger; the
+            least recently used results are evicted beyond the budget.
+        hits (int): The number of backtests served from the cache.
+        misses (int): The number of backtests that had to be simulated.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 2**20):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(
+            data: pd.DataFrame, buy_signal: np.ndarray, sell_signal: np.ndarray,
+            config: BacktestConfig, params: dict
+    ) -> str:
+        """
+        Compute the cache key of a backtest.
+        Args:
+            data (pd.DataFrame): The price data.
+            buy_signal (np.ndarray): True on the bars with a buy signal.
+            sell_signal (np.ndarray): True on the bars with a sell signal.
+            config (BacktestConfig): Configuration for the backtest.
+            params (dict): Hyperparameters for the trading strategy.
+        Returns:
+            str: A hex digest identifying the backtest.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(str(len(data)).encode())
+        # Only intrabar execution reads the open, high and low prices
+        columns = ('Close', 'High', 'Low', 'Open') if config.execution == 'intrabar' else ('Close',)
+        for column in columns:
+            digest.update(np.ascontiguousarray(data[column].to_numpy(dtype=float)).tobytes())
+        # The bar times end up in the trade ledger
+        digest.update(np.ascontiguousarray(data['Datetime'].to_numpy()).tobytes())
+        digest.update(np.packbits(buy_signal).tobytes())
+        digest.update(np.packbits(sell_signal).tobytes())
+        digest.update(json.dumps(
+            [asdict(config), [params[name] for name in EXECUTION_PARAMS]], sort_keys=True, default=str
+        ).encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> tuple | None:
+        """
+        Look a backtest up.
+        Args:
+            key (str): The key of the backtest.
+        Returns:
+            tuple | None: A copy of the cached run_backtest tuple, or None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        metrics, n_long_trades, n_short_trades, portfolio_value, final_capital, trades, is_list, _ = entry
+        portfolio_value = portfolio_value.tolist() if is_list else portfolio_value.copy()
+        return dict(metrics), n_long_trades, n_short_trades, portfolio_value, final_capital, trades.copy()
+
+    def put(self, key: str, result: tuple) -> None:
+        """
+        Store the result of a backtest. Results larger than the whole budget are not stored.
+        Args:
+            key (str): The key of the backtest.
+            result (tuple): The run_backtest tuple.
+        """
+        metrics, n_long_trades, n_short_trades, portfolio_value, final_capital, trades = result
+        is_list = isinstance(portfolio_value, list)
+        portfolio_value = np.array(portfolio_value, dtype=float)
+        trades = trades.copy()
+        size = portfolio_value.nbytes + trades.nbytes
+        if size > self.max_bytes:
+            return
+        entry = (dict(metrics), n_long_trades, n_short_trades, portfolio_value, final_capital, trades, is_list, size)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.nbytes -= previous[-1]
+            self._entries[key] = entry
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= evicted[-1]
+
+    def stats(self) -> dict:
+        """
+        Return the hit/miss counters of the cache.
+        Returns:
+            dict: Hits, misses, hit rate, and the number and size in bytes of the stored entries.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'nbytes': self.nbytes
+            }
+
+    def clear(self) -> None:
+        """
+        Remove every entry and reset the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.nbytes = 0
+
+
+def copy_result(result: tuple) -> tuple:
+    """
+    Copy the mutable parts of a run_backtest tuple, so callers can't alter cached results
+    (e.g. walk_forward shifts the trade bars in place).
+    Args:
+        result (tuple): The run_backtest tuple.
+    Returns:
+        tuple: The copy.
+    """
+    metrics, n_long_trades, n_short_trades, portfolio_value, final_capital, trades = result
+    return dict(metrics), n_long_trades, n_short_trades, portfolio_value.copy(), final_capital, trades.copy()
+
+
+def get_stats_since(before: dict, after: dict) -> dict:
+    """
+    Return the cache statistics of the lookups made between two stats() snapshots, e.g.
+    the hit rate of one study on a cache shared by several.
+    Args:
+        before (dict): The stats() at the start.
+        after (dict): The stats() at the end.
+    Returns:
+        dict: Hits, misses and hit rate in between, and the entries and bytes at the end.
+    """
+    hits = after['hits'] - before['hits']
+    misses = after['misses'] - before['misses']
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+        'entries': after['entries'],
+        'nbytes': after['nbytes']
+    }
+
+
+# Shared cache used by the backtests when BacktestConfig.cache_backtests is enabled
+backtest_cache = BacktestCache()
@@ -0,0 +1,130 @@
+import csv
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import replace
+
+import pandas as pd
+
+from config import BacktestConfig
+from backtest import run_backtest
+from data_loader import load_price_data
+
+# Binance CSV files are named like 'Binance_BTCUSDT_1h.csv'
+DATASET_PATTERN = re.compile(r'^Binance_(?P<symbol>[A-Z0-9]+)_(?P<timeframe>\w+)\.csv$')
+TIMEFRAME_ALIASES = {'minute': '1m', 'hour': '1h', 'd': '1d'}
+PERIODS_PER_YEAR = {'m': 365*24*60, 'h': 365*24, 'd': 365, 'w': 52}
+RESULT_COLUMNS = [
+    'symbol', 'timeframe', 'bars', 'Sharpe', 'Sortino', 'Maximum Drawdown', 'Calmar',
+    'Win rate on long positions', 'Win rate on short positions', 'General win rate',
+    'n_long_trades', 'n_short_trades', 'final_capital', 'error'
+]
+
+
+def get_periods_per_year(timeframe: str) -> int:
+    """
+    Return the number of bars in a year for a timeframe such as '15m', '1h' or '1d'.
+    Args:
+        timeframe (str): The bar timeframe.
+    Returns:
+        int: The number of bars per year.
+    """
+    timeframe = TIMEFRAME_ALIASES.get(timeframe, timeframe)
+    match = re.fullmatch(r'(\d*)([mhdw])', timeframe)
+    if match is None:
+        raise ValueError(f"Unknown timeframe '{timeframe}'.")
+    return PERIODS_PER_YEAR[match.group(2)] // int(match.group(1) or 1)
+
+
+def find_datasets(
+        directory: str, symbols: list[str] | None = None, timeframes: list[str] | None = None
+) -> list[tuple[str, str, str]]:
+    """
+    Find the Binance CSV files of a directory, optionally filtered by symbol and timeframe.
+    Args:
+        directory (str): The directory holding 'Binance_<SYMBOL>_<timeframe>.csv' files.
+        symbols (list[str] | None): The symbols to keep, e.g. ['BTCUSDT', 'ETHUSDT']. None keeps all.
+        timeframes (list[str] | None): The timeframes to keep, e.g. ['1h', '15m']. None keeps all.
+    Returns:
+        list[tuple[str, str, str]]: (symbol, timeframe, path) for every matching file.
+    """
+    datasets = []
+    for file_name in sorted(os.listdir(directory)):
+        match = DATASET_PATTERN.match(file_name)
+        if match is None:
+            continue
+        symbol, timeframe = match.group('symbol'), match.group('timeframe')
+        if symbols is not None and symbol not in symbols:
+            continue
+        if timeframes is not None and timeframe not in timeframes:
+            continue
+        datasets.append((symbol, timeframe, os.path.join(directory, file_name)))
+    return datasets
+
+
+def _backtest_dataset(
+        symbol: str, timeframe: str, path: str, config: BacktestConfig, params: dict
+) -> dict:
+    """
+    Load one dataset and backtest it, keeping only its summary row.
+    Args:
+        symbol (str): The ticker symbol.
+        timeframe (str): The bar timeframe.
+        path (str): The path of the CSV file.
+        config (BacktestConfig): Configuration for the backtest.
+        params (dict): Hyperparameters for the trading strategy.
+    Returns:
+        dict: The result row of the dataset.
+    """
+    row = {'symbol': symbol, 'timeframe': timeframe}
+    try:
+        data = load_price_data(path)
+        config = replace(config, ticker=symbol, periods_per_year=get_periods_per_year(timeframe))
+        metrics, n_long_trades, n_short_trades, _, final_capital, _ = run_backtest(data, config, params)
+    except Exception as error:
+        row['error'] = f'{type(error).__name__}: {error}'
+        return row
+
+    row.update(metrics)
+    row.update({
+        'bars': len(data),
+        'n_long_trades': n_long_trades,
+        'n_short_trades': n_short_trades,
+        'final_capital': final_capital
+    })
+    return row
+
+
+def run_batch(
+        datasets: list[tuple[str, str, str]], config: BacktestConfig, params: dict,
+        results_path: str, n_workers: int | None = None
+) -> pd.DataFrame:
+    """
+    Backtest the strategy on many symbols and timeframes in parallel.
+    Each dataset runs in a worker process and only its metrics row comes back; rows are
+    appended to the results CSV as soon as they finish, so a finished dataset is never
+    kept in memory and an interrupted batch keeps what it already computed.
+    Args:
+        datasets (list[tuple[str, str, str]]): (symbol, timeframe, path) of every dataset,
+            as returned by find_datasets.
+        config (BacktestConfig): Configuration for the backtest. The ticker and the
+            annualization are set per dataset.
+        params (dict): Hyperparameters for the trading strategy.
+        results_path (str): The CSV file the result rows are written to.
+        n_workers (int | None): The number of worker processes. None uses all cores.
+    Returns:
+        pd.DataFrame: The results table, one row per dataset.
+    """
+    with open(results_path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=RESULT_COLUMNS)
+        writer.writeheader()
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            futures = [
+                executor.submit(_backtest_dataset, symbol, timeframe, path, config, params)
+                for symbol, timeframe, path in datasets
+            ]
+            for future in as_completed(futures):
+                writer.writerow(future.result())
+                file.flush()
+
+    return pd.read_csv(results_path)
@@ -0,0 +1,264 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from typing import Callable
+
+import numpy as np
+import optuna
+import pandas as pd
+
+from backtest import prepare_signals, run_backtest
+from best_params import get_best_params
+from config import BacktestConfig, OptimizationConfig
+from indicators import get_signals
+from metrics import get_metrics_from_flags
+from optimizer import cross_validated_objective, optimize_hyperparameters
+from trade_ledger import get_win_flags
+
+
+def make_synthetic_data(
+        n_bars: int, seed: int = 0, start: str = '2018-01-01', freq: str = 'h',
+        volatility: float = 0.01
+) -> pd.DataFrame:
+    """
+    Generate a synthetic OHLCV series following a geometric random walk, so the hot paths
+    can be timed on any length without downloading data.
+    Args:
+        n_bars (int): The number of bars.
+        seed (int): The random seed.
+        start (str): The time of the first bar.
+        freq (str): The bar frequency, as a pandas offset alias.
+        volatility (float): The standard deviation of the log return of a bar.
+    Returns:
+        pd.DataFrame: The price data with 'Datetime', 'Open', 'High', 'Low', 'Close' and
+            'Volume' columns, shaped like the cleaned Binance data.
+    """
+    rng = np.random.default_rng(seed)
+    close = 30_000 * np.exp(np.cumsum(rng.normal(0, volatility, n_bars)))
+    bar_open = np.concatenate(([close[0]], close[:-1]))
+    # Wicks reach beyond both the open and the close
+    high = np.maximum(bar_open, close) * (1 + np.abs(rng.normal(0, volatility / 2, n_bars)))
+    low = np.minimum(bar_open, close) * (1 - np.abs(rng.normal(0, volatility / 2, n_bars)))
+    return pd.DataFrame({
+        'Datetime': pd.date_range(start, periods=n_bars, freq=freq),
+        'Open': bar_open,
+        'High': high,
+        'Low': low,
+        'Close': close,
+        'Volume': rng.lognormal(3, 1, n_bars),
+    })
+
+
+def time_stage(function: Callable, repeat: int = 3) -> dict:
+    """
+    Time a function and measure its peak memory. The timed runs are separate from the
+    memory run, since tracemalloc slows the traced code down.
+    Args:
+        function (Callable): The function to time, called without arguments.
+        repeat (int): The number of timed runs.
+    Returns:
+        dict: The best and mean wall time in seconds and the peak traced memory in MB.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'seconds': min(times),
+        'mean_seconds': float(np.mean(times)),
+        'peak_memory_mb': peak / 2**20,
+    }
+
+
+def _git_commit() -> str | None:
+    """
+    Return the commit the benchmark runs on.
+    Returns:
+        str | None: The short hash of HEAD, or None outside a git checkout.
+    """
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def run_benchmarks(
+        n_bars: int, backtest_config: BacktestConfig, params: dict | None = None,
+        n_trials: int = 20, n_splits: int = 3, metric: str = 'Calmar', repeat: int = 3,
+        seed: int = 0
+) -> dict:
+    """
+    Benchmark the hot paths on a synthetic series: get_signals, run_backtest, the metrics,
+    one cross_validated_objective trial and a full optimization of n_trials trials.
+    Args:
+        n_bars (int): The length of the synthetic series.
+        backtest_config (BacktestConfig): Configuration for the backtest.
+        params (dict | None): The strategy hyperparameters of the stage benchmarks.
+            Defaults to the hard-coded best parameters.
+        n_trials (int): The number of trials of the optimization benchmark. 0 skips it.
+        n_splits (int): The number of cross-validation splits of the trial benchmarks.
+        metric (str): The performance metric optimized by the trial benchmarks.
+        repeat (int): The number of timed runs of every stage.
+        seed (int): The random seed of the synthetic series.
+    Returns:
+        dict: The run metadata and, per stage, its time, throughput and peak memory.
+    """
+    if params is None:
+        params, _ = get_best_params()
+    data = make_synthetic_data(n_bars, seed)
+    signals = prepare_signals(data, backtest_config, params)
+    _, _, _, portfolio_value, _, trades = run_backtest(data, backtest_config, params)
+    long_is_win, short_is_win = get_win_flags(trades)
+
+    stages = {
+        'get_signals': lambda: get_signals(data, params),
+        'run_backtest': lambda: run_backtest(data, backtest_config, params),
+        'get_metrics': lambda: get_metrics_from_flags(
+            portfolio_value, long_is_win, short_is_win, backtest_config.periods_per_year
+        ),
+        'trial': lambda: cross_validated_objective(
+            optuna.trial.FixedTrial(params), data, backtest_config, n_splits, metric
+        ),
+    }
+
+    results = {}
+    for name, function in stages.items():
+        print(f'Benchmarking {name}...')
+        result = time_stage(function, repeat)
+        result['bars_per_second'] = n_bars / result['seconds']
+        results[name] = result
+    results['trial']['trials_per_second'] = 1 / results['trial']['seconds']
+
+    if n_trials > 0:
+        print(f'Benchmarking an optimization of {n_trials} trials...')
+        optimization_config = OptimizationConfig(
+            n_trials=n_trials, n_jobs=1, show_progress_bar=False, n_splits=n_splits
+        )
+        result = time_stage(
+            lambda: optimize_hyperparameters(data, backtest_config, optimization_config, metric),
+            repeat=1
+        )
+        result['trials_per_second'] = n_trials / result['seconds']
+        result['bars_per_second'] = n_trials * n_bars / result['seconds']
+        results['optimization'] = result
+
+    return {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'n_bars': n_bars,
+            'n_trades': len(trades),
+            'n_signals': int(signals['buy_signal'].sum() + signals['sell_signal'].sum()),
+            'engine': backtest_config.engine,
+            'execution': backtest_config.execution,
+            'n_trials': n_trials,
+            'n_splits': n_splits,
+            'repeat': repeat,
+        },
+        'stages': results,
+    }
+
+
+def save_benchmarks(results: dict, path: str) -> None:
+    """
+    Write benchmark results to a JSON file.
+    Args:
+        results (dict): The output of run_benchmarks.
+        path (str): The JSON file to write.
+    """
+    with open(path, 'w') as file:
+        json.dump(results, file, indent=2)
+
+
+def compare_benchmarks(baseline_path: str, current: str | dict) -> pd.DataFrame:
+    """
+    Compare a benchmark run with a saved one, e.g. of another commit.
+    Args:
+        baseline_path (str): The JSON results of the reference run.
+        current (str | dict): The JSON results of the run to compare, or the output of
+            run_benchmarks.
+    Returns:
+        pd.DataFrame: Per stage, the time of both runs and the speedup of the current one
+            (above 1 is faster, below 1 a regression).
+    """
+    with open(baseline_path) as file:
+        baseline = json.load(file)['stages']
+    if isinstance(current, str):
+        with open(current) as file:
+            current = json.load(file)
+    current = current['stages']
+
+    rows = []
+    for stage in baseline.keys() & current.keys():
+        rows.append({
+            'stage': stage,
+            'baseline_seconds': baseline[stage]['seconds'],
+            'current_seconds': current[stage]['seconds'],
+            'speedup': baseline[stage]['seconds'] / current[stage]['seconds'],
+            'baseline_peak_memory_mb': baseline[stage]['peak_memory_mb'],
+            'current_peak_memory_mb': current[stage]['peak_memory_mb'],
+        })
+    return pd.DataFrame(rows).set_index('stage').sort_index()
+
+
+def print_benchmarks(results: dict) -> None:
+    """
+    Print the time, throughput and peak memory of every benchmarked stage.
+    Args:
+        results (dict): The output of run_benchmarks.
+    """
+    meta = results['meta']
+    print(f"\nBenchmark on {meta['n_bars']:,} bars ({meta['engine']} engine, commit {meta['commit']})")
+    for stage, result in results['stages'].items():
+        line = (f"  {stage:<14} {result['seconds']:>10.4f} s  {result['bars_per_second']:>14,.0f} bars/s"
+                f"  {result['peak_memory_mb']:>9.1f} MB peak")
+        if 'trials_per_second' in result:
+            line += f"  {result['trials_per_second']:>8.2f} trials/s"
+        print(line)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the backtest and optimization hot paths.')
+    parser.add_argument('--bars', type=int, nargs='+', default=[10_000],
+                        help='Lengths of the synthetic series, e.g. 10000 100000 1000000.')
+    parser.add_argument('--engine', default='loop', help="The backtest engine ('loop' or 'vectorized').")
+    parser.add_argument('--execution', default='close', help="The execution mode ('close' or 'intrabar').")
+    parser.add_argument('--trials', type=int, default=20, help='Trials of the optimization benchmark (0 skips it).')
+    parser.add_argument('--splits', type=int, default=3, help='Cross-validation splits of a trial.')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs of every stage.')
+    parser.add_argument('--output', default=None,
+                        help="JSON file for the results. '{bars}' is replaced by the series length.")
+    parser.add_argument('--compare', default=None, help='A saved JSON run to compare against.')
+    args = parser.parse_args()
+
+    for n_bars in args.bars:
+        benchmark_config = BacktestConfig(engine=args.engine, execution=args.execution)
+        benchmark_results = run_benchmarks(
+            n_bars, benchmark_config, n_trials=args.trials, n_splits=args.splits, repeat=args.repeat
+        )
+        print_benchmarks(benchmark_results)
+        if args.output:
+            save_benchmarks(benchmark_results, args.output.format(bars=n_bars))
+        if args.compare:
+            print(compare_benchmarks(args.compare, benchmark_results).to_string())
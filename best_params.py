@@ -1,10 +1,19 @@
-def get_best_params() -> tuple[dict, float]:
+def get_best_params(storage: str | None = None, study_name: str | None = None) -> tuple[dict, float]:
     """
     Return the best hyperparameters found during optimization.
+    Args:
+        storage (str | None): A database URL or journal file path holding a stored study to load
+            the best trial from. None returns the hyperparameters found in a previous run.
+        study_name (str | None): The name of the stored study, None for the default STUDY_NAME.
     Returns:
         best_optimized_params (dict): The best hyperparameters.
         best_optimized_value (float): The best value of the optimization metric.
     """
+    if storage is not None:
+        # Optuna is only imported when a stored study is read
+        from study_storage import STUDY_NAME, load_best_trial
+        return load_best_trial(storage, study_name or STUDY_NAME)
+
     best_optimized_params = {
     'rsi_window': 10,
     'rsi_lower': 40,
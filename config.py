@@ -7,23 +7,105 @@ class BacktestConfig:
     Attributes:
         initial_capital (float): The initial capital for the backtest.
         commission (float): The commission rate per trade (as a decimal).
+        engine (str): The backtest engine to use ('loop' or 'vectorized').
+        cache_indicators (bool): Whether to reuse raw indicator series across backtests on the same data.
+        cache_backtests (bool): Whether to reuse the results of backtests with the same signals,
+            stop-loss, take-profit and capital fraction on the same data (see backtest_cache),
+            e.g. trials that only differ in thresholds that don't change any signal. The hit
+            rate of every study is stored in its 'backtest_cache' user attribute (fold worker
+            processes keep their own caches and aren't counted).
+        ticker (str): The ticker symbol of the traded asset.
+        periods_per_year (int): The number of bars in a year, used to annualize the metrics.
+        execution (str): How stop-losses and take-profits are filled. 'close' checks them against
+            the close of each bar and fills at the close; 'intrabar' checks the bar's High and Low
+            and fills at the stop-loss or take-profit level.
     """
     initial_capital: float = 1_000_000
     commission: float = 0.125 / 100
+    engine: str = 'loop'
+    cache_indicators: bool = False
+    cache_backtests: bool = False
+    ticker: str = 'BTCUSDT'
+    periods_per_year: int = 365*24
+    execution: str = 'close'
 
 @dataclass
 class OptimizationConfig:
     """
     Configuration for hyperparameter optimization using Optuna.
     Attributes:
-        n_trials (int): The number of optimization trials to run.
+        n_trials (int): The number of optimization trials to run. A resumed study only runs the
+            trials it is missing to reach n_trials finished trials.
         direction (str): The optimization direction ('maximize' or 'minimize').
         n_jobs (int): The number of parallel jobs to run. -1 uses all available cores.
         show_progress_bar (bool): Whether to display a progress bar during optimization.
         n_splits (int): The number of splits for time series cross-validation.
+        precompute_indicators (bool): Whether to precompute every indicator window of the search
+            space for each fold before the trials start. walk_forward computes them once over
+            the full series instead (see walk_forward).
+        indicator_table_dir (str | None): Directory to memory-map the precomputed indicators to.
+            None keeps them in memory.
+        parallel_backend (str): 'thread' runs trials on threads of one process, 'process' runs
+            them on n_jobs worker processes sharing one storage.
+        storage (str | None): Where to store the study: a database URL such as
+            'sqlite:///study.db', or the path of an Optuna journal file. A study with the same
+            name already in the storage is resumed. None keeps the study in memory (the process
+            backend uses a temporary journal file).
+        study_name (str): The name of the study in the storage.
+        result_cache (str | None): Path of a JSON lines file caching the cross-validated score of
+            every parameter set, so reruns never backtest the same parameters twice. None keeps
+            the cache in memory for this run only.
+        fold_workers (int): The number of worker processes backtesting the cross-validation
+            splits of a trial concurrently. 1 runs the splits sequentially.
+        pruner (str): The pruner stopping bad trials between splits
+            ('none', 'median', 'successive_halving', 'hyperband').
+        full_history_signals (bool): Whether to compute the signals once over the whole training
+            series and backtest each split on its slice, instead of recomputing the indicators
+            (and losing their warm-up history) on every split.
+        batch_size (int): The number of trials asked from Optuna at once and backtested together
+            with run_backtest_batch, e.g. 64. 1 runs the trials one by one with study.optimize.
+        profile (bool): Whether to time the indicators, signals, backtest phases and metrics
+            (see profiling). The timings of every trial are stored in its 'profile' user
+            attribute and a summary is printed at the end. Fold worker processes aren't profiled.
+        profile_memory (bool): Whether the profile also measures the memory every stage
+            allocates, with tracemalloc. It slows the optimization down noticeably. The
+            tracemalloc peak is process-wide, so it needs n_jobs=1 with the 'thread' backend.
     """
     n_trials: int = 50
     direction: str = 'maximize'
     n_jobs: int = -1
     show_progress_bar: bool = True
-    n_splits: int = 5
\ No newline at end of file
+    n_splits: int = 5
+    precompute_indicators: bool = False
+    indicator_table_dir: str | None = None
+    parallel_backend: str = 'thread'
+    storage: str | None = None
+    study_name: str = 'Hyperparameter Optimization'
+    result_cache: str | None = None
+    fold_workers: int = 1
+    pruner: str = 'none'
+    full_history_signals: bool = False
+    batch_size: int = 1
+    profile: bool = False
+    profile_memory: bool = False
+
+@dataclass
+class WalkForwardConfig:
+    """
+    Configuration for walk-forward optimization.
+    Attributes:
+        train_bars (int): The number of bars each window optimizes on.
+        test_bars (int): The number of out-of-sample bars traded with each window's parameters.
+            The windows advance by test_bars.
+        anchored (bool): Whether every window trains from the first bar (anchored) instead of
+            on the last train_bars bars (rolling).
+        window_workers (int): The number of windows optimized concurrently in worker processes.
+        warm_start_trials (int): The number of best trials of an earlier window enqueued as the
+            first trials of a window. Window i warm-starts from window i - window_workers, the
+            latest one finished before it starts.
+    """
+    train_bars: int = 24*365
+    test_bars: int = 24*30
+    anchored: bool = False
+    window_workers: int = 1
+    warm_start_trials: int = 5
@@ -0,0 +1,128 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from utils import clean_data
+
+CACHE_VERSION = 1
+
+
+def _source_signature(csv_path: str) -> dict:
+    """
+    Describe the CSV file so a cache built from an older version of it can be detected.
+    Args:
+        csv_path (str): The path of the raw CSV file.
+    Returns:
+        dict: The size and modification time of the file.
+    """
+    stat = os.stat(csv_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _default_cache_dir(csv_path: str) -> str:
+    """
+    Return the cache directory used for a CSV file when none is given.
+    Args:
+        csv_path (str): The path of the raw CSV file.
+    Returns:
+        str: A directory next to the CSV file.
+    """
+    return os.path.splitext(csv_path)[0] + '.cache'
+
+
+def write_cache(data: pd.DataFrame, cache_dir: str, source: dict) -> None:
+    """
+    Store cleaned price data as one typed .npy file per column plus a JSON manifest.
+    Prices and volumes are stored as float64, Datetime as datetime64 (int64 ticks), and text
+    columns holding a single value (e.g. the symbol) only in the manifest.
+    Args:
+        data (pd.DataFrame): The cleaned price data.
+        cache_dir (str): The directory to write the cache to.
+        source (dict): The signature of the CSV file the data was read from.
+    """
+    tmp_dir = cache_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    columns = []
+    for column in data.columns:
+        values = data[column]
+        if column == 'Datetime':
+            kind = 'datetime'
+            array = values.to_numpy()
+        elif pd.api.types.is_integer_dtype(values):
+            kind = 'int'
+            array = values.to_numpy(dtype=np.int64)
+        elif pd.api.types.is_numeric_dtype(values):
+            kind = 'float'
+            array = values.to_numpy(dtype=np.float64)
+        elif values.nunique(dropna=False) <= 1:
+            value = values.iloc[0] if len(values) else None
+            columns.append({'name': column, 'kind': 'constant', 'value': value})
+            continue
+        else:
+            kind = 'text'
+            array = values.to_numpy(dtype=str)
+        np.save(os.path.join(tmp_dir, f'{len(columns)}.npy'), array)
+        columns.append({'name': column, 'kind': kind})
+
+    manifest = {'version': CACHE_VERSION, 'source': source, 'rows': len(data), 'columns': columns}
+    with open(os.path.join(tmp_dir, 'manifest.json'), 'w') as file:
+        json.dump(manifest, file)
+
+    # Replace the old cache only once the new one is complete
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.replace(tmp_dir, cache_dir)
+
+
+def read_cache(cache_dir: str, source: dict | None = None) -> pd.DataFrame | None:
+    """
+    Load price data written by write_cache, memory-mapping the column files.
+    Args:
+        cache_dir (str): The cache directory.
+        source (dict | None): The signature the CSV file has now. If it differs from the one
+            stored in the cache, the cache is stale.
+    Returns:
+        pd.DataFrame | None: The price data, or None if there is no valid cache.
+    """
+    manifest_path = os.path.join(cache_dir, 'manifest.json')
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as file:
+        manifest = json.load(file)
+    if manifest.get('version') != CACHE_VERSION or (source is not None and manifest['source'] != source):
+        return None
+
+    data = {}
+    for index, column in enumerate(manifest['columns']):
+        if column['kind'] == 'constant':
+            data[column['name']] = pd.Series(column['value'], index=range(manifest['rows']))
+            continue
+        array = np.asarray(np.load(os.path.join(cache_dir, f'{index}.npy'), mmap_mode='r'))
+        data[column['name']] = array
+    return pd.DataFrame(data, copy=False)
+
+
+def load_price_data(csv_path: str, cache_dir: str | None = None) -> pd.DataFrame:
+    """
+    Load and clean a raw Binance CSV file, going through a binary columnar cache.
+    The first call parses the CSV and writes the cache; later calls read the cache
+    until the CSV file changes.
+    Args:
+        csv_path (str): The path of the raw CSV file.
+        cache_dir (str | None): Where to keep the cache. Defaults to '<csv name>.cache'
+            next to the CSV file.
+    Returns:
+        pd.DataFrame: The cleaned price data sorted by Datetime.
+    """
+    cache_dir = cache_dir or _default_cache_dir(csv_path)
+    source = _source_signature(csv_path)
+
+    data = read_cache(cache_dir, source)
+    if data is None:
+        data = clean_data(pd.read_csv(csv_path))
+        write_cache(data, cache_dir, source)
+    return data
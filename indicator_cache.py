@@ -0,0 +1,108 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+
+class IndicatorCache:
+    """
+    Bounded LRU cache of raw indicator series shared across backtests.
+    Entries are keyed by a fingerprint of the price data, the indicator name and its
+    window parameters, so trials that reuse a window skip the indicator computation and
+    only redo their threshold comparisons. The cache is safe to share between threads.
+    Attributes:
+        max_bytes (int): The memory budget of the stored series. Every entry holds one or two
+            full-length series; the least recently used ones are evicted beyond the budget.
+        hits (int): The number of lookups served from the cache.
+        misses (int): The number of lookups that had to compute the indicator.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 2**20):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(data: pd.DataFrame) -> str:
+        """
+        Compute a fingerprint of the price columns the indicators depend on.
+        Args:
+            data (pd.DataFrame): DataFrame containing 'Close', 'High' and 'Low' columns.
+        Returns:
+            str: A hex digest identifying the price data.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(str(len(data)).encode())
+        for column in ('Close', 'High', 'Low'):
+            digest.update(np.ascontiguousarray(data[column].to_numpy(dtype=float)).tobytes())
+        return digest.hexdigest()
+
+    def get(self, fingerprint: str, name: str, windows: tuple, compute: Callable):
+        """
+        Return a cached indicator, computing and storing it on a miss.
+        Args:
+            fingerprint (str): The fingerprint of the price data.
+            name (str): The indicator name.
+            windows (tuple): The window parameters of the indicator.
+            compute (Callable): A function without arguments that computes the indicator.
+        Returns:
+            The cached or freshly computed indicator value.
+        """
+        key = (fingerprint, name, windows)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+
+        value = compute()
+        size = sum(array.nbytes for array in (value if isinstance(value, tuple) else (value,)))
+        if size > self.max_bytes:
+            return value
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.nbytes -= previous[1]
+            self._entries[key] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.nbytes -= evicted_size
+        return value
+
+    def stats(self) -> dict:
+        """
+        Return the hit/miss counters of the cache.
+        Returns:
+            dict: Hits, misses, hit rate, and the number and size in bytes of the stored entries.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'nbytes': self.nbytes
+            }
+
+    def clear(self) -> None:
+        """
+        Remove every entry and reset the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.nbytes = 0
+
+
+# Shared cache used by run_backtest when BacktestConfig.cache_indicators is enabled
+indicator_cache = IndicatorCache()
@@ -0,0 +1,229 @@
+import numpy as np
+from scipy.signal import lfilter
+
+# Part of the file names of memory-mapped indicator tables; bump it whenever a kernel's
+# output changes so tables stored by an older version are rebuilt
+KERNEL_VERSION = 1
+
+
+def ema(values: np.ndarray, alpha: float, min_periods: int = 1) -> np.ndarray:
+    """
+    Exponential moving average computed as a first-order recursive filter,
+    y[t] = alpha * x[t] + (1 - alpha) * y[t - 1] starting from y[0] = x[0], which is what
+    pandas' ewm(alpha=alpha, adjust=False).mean() gives on finite values.
+    Args:
+        values (np.ndarray): The float64 values, without NaNs.
+        alpha (float): The smoothing factor, 2 / (span + 1) for a span.
+        min_periods (int): The number of values needed before the average is defined.
+            The first min_periods - 1 outputs are NaN.
+    Returns:
+        np.ndarray: The moving average.
+    """
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0:
+        return values.copy()
+    decay = 1.0 - alpha
+    average = np.empty_like(values)
+    # Filtering from the second value keeps the first average exactly equal to the first value
+    average[0] = values[0]
+    average[1:], _ = lfilter([alpha], [1.0, -decay], values[1:], zi=[decay * values[0]])
+    average[:min_periods - 1] = np.nan
+    return average
+
+
+def wilder_rsi(close: np.ndarray, window: int) -> np.ndarray:
+    """
+    Relative Strength Index with Wilder's smoothing (alpha = 1 / window), matching
+    ta.momentum.RSIIndicator: the first window - 1 values are NaN and bars without any
+    down move on record are 100.
+    Args:
+        close (np.ndarray): The close prices, without NaNs.
+        window (int): The RSI window.
+    Returns:
+        np.ndarray: The RSI values.
+    """
+    close = np.asarray(close, dtype=float)
+    diff = np.diff(close, prepend=close[:1])
+    average_up = ema(np.maximum(diff, 0.0), 1 / window, window)
+    average_down = ema(np.maximum(-diff, 0.0), 1 / window, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - 100 / (1 + average_up / average_down)
+    rsi[average_down == 0] = 100
+    return rsi
+
+
+def _window_sums(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Sum every full window of values from one cumulative sum.
+    Returns:
+        np.ndarray: The sum of the window ending at every bar from window - 1 on.
+    """
+    sums = np.empty(len(values) + 1)
+    sums[0] = 0.0
+    np.cumsum(values, out=sums[1:])
+    return sums[window:] - sums[:-window]
+
+
+def _flat_windows(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Find the full windows whose values are all equal, from a cumulative count of the bars
+    that differ from the previous one.
+    Returns:
+        np.ndarray: True for the window ending at every bar from window - 1 on if it is flat.
+    """
+    changes = np.zeros(len(values), dtype=np.int64)
+    np.cumsum(values[1:] != values[:-1], out=changes[1:])
+    return changes[window - 1:] == changes[:len(values) - window + 1]
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Rolling mean from cumulative sums. As with pandas' rolling(window, min_periods=window)
+    .mean(), infinite values count as missing, a window with a missing value gives NaN and
+    a window of equal values gives that value exactly.
+    Args:
+        values (np.ndarray): The float64 values.
+        window (int): The window size.
+    Returns:
+        np.ndarray: The rolling mean, NaN for the first window - 1 values.
+    """
+    values = np.asarray(values, dtype=float)
+    mean = np.full(len(values), np.nan)
+    finite = np.isfinite(values)
+    # Leading missing values (e.g. an indicator's warm-up) are skipped instead of summed as zeros
+    start = int(np.argmax(finite)) if finite.any() else len(values)
+    if window > len(values) - start:
+        return mean
+    values = values[start:]
+    missing = ~finite[start:]
+    flat = _flat_windows(values, window)
+    if missing.any():
+        valid = _window_sums(missing, window) == 0
+        window_mean = np.where(valid, _window_sums(np.where(missing, 0.0, values), window) / window, np.nan)
+        flat &= valid
+    else:
+        window_mean = _window_sums(values, window) / window
+    window_mean[flat] = values[window - 1:][flat]
+    mean[start + window - 1:] = window_mean
+    return mean
+
+
+def rolling_mean_std(
+        values: np.ndarray, window: int, block: int = 1024
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Rolling mean and population standard deviation from cumulative sums of the values and
+    their squares. Every block of consecutive windows gets its own cumulative sums, taken
+    after centering the values the block covers on their mean. This keeps the sums small,
+    so their rounding error stays far below the variance even when prices drift. Windows
+    of equal values get that value as mean and a standard deviation of exactly 0.
+    The values are not bit-identical to pandas' rolling().mean() and rolling().std(ddof=0)
+    (nor to the streaming indicators, which replicate pandas' online updates): over the
+    Bollinger windows of the search space the std is within about 1e-10 relative of a
+    two-pass np.std, while pandas' own drift leaves it up to a few 1e-8 relative away from
+    pandas. The mean agrees with pandas to about 1e-14.
+    Args:
+        values (np.ndarray): The float64 values, without NaNs.
+        window (int): The window size.
+        block (int): The number of consecutive windows sharing cumulative sums.
+    Returns:
+        mean (np.ndarray): The rolling mean, NaN for the first window - 1 values.
+        std (np.ndarray): The rolling standard deviation (ddof=0), NaN for the same values.
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    mean = np.full(n, np.nan)
+    std = np.full(n, np.nan)
+    if window > n:
+        return mean, std
+    n_windows = n - window + 1
+    n_blocks = -(-n_windows // block)
+    padded = np.concatenate((values, np.full(n_blocks * block - n_windows, values[-1])))
+    # Row b holds the values of windows b * block to (b + 1) * block - 1
+    rows = np.lib.stride_tricks.sliding_window_view(padded, block + window - 1)[::block]
+    offset = rows.mean(axis=1, keepdims=True)
+    centered = rows - offset
+    sums = np.zeros((n_blocks, block + window))
+    np.cumsum(centered, axis=1, out=sums[:, 1:])
+    centered_mean = sums[:, window:] - sums[:, :block]
+    centered_mean /= window
+    np.square(centered, out=centered)
+    np.cumsum(centered, axis=1, out=sums[:, 1:])
+    variance = sums[:, window:] - sums[:, :block]
+    variance /= window
+    variance -= np.square(centered_mean)
+    # Rounding can leave a tiny negative variance on flat windows
+    np.maximum(variance, 0.0, out=variance)
+    mean[window - 1:] = (centered_mean + offset).ravel()[:n_windows]
+    std[window - 1:] = np.sqrt(variance).ravel()[:n_windows]
+    flat = _flat_windows(values, window)
+    mean[window - 1:][flat] = values[window - 1:][flat]
+    std[window - 1:][flat] = 0.0
+    return mean, std
+
+
+def _rolling_extreme(values: np.ndarray, window: int, extreme: np.ufunc) -> np.ndarray:
+    """
+    Rolling maximum or minimum by doubling: the extremes over spans of 1, 2, 4, ... bars
+    are built from pairs of the previous ones, and every window is covered by two
+    overlapping spans of the largest power of two that fits in it. This takes
+    log2(window) contiguous array passes and is exact, NaNs included.
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    result = np.full(n, np.nan)
+    if window > n:
+        return result
+    # spans[i] is the extreme of the span bars ending at bar i (valid from span - 1 on)
+    spans = values.copy()
+    span = 1
+    while 2 * span <= window:
+        extreme(spans[span:], spans[:-span], out=spans[span:])
+        span *= 2
+    result[window - 1:] = extreme(spans[window - 1:], spans[span - 1:n - window + span])
+    return result
+
+
+def rolling_max(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Rolling maximum in O(n) whatever the window. A window with a NaN gives NaN.
+    Args:
+        values (np.ndarray): The float64 values.
+        window (int): The window size.
+    Returns:
+        np.ndarray: The rolling maximum, NaN for the first window - 1 values.
+    """
+    return _rolling_extreme(values, window, np.maximum)
+
+
+def rolling_min(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Rolling minimum in O(n) whatever the window. A window with a NaN gives NaN.
+    Args:
+        values (np.ndarray): The float64 values.
+        window (int): The window size.
+    Returns:
+        np.ndarray: The rolling minimum, NaN for the first window - 1 values.
+    """
+    return _rolling_extreme(values, window, np.minimum)
+
+
+def stochastic(
+        high: np.ndarray, low: np.ndarray, close: np.ndarray, k_window: int, smooth_window: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    %K and %D lines of the Stochastic Oscillator, matching ta.momentum.StochasticOscillator.
+    Args:
+        high (np.ndarray): The high prices.
+        low (np.ndarray): The low prices.
+        close (np.ndarray): The close prices.
+        k_window (int): The lookback window of %K.
+        smooth_window (int): The window of the %D moving average.
+    Returns:
+        k_percent (np.ndarray): The %K values.
+        d_percent (np.ndarray): The %D values.
+    """
+    lowest = rolling_min(low, k_window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        k_percent = 100 * (np.asarray(close, dtype=float) - lowest) / (rolling_max(high, k_window) - lowest)
+    return k_percent, rolling_mean(k_percent, smooth_window)
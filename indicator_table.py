@@ -0,0 +1,194 @@
+import hashlib
+import os
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from indicator_cache import IndicatorCache
+from indicator_kernels import KERNEL_VERSION
+from indicators import get_rsi_series, get_ema_series, get_bollinger_series, get_stochastic_series
+from trial_params import WINDOW_RANGES
+
+
+def _window_range(*names: str, window_ranges: dict) -> range:
+    """
+    Return the range of windows covering every parameter in names.
+    Args:
+        names (str): The window parameter names sharing an indicator.
+        window_ranges (dict): Inclusive (low, high) bounds for each window parameter.
+    Returns:
+        range: All windows from the lowest low to the highest high.
+    """
+    low = min(window_ranges[name][0] for name in names)
+    high = max(window_ranges[name][1] for name in names)
+    return range(low, high + 1)
+
+
+class IndicatorTable:
+    """
+    Raw indicator series precomputed for every window of the search space, stored as
+    windows x bars arrays (optionally memory-mapped to disk). It is a drop-in replacement
+    for IndicatorCache in get_signals: a lookup is a row index instead of an indicator
+    computation, and windows outside the table or other data fall back to computing.
+    Attributes:
+        data_fingerprint (str): The fingerprint of the price data the table was built on.
+        hits (int): The number of lookups served from the table.
+        misses (int): The number of lookups that had to compute the indicator.
+    """
+    fingerprint = staticmethod(IndicatorCache.fingerprint)
+
+    def __init__(self, data_fingerprint: str):
+        self.data_fingerprint = data_fingerprint
+        self.hits = 0
+        self.misses = 0
+        self._arrays: dict[str, tuple[np.ndarray, ...]] = {}
+        self._rows: dict[str, dict[tuple, int]] = {}
+
+    @classmethod
+    def build(
+            cls, data: pd.DataFrame, window_ranges: dict = WINDOW_RANGES, directory: str | None = None
+    ) -> 'IndicatorTable':
+        """
+        Precompute every indicator series of the search space for one dataset.
+        Args:
+            data (pd.DataFrame): DataFrame containing price data with 'Close', 'High', and 'Low' columns.
+            window_ranges (dict): Inclusive (low, high) bounds for each window parameter.
+            directory (str | None): If given, the arrays are stored as .npy files in this
+                directory and memory-mapped. Existing files for the same data are reused.
+        Returns:
+            IndicatorTable: The table for the given data.
+        """
+        data = data.copy()
+        data['Close'] = data['Close'].astype(float)
+        close = data['Close']
+        table = cls(cls.fingerprint(data))
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+        ema_spans = _window_range(
+            'ema_short_window', 'ema_long_window', 'macd_short_window', 'macd_long_window',
+            window_ranges=window_ranges
+        )
+        table._add('ema', [(span,) for span in ema_spans], 1, directory,
+                   lambda span: (get_ema_series(close, span),))
+
+        rsi_windows = _window_range('rsi_window', window_ranges=window_ranges)
+        table._add('rsi', [(window,) for window in rsi_windows], 1, directory,
+                   lambda window: (get_rsi_series(close, window),))
+
+        bollinger_windows = _window_range('bollinger_window', window_ranges=window_ranges)
+        table._add('bollinger', [(window,) for window in bollinger_windows], 2, directory,
+                   lambda window: get_bollinger_series(close, window))
+
+        stochastic_windows = [
+            (k_window, smooth_window)
+            for k_window in _window_range('stoch_k_window', window_ranges=window_ranges)
+            for smooth_window in _window_range('stoch_smooth_window', window_ranges=window_ranges)
+        ]
+        table._add('stochastic', stochastic_windows, 2, directory,
+                   lambda k_window, smooth_window: get_stochastic_series(data, k_window, smooth_window))
+        return table
+
+    def _add(
+            self, name: str, windows: list[tuple], n_outputs: int,
+            directory: str | None, compute: Callable
+    ) -> None:
+        """
+        Compute (or load from disk) the rows of one indicator.
+        Args:
+            name (str): The indicator name used by get_signals.
+            windows (list[tuple]): The window parameters of every row.
+            n_outputs (int): The number of series the indicator returns.
+            directory (str | None): Directory for memory-mapped storage, or None to keep it in memory.
+            compute (Callable): Computes the output series for one set of windows.
+        """
+        paths = None
+        arrays = None
+        if directory is not None:
+            # Files of other window ranges or kernel versions hold other rows and are never reused
+            windows_digest = hashlib.blake2b(repr(windows).encode(), digest_size=8).hexdigest()
+            paths = [
+                os.path.join(
+                    directory,
+                    f'{self.data_fingerprint}_{name}_{windows_digest}_v{KERNEL_VERSION}_{output}.npy'
+                )
+                for output in range(n_outputs)
+            ]
+            if all(os.path.exists(path) for path in paths):
+                arrays = [np.load(path, mmap_mode='r') for path in paths]
+                if any(array.shape[0] != len(windows) for array in arrays):
+                    arrays = None
+
+        if arrays is None:
+            rows = [compute(*window) for window in windows]
+            arrays = [np.stack([values[output] for values in rows]) for output in range(n_outputs)]
+            if paths is not None:
+                for path, array in zip(paths, arrays):
+                    # Write to a temporary file first so an interrupted build is never reused
+                    tmp_path = path[:-len('.npy')] + '.tmp.npy'
+                    np.save(tmp_path, array)
+                    os.replace(tmp_path, path)
+                arrays = [np.load(path, mmap_mode='r') for path in paths]
+
+        self._arrays[name] = tuple(arrays)
+        self._rows[name] = {window: row for row, window in enumerate(windows)}
+
+    def slice(self, data: pd.DataFrame, start: int, stop: int) -> 'IndicatorTable':
+        """
+        Return a table for the bars start:stop of the data this table was built on, without
+        copying the arrays. The indicators keep the warm-up history before start, so windows
+        of a longer series reuse the rows computed once over the whole series.
+        Args:
+            data (pd.DataFrame): The price data the table was built on.
+            start (int): The first bar of the slice.
+            stop (int): The bar after the last one of the slice.
+        Returns:
+            IndicatorTable: The table for data.iloc[start:stop].
+        """
+        table = IndicatorTable(self.fingerprint(data.iloc[start:stop]))
+        table._arrays = {
+            name: tuple(array[:, start:stop] for array in arrays) for name, arrays in self._arrays.items()
+        }
+        table._rows = self._rows
+        return table
+
+    def get(self, fingerprint: str, name: str, windows: tuple, compute: Callable):
+        """
+        Return a precomputed indicator row, computing it if it is not in the table.
+        Indicators the table never holds (the MACD lines, built from its 'ema' rows) are
+        computed without a lookup and don't count as misses.
+        Args:
+            fingerprint (str): The fingerprint of the price data.
+            name (str): The indicator name.
+            windows (tuple): The window parameters of the indicator.
+            compute (Callable): A function without arguments that computes the indicator.
+        Returns:
+            The indicator series, shaped like the output of compute.
+        """
+        if name not in self._rows:
+            return compute()
+        row = self._rows[name].get(windows)
+        if fingerprint != self.data_fingerprint or row is None:
+            self.misses += 1
+            return compute()
+
+        self.hits += 1
+        arrays = self._arrays[name]
+        if len(arrays) == 1:
+            return arrays[0][row]
+        return tuple(array[row] for array in arrays)
+
+    def stats(self) -> dict:
+        """
+        Return the hit/miss counters and the size of the table.
+        Returns:
+            dict: Hits, misses, hit rate and the table size in bytes.
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'nbytes': sum(array.nbytes for arrays in self._arrays.values() for array in arrays)
+        }
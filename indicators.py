@@ -1,171 +1,268 @@
-import ta
+import numpy as np
 import pandas as pd
 
-def get_rsi(
-        data: pd.DataFrame, rsi_window: int, rsi_lower, rsi_upper
-) -> tuple[pd.Series, pd.Series]:
+from indicator_cache import IndicatorCache
+from indicator_kernels import ema, rolling_mean_std, stochastic, wilder_rsi
+from profiling import profiled
+
+# Bit of every indicator in the signal masks
+SIGNAL_BITS = {'rsi': 1, 'ema': 2, 'macd': 4, 'bollinger': 8, 'stochastic': 16}
+# Indicators that must agree for a buy or sell signal
+MIN_VOTES = 2
+# Number of set bits of every uint8 value
+_POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+
+@profiled('indicators.rsi')
+def get_rsi_series(close: pd.Series, rsi_window: int) -> np.ndarray:
     """
-    Calculates the Relative Strength Index (RSI) for a given DataFrame.
+    Calculate the raw Relative Strength Index (RSI) values.
     Args:
-        data (pd.DataFrame): The input data containing price information.
+        close (pd.Series): The close prices.
         rsi_window (int): The window size for calculating the RSI.
-        rsi_lower (float): The lower threshold for generating buy signals.
-        rsi_upper (float): The upper threshold for generating sell signals.
     Returns:
-        pd.Series: A pandas Series containing the RSI values.
+        np.ndarray: The RSI values.
     """
-    rsi_indicator = ta.momentum.RSIIndicator(data.Close, window=rsi_window)
-
-    buy_signal = rsi_indicator.rsi() < rsi_lower
-    sell_signal = rsi_indicator.rsi() > rsi_upper
-    return buy_signal, sell_signal
+    return wilder_rsi(close.to_numpy(dtype=float), rsi_window)
 
 
-def get_ema_signals(
-        data: pd.DataFrame, short_window: int, long_window: int
-) -> tuple[pd.Series, pd.Series]:
+@profiled('indicators.ema')
+def get_ema_series(close: pd.Series, span: int) -> np.ndarray:
     """
-    Calculate buy and sell signals based on EMA crossover strategy.
+    Calculate the raw Exponential Moving Average (EMA) values.
     Args:
-        data (pd.DataFrame): DataFrame containing price data with a 'Close' column.
-        short_window (int): The window size for the short-term EMA.
-        long_window (int): The window size for the long-term EMA.
+        close (pd.Series): The close prices.
+        span (int): The span of the EMA.
     Returns:
-        buy_signal (pd.Series): A pandas Series containing the buy signals.
-        sell_signal (pd.Series): A pandas Series containing the sell signals.
+        np.ndarray: The EMA values.
     """
-    ema_short = data['Close'].ewm(span=short_window, adjust=False).mean()
-    ema_long = data['Close'].ewm(span=long_window, adjust=False).mean()
-
-    buy_signal = (ema_short > ema_long) & (ema_short.shift(1) <= ema_long.shift(1))
-    sell_signal = (ema_short < ema_long) & (ema_short.shift(1) >= ema_long.shift(1))
-    return buy_signal, sell_signal
+    return ema(close.to_numpy(dtype=float), 2 / (span + 1))
 
 
-def get_macd(
-        data: pd.DataFrame, short_window: int, long_window: int, signal_window: int
-) -> tuple[pd.Series, pd.Series]:
+@profiled('indicators.macd')
+def get_macd_series(
+        ema_short: np.ndarray, ema_long: np.ndarray, signal_window: int
+) -> tuple[np.ndarray, np.ndarray]:
     """
-    Calculate the Moving Average Convergence Divergence (MACD) and its signal line.
+    Calculate the raw MACD line and its signal line from the short and long EMAs.
     Args:
-        data (pd.DataFrame): DataFrame containing price data with a 'Close' column.
-        short_window (int): The window size for the short-term EMA. Default is 12.
-        long_window (int): The window size for the long-term EMA. Default is 26.
-        signal_window (int): The window size for the signal line EMA. Default is 9.
+        ema_short (np.ndarray): The short-term EMA values.
+        ema_long (np.ndarray): The long-term EMA values.
+        signal_window (int): The window size for the signal line EMA.
     Returns:
-        macd_buy (pd.Series): A pandas Series containing the MACD buy signals.
-        macd_sell (pd.Series): A pandas Series containing the MACD sell signals.
+        macd (np.ndarray): The MACD line.
+        signal (np.ndarray): The signal line.
     """
-    ema_short = data['Close'].ewm(span=short_window, adjust=False).mean()
-    ema_long = data['Close'].ewm(span=long_window, adjust=False).mean()
     macd = ema_short - ema_long
-    signal = macd.ewm(span=signal_window, adjust=False).mean()
-
-    buy_signal = (macd > signal) & (macd.shift(1) <= signal.shift(1))
-    sell_signal = (macd < signal) & (macd.shift(1) >= signal.shift(1))
-    return buy_signal, sell_signal
+    signal = ema(macd, 2 / (signal_window + 1))
+    return macd, signal
 
 
-def get_bollinger_bands(
-        data: pd.DataFrame, window: int, num_std_dev: float
-) -> tuple[pd.Series, pd.Series]:
+@profiled('indicators.bollinger')
+def get_bollinger_series(close: pd.Series, window: int) -> tuple[np.ndarray, np.ndarray]:
     """
-    Calculate buy and sell signals based on Bollinger Bands strategy.
+    Calculate the raw rolling mean and standard deviation behind the Bollinger Bands.
     Args:
-        data (pd.DataFrame): DataFrame containing price data with a 'Close' column.
+        close (pd.Series): The close prices.
         window (int): The window size for calculating the moving average.
-        num_std_dev (float): The number of standard deviations for the bands.
     Returns:
-        buy_signal (pd.Series): A pandas Series containing the buy signals.
-        sell_signal (pd.Series): A pandas Series containing the sell signals.
+        mavg (np.ndarray): The rolling mean.
+        mstd (np.ndarray): The rolling (population) standard deviation.
     """
-    bollinger_bands = ta.volatility.BollingerBands(data['Close'], window=window, window_dev=num_std_dev)
-    lower_band = bollinger_bands.bollinger_lband()
-    upper_band = bollinger_bands.bollinger_hband()
-
-    buy_signal = data['Close'] < lower_band
-    sell_signal = data['Close'] > upper_band
-    return buy_signal, sell_signal
+    return rolling_mean_std(close.to_numpy(dtype=float), window)
 
 
-def get_stochastic_oscillator(
-        data: pd.DataFrame, k_window: int, smooth_window: int,
-        lower_threshold: float, upper_threshold: float
-) -> tuple[pd.Series, pd.Series]:
+@profiled('indicators.stochastic')
+def get_stochastic_series(
+        data: pd.DataFrame, k_window: int, smooth_window: int
+) -> tuple[np.ndarray, np.ndarray]:
     """
-    Calculate buy and sell signals based on Stochastic Oscillator strategy.
-
+    Calculate the raw %K and %D lines of the Stochastic Oscillator.
     Args:
         data (pd.DataFrame): DataFrame containing price data with 'High', 'Low', and 'Close' columns.
         k_window (int): The lookback window size for %K.
         smooth_window (int): The smoothing window for %K (typically 3).
-        lower_threshold (float): The lower threshold for generating buy signals.
-        upper_threshold (float): The upper threshold for generating sell signals.
-
     Returns:
-        buy_signal (pd.Series): A pandas Series containing the buy signals (True/False).
-        sell_signal (pd.Series): A pandas Series containing the sell signals (True/False).
-    """
-    stochastic_oscillator = ta.momentum.StochasticOscillator(
-        high=data['High'],
-        low=data['Low'],
-        close=data['Close'],
-        window=k_window,
-        smooth_window=smooth_window
+        k_percent (np.ndarray): The %K values.
+        d_percent (np.ndarray): The %D values.
+    """
+    return stochastic(
+        data['High'].to_numpy(dtype=float),
+        data['Low'].to_numpy(dtype=float),
+        data['Close'].to_numpy(dtype=float),
+        k_window,
+        smooth_window
     )
 
-    k_percent = stochastic_oscillator.stoch()
-    d_percent = stochastic_oscillator.stoch_signal()
 
+def _crossover_signals(fast: np.ndarray, slow: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Find the bars where the fast line crosses above (buy) or below (sell) the slow line.
+    Args:
+        fast (np.ndarray): The fast line.
+        slow (np.ndarray): The slow line.
+    Returns:
+        buy_signal (np.ndarray): True where the fast line crosses above the slow line.
+        sell_signal (np.ndarray): True where the fast line crosses below the slow line.
+    """
+    buy_signal = fast > slow
+    sell_signal = fast < slow
+    buy_signal[1:] &= fast[:-1] <= slow[:-1]
+    sell_signal[1:] &= fast[:-1] >= slow[:-1]
+    buy_signal[:1] = False
+    sell_signal[:1] = False
+    return buy_signal, sell_signal
+
+
+def _rsi_signals(rsi: np.ndarray, rsi_lower, rsi_upper) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Apply the RSI thresholds: buy when oversold, sell when overbought.
+    """
+    return rsi < rsi_lower, rsi > rsi_upper
+
+
+def _bollinger_signals(
+        close: np.ndarray, mavg: np.ndarray, mstd: np.ndarray, num_std_dev: float
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Apply the Bollinger Bands: buy below the lower band, sell above the upper band.
+    """
+    lower_band = mavg - num_std_dev * mstd
+    upper_band = mavg + num_std_dev * mstd
+    return close < lower_band, close > upper_band
+
+
+def _stochastic_signals(
+        k_percent: np.ndarray, d_percent: np.ndarray,
+        lower_threshold: float, upper_threshold: float
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Apply the Stochastic thresholds: both %K and %D must be beyond the threshold.
+    """
     buy_signal = (k_percent < lower_threshold) & (d_percent < lower_threshold)
     sell_signal = (k_percent > upper_threshold) & (d_percent > upper_threshold)
-
     return buy_signal, sell_signal
 
 
-def get_signals(data: pd.DataFrame, params: dict) -> pd.DataFrame:
+@profiled('get_signals')
+def get_signal_masks(
+        data: pd.DataFrame, params: dict, cache: IndicatorCache | None = None
+) -> tuple[np.ndarray, np.ndarray]:
     """
-    Generate buy and sell signals based on multiple technical indicators.
+    Compute the buy and sell votes of every indicator as one uint8 mask per bar, with the
+    bit of each indicator (see SIGNAL_BITS) set where it gives a signal. The price data is
+    only read, never copied.
     Args:
         data (pd.DataFrame): DataFrame containing price data with 'Close', 'High', and 'Low' columns.
         params (dict): A dictionary containing parameters for each technical indicator.
+        cache (IndicatorCache | None): Optional source of raw indicator series, either an
+            IndicatorCache or a precomputed IndicatorTable. When given, only the threshold
+            comparisons are recomputed for windows it already holds.
     Returns:
-        df (pd.DataFrame): A DataFrame with additional columns for buy and sell signals.
-
+        buy_mask (np.ndarray): The buy votes of every bar.
+        sell_mask (np.ndarray): The sell votes of every bar.
     """
-    df = data.copy()
-    # Calculate individual indicator signals
-    df['rsi_buy'], df['rsi_sell'] = get_rsi(
-        df, params['rsi_window'], params['rsi_lower'], params['rsi_upper']
+    close = data['Close']
+    if close.dtype != np.float64:
+        close = close.astype(float)
+    fingerprint = cache.fingerprint(data) if cache is not None else None
+
+    def cached(name: str, windows: tuple, compute):
+        if cache is None:
+            return compute()
+        return cache.get(fingerprint, name, windows, compute)
+
+    # Raw indicator series
+    rsi = cached('rsi', (params['rsi_window'],), lambda: get_rsi_series(close, params['rsi_window']))
+    ema_short = cached(
+        'ema', (params['ema_short_window'],), lambda: get_ema_series(close, params['ema_short_window'])
     )
-    df['ema_buy'], df['ema_sell'] = get_ema_signals(
-        df, params['ema_short_window'], params['ema_long_window']
+    ema_long = cached(
+        'ema', (params['ema_long_window'],), lambda: get_ema_series(close, params['ema_long_window'])
     )
-    df['macd_buy'], df['macd_sell'] = get_macd(
-        df, params['macd_short_window'], params['macd_long_window'], params['macd_signal_window']
+    macd_windows = (params['macd_short_window'], params['macd_long_window'], params['macd_signal_window'])
+    macd, macd_signal = cached('macd', macd_windows, lambda: get_macd_series(
+        cached('ema', (macd_windows[0],), lambda: get_ema_series(close, macd_windows[0])),
+        cached('ema', (macd_windows[1],), lambda: get_ema_series(close, macd_windows[1])),
+        macd_windows[2]
+    ))
+    bollinger_mavg, bollinger_mstd = cached(
+        'bollinger', (params['bollinger_window'],),
+        lambda: get_bollinger_series(close, params['bollinger_window'])
     )
-    df['bollinger_buy'], df['bollinger_sell'] = get_bollinger_bands(
-        df, params['bollinger_window'], params['bollinger_num_std_dev']
+    stoch_k, stoch_d = cached(
+        'stochastic', (params['stoch_k_window'], params['stoch_smooth_window']),
+        lambda: get_stochastic_series(data, params['stoch_k_window'], params['stoch_smooth_window'])
     )
-    df['stochastic_buy'], df['stochastic_sell'] = get_stochastic_oscillator(
-        df, params['stoch_k_window'], params['stoch_smooth_window'],
-        params['stoch_lower_threshold'], params['stoch_upper_threshold']
+
+    # Individual indicator signals, in SIGNAL_BITS order
+    signals = (
+        _rsi_signals(rsi, params['rsi_lower'], params['rsi_upper']),
+        _crossover_signals(ema_short, ema_long),
+        _crossover_signals(macd, macd_signal),
+        _bollinger_signals(
+            close.to_numpy(), bollinger_mavg, bollinger_mstd, params['bollinger_num_std_dev']
+        ),
+        _stochastic_signals(
+            stoch_k, stoch_d, params['stoch_lower_threshold'], params['stoch_upper_threshold']
+        ),
     )
-    # Combine signals
-    df['buy_signal'] = (df[[
-        'rsi_buy', 'ema_buy', 'macd_buy', 'bollinger_buy', 'stochastic_buy'
-    ]].sum(axis=1) >= 2)
-
-    df['sell_signal'] = (df[[
-        'rsi_sell', 'ema_sell', 'macd_sell', 'bollinger_sell', 'stochastic_sell'
-    ]].sum(axis=1) >= 2)
-
-    # Drop rows with NaN values in any of the signal columns
-    df = df.dropna(
-        subset=[
-            'rsi_buy', 'rsi_sell', 'ema_buy', 'ema_sell', 'macd_buy', 'macd_sell',
-            'bollinger_buy', 'bollinger_sell', 'stochastic_buy', 'stochastic_sell'
-        ]
-    ).reset_index(drop=True)
-
-    return df
\ No newline at end of file
+
+    buy_mask = np.zeros(len(data), dtype=np.uint8)
+    sell_mask = np.zeros(len(data), dtype=np.uint8)
+    for bit, (buy_signal, sell_signal) in enumerate(signals):
+        buy_mask |= buy_signal.view(np.uint8) << bit
+        sell_mask |= sell_signal.view(np.uint8) << bit
+    return buy_mask, sell_mask
+
+
+def count_votes(mask: np.ndarray) -> np.ndarray:
+    """
+    Count the indicators voting on every bar of a signal mask (a popcount of each byte).
+    Args:
+        mask (np.ndarray): A uint8 signal mask from get_signal_masks.
+    Returns:
+        np.ndarray: The number of set bits of every bar.
+    """
+    return _POPCOUNT[mask]
+
+
+def get_signal_arrays(
+        data: pd.DataFrame, params: dict, cache: IndicatorCache | None = None
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Generate the buy and sell signals as boolean arrays: a bar gives a signal when at least
+    MIN_VOTES indicators agree.
+    Args:
+        data (pd.DataFrame): DataFrame containing price data with 'Close', 'High', and 'Low' columns.
+        params (dict): A dictionary containing parameters for each technical indicator.
+        cache (IndicatorCache | None): Optional source of raw indicator series (see get_signal_masks).
+    Returns:
+        buy_signal (np.ndarray): True on the bars with a buy signal.
+        sell_signal (np.ndarray): True on the bars with a sell signal.
+    """
+    buy_mask, sell_mask = get_signal_masks(data, params, cache)
+    return count_votes(buy_mask) >= MIN_VOTES, count_votes(sell_mask) >= MIN_VOTES
+
+
+def get_signals(
+        data: pd.DataFrame, params: dict, cache: IndicatorCache | None = None
+) -> pd.DataFrame:
+    """
+    Generate buy and sell signals based on multiple technical indicators.
+    Args:
+        data (pd.DataFrame): DataFrame containing price data with 'Close', 'High', and 'Low' columns.
+        params (dict): A dictionary containing parameters for each technical indicator.
+        cache (IndicatorCache | None): Optional source of raw indicator series, either an
+            IndicatorCache or a precomputed IndicatorTable. When given, only the threshold
+            comparisons are recomputed for windows it already holds.
+    Returns:
+        df (pd.DataFrame): The price data with 'buy_signal' and 'sell_signal' columns and a
+            fresh index. The price columns are shared with data, not copied.
+
+    """
+    buy_signal, sell_signal = get_signal_arrays(data, params, cache)
+    columns = {column: data[column].array for column in data.columns}
+    columns['buy_signal'] = buy_signal
+    columns['sell_signal'] = sell_signal
+    return pd.DataFrame(columns, copy=False)
@@ -1,123 +1,257 @@
-from config import BacktestConfig, OptimizationConfig
-from optimizer import optimize_hyperparameters
-from utils import clean_split_data, get_returns_table
-from prints import print_best_params, print_metrics, print_returns_tables
-from backtest import run_backtest
-from visualization import plot_training_portfolio_value, plot_portfolio_value
-from best_params import get_best_params
-
+import argparse
 import time
-import pandas as pd
 
-data = pd.read_csv('Binance_BTCUSDT_1h.csv')
-train_data, test_data, validation_data = clean_split_data(data, 0.6, 0.2, 0.2)
+from config import BacktestConfig, OptimizationConfig
+from prints import (
+    print_best_params, print_metrics, print_returns_tables, print_cache_stats, print_trial_summary
+)
 
-# Get dates for each split
-train_dates = pd.concat([train_data['Datetime'], test_data['Datetime'].iloc[:1]]).tolist()
-test_dates = pd.concat([train_data['Datetime'].iloc[-1:], test_data['Datetime']]).tolist()
-valid_dates = pd.concat([test_data['Datetime'].iloc[-1:], validation_data['Datetime']]).tolist()
+# Heavy libraries (pandas, optuna, scikit-learn, matplotlib, seaborn) are imported inside
+# the subcommands that need them, so e.g. a plain backtest doesn't pay for the plotting stack
+DATA_PATH = 'Binance_BTCUSDT_1h.csv'
+INITIAL_CAPITAL = 1_000_000
+COMMISSION = 0.125/100
+SPLITS = ('train', 'test', 'validation')
+# The pruner names of optimizer.make_pruner
+PRUNERS = ('none', 'median', 'successive_halving', 'hyperband')
 
-# Returns on investmen if buy and hold strategy for comparison
-roi_test = (test_data['Close'].iloc[-1] - test_data['Close'].iloc[0]) / test_data['Close'].iloc[0]
-roi_valid = (validation_data['Close'].iloc[-1] - validation_data['Close'].iloc[0]) / validation_data['Close'].iloc[0]
 
-initial_capital = 1_000_000
-optimization_metric = 'Calmar' # 'Sharpe', 'Sortino', 'Calmar'
-n_trials = 200 # Number of optimization trials
-n_splits = 3 # For time series cross-validation
+def load_splits(data_path: str) -> dict[str, tuple]:
+    """
+    Load the price data and split it 60/20/20 into train, test and validation sets.
+    Args:
+        data_path (str): The path of the price CSV file.
+    Returns:
+        dict[str, tuple]: Split name -> (data, dates). The dates of every split start with the
+            last bar of the previous one, matching its portfolio values.
+    """
+    import pandas as pd
+    from data_loader import load_price_data
+    from utils import split_data
 
-use_best_params = True  # If True, use the best hyperparameters found in previous runs, else run a new optimization
+    data = load_price_data(data_path)
+    train_data, test_data, validation_data = split_data(data, 0.6, 0.2, 0.2)
 
+    # Get dates for each split
+    train_dates = pd.concat([train_data['Datetime'], test_data['Datetime'].iloc[:1]]).tolist()
+    test_dates = pd.concat([train_data['Datetime'].iloc[-1:], test_data['Datetime']]).tolist()
+    valid_dates = pd.concat([test_data['Datetime'].iloc[-1:], validation_data['Datetime']]).tolist()
 
-def main():
-    print('\nBacktesting started...\n')
+    return {
+        'train': (train_data, train_dates),
+        'test': (test_data, test_dates),
+        'validation': (validation_data, valid_dates)
+    }
 
-    if use_best_params: # Use predefined best parameters
-        best_params, best_value = get_best_params()
-    else:
-        # ---- Backtest and optimization configurations
-        backtest_config = BacktestConfig(
-            initial_capital = initial_capital,
-            commission = 0.125/100
-        )
-        optimization_config = OptimizationConfig(
-            n_trials=n_trials,
-            direction='maximize',
-            n_jobs=-1,
-            show_progress_bar=True,
-            n_splits=n_splits
-        )
 
-        # ---- Optimize hyperparameters
-        start_time = time.time()
-        print(f'\n{"=" * 50}\n')
+def backtest_split(
+        name: str, data, dates: list, params: dict, initial_capital: float
+) -> list:
+    """
+    Backtest the strategy on one split and print its metrics (and returns tables on the
+    test and validation sets).
+    Args:
+        name (str): The name of the split.
+        data (pd.DataFrame): The data of the split.
+        dates (list): The dates of the split.
+        params (dict): Hyperparameters for the trading strategy.
+        initial_capital (float): The capital the backtest starts with.
+    Returns:
+        list: The portfolio value over time.
+    """
+    from backtest import run_backtest
+    from utils import get_returns_table
 
-        study = optimize_hyperparameters(
-            data=train_data,
-            backtest_config=backtest_config,
-            optimization_config=optimization_config,
-            metric=optimization_metric
-        )
-        best_params = study.best_params
-        best_value = study.best_value
-        end_time = time.time()
-        print(f'\nOptimization completed in {end_time - start_time:.2f} seconds.\n')
+    config = BacktestConfig(
+        initial_capital=initial_capital,
+        commission=COMMISSION
+    )
+    metrics, n_long_trades, n_short_trades, portfolio_value, capital, _ = run_backtest(
+        data=data,
+        config=config,
+        params=params
+    )
+    print_metrics(metrics, name, n_long_trades, n_short_trades)
+    if name != 'train':
+        # Returns on investment of a buy and hold strategy for comparison
+        roi = (data['Close'].iloc[-1] - data['Close'].iloc[0]) / data['Close'].iloc[0]
+        returns = get_returns_table(portfolio_value, dates)
+        print_returns_tables(returns, initial_capital, capital, name.capitalize(), roi)
+    return portfolio_value
 
-    print(f'\n{'=' * 50}\n\nBest mean {optimization_metric} ' +
+
+def evaluate(
+        splits: dict[str, tuple], best_params: dict, best_value: float, metric: str,
+        initial_capital: float, plots: bool = True
+) -> None:
+    """
+    Evaluate the best hyperparameters on the train, test and validation sets.
+    Args:
+        splits (dict[str, tuple]): The output of load_splits.
+        best_params (dict): The best hyperparameters.
+        best_value (float): The best value of the optimization metric.
+        metric (str): The optimization metric.
+        initial_capital (float): The capital every backtest starts with.
+        plots (bool): Plot the portfolio values. False never imports matplotlib.
+    """
+    print(f'\n{"=" * 50}\n\nBest mean {metric} ' +
           f'on the walk forward validation: {best_value:.4f}')
     print_best_params(best_params)
 
-    # ---- Run backtest on training data with best hyperparameters
-    train_backtest_config = BacktestConfig(
-        initial_capital = initial_capital,
-        commission = 0.125 / 100
+    portfolio_values = {
+        name: backtest_split(name, data, dates, best_params, initial_capital)
+        for name, (data, dates) in splits.items()
+    }
+
+    if plots:
+        from visualization import plot_training_portfolio_value, plot_portfolio_value
+
+        train_data, train_dates = splits['train']
+        test_data, test_dates = splits['test']
+        validation_data, valid_dates = splits['validation']
+        plot_training_portfolio_value(portfolio_values['train'], train_dates, train_data)
+        plot_portfolio_value(
+            portfolio_values['test'], portfolio_values['validation'], test_dates, valid_dates,
+            test_data, validation_data
+        )
+
+
+def optimize_command(args: argparse.Namespace) -> None:
+    """
+    Optimize the hyperparameters on the training set, then evaluate the best ones.
+    Args:
+        args (argparse.Namespace): The parsed command line arguments.
+    """
+    from optimizer import optimize_hyperparameters
+
+    splits = load_splits(args.data)
+
+    # ---- Backtest and optimization configurations
+    backtest_config = BacktestConfig(
+        initial_capital=args.initial_capital,
+        commission=COMMISSION,
+        cache_indicators=True,
+        cache_backtests=True
     )
-    train_metrics, train_n_long_trades, train_n_short_trades, train_portfolio_value, train_capital = run_backtest(
-        data=train_data,
-        config=train_backtest_config,
-        params=best_params
+    optimization_config = OptimizationConfig(
+        n_trials=args.n_trials,
+        direction='maximize',
+        n_jobs=args.n_jobs,
+        show_progress_bar=True,
+        n_splits=args.n_splits,
+        pruner=args.pruner,
+        storage=args.storage
     )
-    print_metrics(train_metrics, 'train', train_n_long_trades, train_n_short_trades)
-    plot_training_portfolio_value(train_portfolio_value, train_dates, train_data)
 
-    # ---- Evaluation on test set
-    test_backtest_config = BacktestConfig(
-        initial_capital = initial_capital, # Start with the initial capital
-        commission = 0.125 / 100
-    )
-    test_metrics, test_n_long_trades, test_n_short_trades, test_portfolio_value, test_capital = run_backtest(
-        data=test_data, # Just test data
-        config=test_backtest_config,
-        params=best_params
+    # ---- Optimize hyperparameters
+    start_time = time.time()
+    print(f'\n{"=" * 50}\n')
+
+    study = optimize_hyperparameters(
+        data=splits['train'][0],
+        backtest_config=backtest_config,
+        optimization_config=optimization_config,
+        metric=args.metric
     )
-    # Printing test results
-    test_returns = get_returns_table(test_portfolio_value, test_dates)
-    print_metrics(test_metrics, 'test', test_n_long_trades, test_n_short_trades)
-    print_returns_tables(test_returns, initial_capital, test_capital, 'Test', roi_test)
-
-    # ---- Evaluation on validation set
-    valid_backtest_config = BacktestConfig(
-        initial_capital = initial_capital, # Start with the capital from the test set
-        commission = 0.125 / 100
+    end_time = time.time()
+    print(f'\nOptimization completed in {end_time - start_time:.2f} seconds.\n')
+    print_trial_summary(study.user_attrs['trial_summary'])
+    print_cache_stats(study.user_attrs['indicator_cache'], 'Indicator')
+    print_cache_stats(study.user_attrs['result_cache'], 'Result')
+    print_cache_stats(study.user_attrs['backtest_cache'], 'Backtest')
+
+    evaluate(splits, study.best_params, study.best_value, args.metric, args.initial_capital, not args.no_plots)
+
+
+def backtest_command(args: argparse.Namespace) -> None:
+    """
+    Backtest the best hyperparameters on the chosen splits and print the results, without
+    plotting.
+    Args:
+        args (argparse.Namespace): The parsed command line arguments.
+    """
+    from best_params import get_best_params
+
+    best_params, _ = get_best_params(args.storage)
+    splits = load_splits(args.data)
+    for name in args.split:
+        data, dates = splits[name]
+        backtest_split(name, data, dates, best_params, args.initial_capital)
+
+
+def evaluate_command(args: argparse.Namespace) -> None:
+    """
+    Evaluate the best hyperparameters of a previous run (or of a stored study) on every split.
+    Args:
+        args (argparse.Namespace): The parsed command line arguments.
+    """
+    from best_params import get_best_params
+
+    best_params, best_value = get_best_params(args.storage)
+    evaluate(load_splits(args.data), best_params, best_value, args.metric, args.initial_capital, not args.no_plots)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Build the command line parser.
+    Returns:
+        argparse.ArgumentParser: The parser with the optimize, backtest and evaluate subcommands.
+    """
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--data', default=DATA_PATH, help='The price CSV file.')
+    common.add_argument('--initial-capital', type=float, default=INITIAL_CAPITAL,
+                        help='The capital every backtest starts with.')
+    common.add_argument('--storage', default=None,
+                        help="A database URL (e.g. 'sqlite:///optimization.db') or journal file of the "
+                             "study, to save and resume it or to load its best parameters.")
+
+    parser = argparse.ArgumentParser(description='Optimize, backtest and evaluate the trading strategy.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    optimize_parser = subparsers.add_parser(
+        'optimize', parents=[common], help='Optimize the hyperparameters, then evaluate the best ones.'
     )
-    valid_metrics, valid_n_long_trades, valid_n_short_trades, valid_portfolio_value, valid_capital = run_backtest(
-        data = validation_data, # Just validation data
-        config = valid_backtest_config,
-        params = best_params
+    optimize_parser.add_argument('--metric', default='Calmar', choices=['Sharpe', 'Sortino', 'Calmar'],
+                                 help='The metric to maximize.')
+    optimize_parser.add_argument('--n-trials', type=int, default=200, help='Number of optimization trials.')
+    optimize_parser.add_argument('--n-splits', type=int, default=3,
+                                 help='Splits of the time series cross-validation.')
+    optimize_parser.add_argument('--n-jobs', type=int, default=-1, help='Parallel trials (-1 uses all CPUs).')
+    optimize_parser.add_argument('--pruner', default='none', choices=PRUNERS,
+                                 help='The pruner stopping bad trials between splits.')
+    optimize_parser.add_argument('--no-plots', action='store_true', help="Don't plot the portfolio values.")
+    optimize_parser.set_defaults(handler=optimize_command)
+
+    backtest_parser = subparsers.add_parser(
+        'backtest', parents=[common], help='Backtest the best hyperparameters and print the metrics.'
     )
-    # Printing validation results
-    valid_returns = get_returns_table(valid_portfolio_value, valid_dates)
-    print_metrics(valid_metrics, 'validation', valid_n_long_trades, valid_n_short_trades)
-    print_returns_tables(valid_returns, initial_capital, valid_capital, 'Validation', roi_valid)
-
-    # ---- Plot test and validation portfolio values
-    plot_portfolio_value(
-        test_portfolio_value, valid_portfolio_value, test_dates, valid_dates,
-        test_data, validation_data
+    backtest_parser.add_argument('--split', nargs='+', default=list(SPLITS), choices=SPLITS,
+                                 help='The splits to backtest.')
+    backtest_parser.set_defaults(handler=backtest_command)
+
+    evaluate_parser = subparsers.add_parser(
+        'evaluate', parents=[common], help='Evaluate the best hyperparameters on every split.'
     )
+    evaluate_parser.add_argument('--metric', default='Calmar', choices=['Sharpe', 'Sortino', 'Calmar'],
+                                 help='The metric the best hyperparameters were optimized for.')
+    evaluate_parser.add_argument('--no-plots', action='store_true', help="Don't plot the portfolio values.")
+    evaluate_parser.set_defaults(handler=evaluate_command)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> None:
+    """
+    Run the command line interface.
+    Args:
+        argv (list[str] | None): The arguments, None reads them from sys.argv.
+    """
+    args = build_parser().parse_args(argv)
+
+    print('\nBacktesting started...\n')
+    args.handler(args)
     print('\n' + '=' * 50)
     print('\nBacktesting completed.\n')
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
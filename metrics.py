@@ -1,113 +1,174 @@
-import pandas as pd
 import numpy as np
 
+from profiling import profiled
 
-def get_sharpe(data: pd.DataFrame) -> float:
+
+def get_win_rate_from_flags(is_win: np.ndarray) -> float:
     """
-    Calculate the Sharpe ratio of the portfolio.
+    Calculate the win rate from an array of win flags.
     Args:
-        data (pd.DataFrame): A DataFrame containing the portfolio values over time.
-
+        is_win (np.ndarray): A boolean array, True for each closed position that was a win.
     Returns:
-        float: The Sharpe ratio of the portfolio.
+        float: The win rate of the closed positions.
     """
-    mean = data.rets.mean()
-    std = data.rets.std()
-
-    annual_rets = mean * (365*24)
-    annual_std = std * np.sqrt(365*24)
+    if len(is_win) == 0:
+        return 0
 
-    return annual_rets / annual_std if annual_std != 0 else 0
+    return int(np.count_nonzero(is_win)) / len(is_win)
 
 
-def get_sortino(data: pd.DataFrame) -> float:
+def _std(rets: np.ndarray, ddof: int = 1) -> np.ndarray:
     """
-    Calculate the Sortino ratio of the portfolio.
+    Row-wise standard deviation computed the way pandas' Series.std does it (pairwise sums
+    of the values and of the squared deviations), so the results are identical to it.
     Args:
-        data (pd.DataFrame): A DataFrame containing the portfolio values over time.
-
+        rets (np.ndarray): A 2-D array with one return series per row.
+        ddof (int): Delta degrees of freedom.
     Returns:
-        float: The Sortino ratio of the portfolio.
+        np.ndarray: The standard deviation of each row, NaN if it has ddof values or fewer.
     """
-    mean = data.rets.mean()
-    std = data.rets.std()
-    down_risk = data.rets[data.rets < 0].fillna(0).std()
-
-    annual_rets = mean * (365*24)
-    annual_std = std * np.sqrt(365*24)
-    annual_down_risk = down_risk * np.sqrt(365*24)
-
-    return annual_rets / annual_down_risk if annual_std != 0 else 0
+    count = rets.shape[1]
+    if count <= ddof:
+        return np.full(rets.shape[0], np.nan)
+    mean = rets.sum(axis=1) / count
+    return np.sqrt(((mean[:, None] - rets) ** 2).sum(axis=1) / (count - ddof))
 
 
-def get_maximum_drawdown(data: pd.DataFrame) -> float:
+def _downside_std(rets: np.ndarray) -> np.ndarray:
     """
-    Calculate the maximum drawdown of the portfolio.
+    Row-wise sample standard deviation of the negative returns, with the formula of _std.
+    The negative returns of all rows are packed into one flat array and summed per row
+    with np.add.reduceat, so large batches need no Python loop over the rows. reduceat sums
+    sequentially instead of pairwise, so unlike _std the result can differ from pandas'
+    std of the negative returns in the last bits (a relative error of about 1e-16).
     Args:
-        data (pd.DataFrame): A DataFrame containing the portfolio values over time.
-
+        rets (np.ndarray): A 2-D array with one return series per row.
     Returns:
-        float: The maximum drawdown of the portfolio.
+        np.ndarray: The downside deviation of each row, NaN if it has one negative return or fewer.
     """
-    roll_max = data['Value'].cummax()
-    max_drawdown = (roll_max - data['Value']) / roll_max
-    return max_drawdown.max()
-
-
-def get_calmar(data: pd.DataFrame, periods_per_year: int = 365*24) -> float:
+    is_negative = rets < 0
+    count = np.count_nonzero(is_negative, axis=1)
+    down_risk = np.full(rets.shape[0], np.nan)
+    rows = np.flatnonzero(count > 1)
+    if not rows.size:
+        return down_risk
+
+    # The negative returns of the rows with a deviation, row after row
+    negative = rets[is_negative & (count > 1)[:, None]]
+    count = count[rows]
+    starts = np.cumsum(count) - count
+    mean = np.add.reduceat(negative, starts) / count
+    squares = (np.repeat(mean, count) - negative) ** 2
+    down_risk[rows] = np.sqrt(np.add.reduceat(squares, starts) / (count - 1))
+    return down_risk
+
+
+def _score_returns(values: np.ndarray, rets: np.ndarray, periods_per_year: int) -> dict:
     """
-    Calculate the Calmar ratio of the portfolio.
+    Calculate the return based metrics of equity curves whose first bar was dropped.
     Args:
-        data (pd.DataFrame): A DataFrame containing the portfolio values over time.
-        periods_per_year (int): Number of periods in a year. Default is 365*24 for hourly data.
-
+        values (np.ndarray): A 2-D array with the portfolio values of each curve.
+        rets (np.ndarray): A 2-D array with the matching returns, without NaNs.
+        periods_per_year (int): Number of periods in a year.
     Returns:
-        calmar_ratio (float): The Calmar ratio of the portfolio.
+        metrics (dict): An array with one value per equity curve for each metric.
     """
-    mean = data.rets.mean()
+    n_curves, n_rets = rets.shape
+    mean = rets.sum(axis=1) / n_rets if n_rets else np.full(n_curves, np.nan)
+    std = _std(rets)
+    down_risk = _downside_std(rets)
+
     annual_rets = mean * periods_per_year
-    max_drawdown = get_maximum_drawdown(data)
-    return annual_rets / max_drawdown if max_drawdown != 0 else 0
+    annual_std = std * np.sqrt(periods_per_year)
+    annual_down_risk = down_risk * np.sqrt(periods_per_year)
+
+    if n_rets:
+        roll_max = np.maximum.accumulate(values, axis=1)
+        max_drawdown = ((roll_max - values) / roll_max).max(axis=1)
+    else:
+        max_drawdown = np.full(n_curves, np.nan)
+
+    return {
+        'Sharpe': np.where(annual_std != 0, annual_rets / annual_std, 0.),
+        # Scaled by the downside risk but guarded by the total risk
+        'Sortino': np.where(annual_std != 0, annual_rets / annual_down_risk, 0.),
+        'Maximum Drawdown': max_drawdown,
+        'Calmar': np.where(max_drawdown != 0, annual_rets / max_drawdown, 0.)
+    }
 
 
-def get_win_rate(closed_positions: list) -> float:
+def get_equity_metrics(portfolio_values: np.ndarray, periods_per_year: int = 365*24) -> dict:
     """
-    Calculate the win rate of closed positions.
+    Calculate the Sharpe, Sortino, maximum drawdown and Calmar of many equity curves at once.
+    The returns are annualized with periods_per_year; a ratio whose risk is 0 is 0.
     Args:
-        closed_positions (list): A list of closed Position objects.
+        portfolio_values (np.ndarray): A 2-D array with one equity curve per row.
+        periods_per_year (int): Number of periods in a year. Default is 365*24 for hourly data.
     Returns:
-        float: The win rate of the closed positions.
+        metrics (dict): An array with one value per equity curve for each metric.
     """
-    if not closed_positions:
-        return 0
-
-    wins = sum(1 for position in closed_positions if position.is_win)
-    return wins / len(closed_positions)
-
-
-def get_metrics(
-        portfolio_value: list, closed_long_positions: list, closed_short_position: list
+    values = np.asarray(portfolio_values, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rets = values[:, 1:] / values[:, :-1] - 1
+        values = values[:, 1:]
+        is_nan = np.isnan(rets)
+        if not is_nan.any():
+            return _score_returns(values, rets, periods_per_year)
+
+        # Rows lose different bars to dropna, so score each curve on its own
+        rows = [
+            _score_returns(row_values[None, keep], row_rets[None, keep], periods_per_year)
+            for row_values, row_rets, keep in zip(values, rets, ~is_nan)
+        ]
+    return {name: np.concatenate([row[name] for row in rows]) for name in rows[0]}
+
+
+@profiled('get_metrics')
+def get_batch_metrics(
+        portfolio_values: np.ndarray, long_is_win: list[np.ndarray], short_is_win: list[np.ndarray],
+        periods_per_year: int = 365*24
+) -> dict:
+    """
+    Calculate the performance metrics of many backtests over the same bars at once.
+    Args:
+        portfolio_values (np.ndarray): A 2-D array with one equity curve per row.
+        long_is_win (list[np.ndarray]): Win flags of the closed long positions of each backtest.
+        short_is_win (list[np.ndarray]): Win flags of the closed short positions of each backtest.
+        periods_per_year (int): Number of periods in a year. Default is 365*24 for hourly data.
+    Returns:
+        metrics (dict): An array with one value per backtest for each metric.
+    """
+    metrics = get_equity_metrics(portfolio_values, periods_per_year)
+
+    n_long = np.array([len(is_win) for is_win in long_is_win])
+    n_short = np.array([len(is_win) for is_win in short_is_win])
+    long_wins = np.array([np.count_nonzero(is_win) for is_win in long_is_win])
+    short_wins = np.array([np.count_nonzero(is_win) for is_win in short_is_win])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        metrics['Win rate on long positions'] = np.where(n_long > 0, long_wins / n_long, 0.)
+        metrics['Win rate on short positions'] = np.where(n_short > 0, short_wins / n_short, 0.)
+        metrics['General win rate'] = np.where(
+            n_long + n_short > 0, (long_wins + short_wins) / (n_long + n_short), 0.
+        )
+    return metrics
+
+
+def get_metrics_from_flags(
+        portfolio_value: list, long_is_win: np.ndarray, short_is_win: np.ndarray,
+        periods_per_year: int = 365*24
 ) -> dict:
     """
-    Calculate various performance metrics for the backtest.
+    Calculate various performance metrics for the backtest from position win flags.
     Args:
-        portfolio_value (list): A DataFrame containing the portfolio values over time.
-        closed_long_positions (list): A list of closed long Position objects.
-        closed_short_position (list): A list of closed short Position objects.
+        portfolio_value (list): The portfolio values over time.
+        long_is_win (np.ndarray): Win flags of the closed long positions.
+        short_is_win (np.ndarray): Win flags of the closed short positions.
+        periods_per_year (int): Number of periods in a year. Default is 365*24 for hourly data.
     Returns:
         metrics (dict): A dictionary containing various performance metrics.
     """
-    df = pd.DataFrame({'Value': portfolio_value})
-    df['rets'] = df.Value.pct_change()
-    df.dropna(inplace=True)
-
-    metrics = {
-        'Sharpe': get_sharpe(df),
-        'Sortino': get_sortino(df),
-        'Maximum Drawdown': get_maximum_drawdown(df),
-        'Calmar': get_calmar(df),
-        'Win rate on long positions': get_win_rate(closed_long_positions),
-        'Win rate on short positions': get_win_rate(closed_short_position),
-        'General win rate': get_win_rate(closed_long_positions + closed_short_position)
-    }
-    return metrics
\ No newline at end of file
+    metrics = get_batch_metrics(
+        np.asarray(portfolio_value, dtype=np.float64)[None], [long_is_win], [short_is_win],
+        periods_per_year
+    )
+    return {name: float(values[0]) for name, values in metrics.items()}
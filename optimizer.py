@@ -1,3 +1,8 @@
+import os
+import shutil
+import tempfile
+from concurrent.futures import Future, ProcessPoolExecutor
+
 import optuna
 optuna.logging.set_verbosity(optuna.logging.WARNING)
 import pandas as pd
@@ -5,42 +10,643 @@ import numpy as np
 from sklearn.model_selection import TimeSeriesSplit
 
 from config import BacktestConfig, OptimizationConfig
-from backtest import run_backtest
+from backtest import (
+    run_backtest, prepare_signals, run_backtest_on_arrays, run_backtest_batch,
+    run_backtest_batch_on_signals
+)
+from backtest_cache import backtest_cache, get_stats_since
+from indicator_cache import IndicatorCache, indicator_cache
+from indicator_table import IndicatorTable
+from prints import print_profile
+from profiling import profiler, merge_profiles
+from result_cache import ResultCache
+from study_storage import open_storage, load_or_create_study, get_remaining_trials
 from trial_params import get_trial_params
 
+# The BacktestConfig fields a backtest's result depends on; the engine, the cache flags and
+# the ticker don't change it
+RESULT_CONFIG_FIELDS = ('initial_capital', 'commission', 'periods_per_year', 'execution')
+
+# Price columns shared with worker processes through memory-mapped files
+SHARED_COLUMNS = ['Datetime', 'Open', 'High', 'Low', 'Close']
+
+
+def _split_scores(
+        data: pd.DataFrame, backtest_config: BacktestConfig, n_splits: int, metric: str,
+        params: dict, indicator_tables: list[IndicatorTable] | None, full_history_signals: bool
+):
+    """
+    Backtest the cross-validation splits one after another, lazily.
+    Args:
+        data (pd.DataFrame): The historical price data for backtesting.
+        backtest_config (BacktestConfig): Configuration for the backtest.
+        n_splits (int): The number of splits for time series cross-validation.
+        metric (str): The performance metric to return.
+        params (dict): Hyperparameters for the trading strategy.
+        indicator_tables (list[IndicatorTable] | None): Precomputed indicators, one per split
+            (a single one for the full series when full_history_signals is set).
+        full_history_signals (bool): Compute the signals once over the full series and backtest
+            each split on its slice of them.
+    Yields:
+        float: The metric of each split, in split order.
+    """
+    tscv = TimeSeriesSplit(n_splits=n_splits)
+
+    if full_history_signals:
+        table = indicator_tables[0] if indicator_tables is not None else None
+        signals = prepare_signals(data, backtest_config, params, table)
+        buy_signal = signals['buy_signal'].to_numpy()
+        sell_signal = signals['sell_signal'].to_numpy()
+        for _, test_idx in tscv.split(signals):
+            # The splits are contiguous, so slicing gives views instead of copies
+            split = slice(test_idx[0], test_idx[-1] + 1)
+            metrics, _, _, _, _, _ = run_backtest_on_arrays(
+                signals.iloc[split], buy_signal[split], sell_signal[split], backtest_config, params
+            )
+            yield metrics[metric]
+        return
+
+    for split, (_, test_idx) in enumerate(tscv.split(data)):
+        with profiler.stage('split_data'):
+            test_data = data.iloc[test_idx].reset_index(drop=True)
+        table = indicator_tables[split] if indicator_tables is not None else None
+        metrics, _, _, _, _, _ = run_backtest(test_data, backtest_config, params, table)
+        yield metrics[metric]
+
 
 def cross_validated_objective(
         trial, data: pd.DataFrame, backtest_config: BacktestConfig,
-        n_splits: int, metric: str
+        n_splits: int, metric: str, indicator_tables: list[IndicatorTable] | None = None,
+        fold_pool: 'FoldPool | None' = None, full_history_signals: bool = False,
+        result_cache: ResultCache | None = None
 ) -> float:
     """
     Objective function for Optuna hyperparameter optimization with time series cross-validation.
+    The running mean is reported to Optuna after every split, so the study's pruner can
+    stop a bad trial before its remaining splits are backtested.
     Args:
         trial (optuna.trial.Trial): The trial object for suggesting hyperparameters.
         data (pd.DataFrame): The historical price data for backtesting.
         backtest_config (BacktestConfig): Configuration for the backtest.
         n_splits (int): The number of splits for time series cross-validation.
         metric (str): The performance metric to optimize ('Sharpe', 'Sortino', 'Calmar').
+        indicator_tables (list[IndicatorTable] | None): Precomputed indicators, one per split
+            (a single one for the full series when full_history_signals is set).
+        fold_pool (FoldPool | None): If given, the splits are backtested concurrently on this pool.
+        full_history_signals (bool): Compute the signals once over the full series and backtest
+            each split on its slice, so no split loses its indicator warm-up bars.
+        result_cache (ResultCache | None): If given, parameter sets scored before are not
+            backtested again.
     Returns:
         float: The average performance metric across all cross-validation splits.
+    Raises:
+        optuna.TrialPruned: If the pruner stops the trial.
     """
-    data = data.copy()
-    params = get_trial_params(trial)
+    with profiler.trial(trial):
+        params = get_trial_params(trial)
+        if result_cache is not None:
+            score = result_cache.get(params)
+            if score is not None:
+                trial.set_user_attr('cached', True)
+                return score
 
-    tscv = TimeSeriesSplit(n_splits=n_splits)
-    scores = []
+        futures = []
+        if fold_pool is not None:
+            signals = None
+            if full_history_signals:
+                table = indicator_tables[0] if indicator_tables is not None else None
+                signals = prepare_signals(data, backtest_config, params, table)
+            futures = fold_pool.submit(params, metric, signals)
+            split_scores = (future.result() for future in futures)
+        else:
+            split_scores = _split_scores(
+                data, backtest_config, n_splits, metric, params, indicator_tables, full_history_signals
+            )
 
-    for _, test_idx in tscv.split(data):
-        test_data = data.iloc[test_idx].reset_index(drop=True)
-        metrics, _, _, _, _ = run_backtest(test_data, backtest_config, params)
-        scores.append(metrics[metric])
+        scores = []
+        for split, score in enumerate(split_scores):
+            scores.append(score)
+            trial.report(float(np.mean(scores)), step=split)
+            if trial.should_prune():
+                for future in futures:
+                    future.cancel()
+                raise optuna.TrialPruned()
 
-    return float(np.mean(scores))
+        score = float(np.mean(scores))
+        if result_cache is not None:
+            result_cache.put(params, score)
+        return score
 
 
-def optimize_hyperparameters(
+def _optimize_in_batches(
+        study: optuna.study.Study, data: pd.DataFrame, backtest_config: BacktestConfig,
+        optimization_config: OptimizationConfig, metric: str,
+        indicator_tables: list[IndicatorTable] | None, n_trials: int,
+        result_cache: ResultCache | None = None
+) -> None:
+    """
+    Run trials in batches through Optuna's ask/tell interface. Every split is backtested
+    for the whole batch at once with run_backtest_batch, and the running mean of each trial
+    is reported after every split so the pruner can drop trials from the later splits.
+    When profiling, every trial of a batch gets the timings of the whole batch.
+    Trials whose parameters are in the result cache are told their score right away.
+    Args:
+        study (optuna.study.Study): The study to run the trials of.
+        data (pd.DataFrame): The historical price data for backtesting.
+        backtest_config (BacktestConfig): Configuration for the backtest.
+        optimization_config (OptimizationConfig): Configuration for the optimization process.
+        metric (str): The performance metric to optimize ('Sharpe', 'Sortino', 'Calmar').
+        indicator_tables (list[IndicatorTable] | None): Precomputed indicators, one per split
+            (a single one for the full series when full_history_signals is set).
+        n_trials (int): The number of trials to run.
+        result_cache (ResultCache | None): If given, parameter sets scored before are not
+            backtested again.
+    """
+    tscv = TimeSeriesSplit(n_splits=optimization_config.n_splits)
+    split_indices = [test_idx for _, test_idx in tscv.split(data)]
+
+    remaining = n_trials
+    while remaining > 0:
+        trials, params_list = [], []
+        for _ in range(min(optimization_config.batch_size, remaining)):
+            trial = study.ask()
+            params = get_trial_params(trial)
+            score = result_cache.get(params) if result_cache is not None else None
+            if score is not None:
+                trial.set_user_attr('cached', True)
+                study.tell(trial, score)
+            else:
+                trials.append(trial)
+                params_list.append(params)
+        remaining -= min(optimization_config.batch_size, remaining)
+        if not trials:
+            continue
+        scores = [[] for _ in trials]
+        active = list(range(len(trials)))
+
+        try:
+            with profiler.trial(*trials):
+                signals_list = None
+                if optimization_config.full_history_signals:
+                    table = indicator_tables[0] if indicator_tables is not None else None
+                    signals_list = [
+                        prepare_signals(data, backtest_config, params, table) for params in params_list
+                    ]
+
+                for split, test_idx in enumerate(split_indices):
+                    if not active:
+                        break
+                    if signals_list is not None:
+                        results = run_backtest_batch_on_signals(
+                            [signals_list[i].iloc[test_idx].reset_index(drop=True) for i in active],
+                            backtest_config, [params_list[i] for i in active]
+                        )
+                    else:
+                        table = indicator_tables[split] if indicator_tables is not None else None
+                        results = run_backtest_batch(
+                            data.iloc[test_idx].reset_index(drop=True), backtest_config,
+                            [params_list[i] for i in active], table
+                        )
+
+                    still_active = []
+                    for i, (metrics, _, _, _, _, _) in zip(active, results):
+                        scores[i].append(metrics[metric])
+                        trials[i].report(float(np.mean(scores[i])), step=split)
+                        if not trials[i].should_prune():
+                            still_active.append(i)
+                    active = still_active
+        except Exception:
+            for trial in trials:
+                study.tell(trial, state=optuna.trial.TrialState.FAIL)
+            raise
+
+        for i, trial in enumerate(trials):
+            if i in active:
+                score = float(np.mean(scores[i]))
+                if result_cache is not None:
+                    result_cache.put(params_list[i], score)
+                study.tell(trial, score)
+            else:
+                study.tell(trial, state=optuna.trial.TrialState.PRUNED)
+
+
+def make_pruner(name: str, n_splits: int) -> optuna.pruners.BasePruner:
+    """
+    Create the Optuna pruner used to stop trials between cross-validation splits.
+    Args:
+        name (str): The pruner name ('none', 'median', 'successive_halving', 'hyperband').
+        n_splits (int): The number of splits for time series cross-validation.
+    Returns:
+        optuna.pruners.BasePruner: The pruner.
+    """
+    pruners = {
+        'none': lambda: optuna.pruners.NopPruner(),
+        'median': lambda: optuna.pruners.MedianPruner(n_startup_trials=5),
+        'successive_halving': lambda: optuna.pruners.SuccessiveHalvingPruner(min_resource=1),
+        'hyperband': lambda: optuna.pruners.HyperbandPruner(min_resource=1, max_resource=n_splits),
+    }
+    if name not in pruners:
+        raise ValueError(f"Unknown pruner '{name}'. Choose from {list(pruners)}.")
+    return pruners[name]()
+
+
+def make_result_cache(
         data: pd.DataFrame, backtest_config: BacktestConfig,
         optimization_config: OptimizationConfig, metric: str
+) -> ResultCache:
+    """
+    Create the cache of cross-validated scores for an optimization. Its context holds
+    everything a score depends on besides the parameters, so switching e.g. the engine or
+    the cache flags keeps a persisted cache valid.
+    Args:
+        data (pd.DataFrame): The historical price data for backtesting.
+        backtest_config (BacktestConfig): Configuration for the backtest.
+        optimization_config (OptimizationConfig): Configuration for the optimization process.
+        metric (str): The performance metric to optimize ('Sharpe', 'Sortino', 'Calmar').
+    Returns:
+        ResultCache: The cache, persisted to optimization_config.result_cache if set.
+    """
+    context = {
+        'data': IndicatorCache.fingerprint(data),
+        'backtest_config': {name: getattr(backtest_config, name) for name in RESULT_CONFIG_FIELDS},
+        'metric': metric,
+        'n_splits': optimization_config.n_splits,
+        'full_history_signals': optimization_config.full_history_signals,
+    }
+    return ResultCache(context, optimization_config.result_cache)
+
+
+def get_trial_summary(study: optuna.study.Study) -> dict:
+    """
+    Count the trials of a study by state.
+    Args:
+        study (optuna.study.Study): The study.
+    Returns:
+        dict: The number of complete, pruned and failed trials.
+    """
+    states = [trial.state for trial in study.trials]
+    return {
+        'complete': states.count(optuna.trial.TrialState.COMPLETE),
+        'pruned': states.count(optuna.trial.TrialState.PRUNED),
+        'failed': states.count(optuna.trial.TrialState.FAIL),
+    }
+
+
+def build_indicator_tables(
+        data: pd.DataFrame, optimization_config: OptimizationConfig
+) -> list[IndicatorTable] | None:
+    """
+    Precompute the indicator tables of every cross-validation split, if enabled.
+    Args:
+        data (pd.DataFrame): The historical price data for backtesting.
+        optimization_config (OptimizationConfig): Configuration for the optimization process.
+    Returns:
+        list[IndicatorTable] | None: One table per split (a single table for the full series
+            with full_history_signals), or None if precomputing is disabled.
+    """
+    if not optimization_config.precompute_indicators:
+        return None
+
+    if optimization_config.full_history_signals:
+        return [IndicatorTable.build(data, directory=optimization_config.indicator_table_dir)]
+
+    tscv = TimeSeriesSplit(n_splits=optimization_config.n_splits)
+    return [
+        IndicatorTable.build(
+            data.iloc[test_idx].reset_index(drop=True),
+            directory=optimization_config.indicator_table_dir
+        )
+        for _, test_idx in tscv.split(data)
+    ]
+
+
+def share_data(data: pd.DataFrame, directory: str) -> None:
+    """
+    Write the price columns to .npy files so worker processes can memory-map them.
+    Args:
+        data (pd.DataFrame): The historical price data.
+        directory (str): The directory to write the files to.
+    """
+    for column in SHARED_COLUMNS:
+        if column not in data:
+            continue
+        if column == 'Datetime':
+            values = data[column].to_numpy(dtype='datetime64[ns]').view(np.int64)
+        else:
+            values = data[column].to_numpy(dtype=np.float64)
+        np.save(os.path.join(directory, f'{column}.npy'), values)
+
+
+def load_shared_data(directory: str) -> pd.DataFrame:
+    """
+    Rebuild the price DataFrame from the memory-mapped files written by share_data.
+    Args:
+        directory (str): The directory the files were written to.
+    Returns:
+        pd.DataFrame: The historical price data.
+    """
+    data = {}
+    for column in SHARED_COLUMNS:
+        path = os.path.join(directory, f'{column}.npy')
+        if os.path.exists(path):
+            values = np.load(path, mmap_mode='r')
+            data[column] = pd.to_datetime(values) if column == 'Datetime' else values
+    return pd.DataFrame(data, copy=False)
+
+
+def _init_fold_worker(
+        data_dir: str, backtest_config: BacktestConfig, optimization_config: OptimizationConfig
+) -> None:
+    """
+    Load the shared data and split boundaries once per fold worker process.
+    Args:
+        data_dir (str): The directory with the shared price data.
+        backtest_config (BacktestConfig): Configuration for the backtest.
+        optimization_config (OptimizationConfig): Configuration for the optimization process.
+    """
+    data = load_shared_data(data_dir)
+    tscv = TimeSeriesSplit(n_splits=optimization_config.n_splits)
+    _fold_worker_state['splits'] = [
+        data.iloc[test_idx].reset_index(drop=True) for _, test_idx in tscv.split(data)
+    ]
+    # With full history signals the parent computes the signals, so the workers need no tables
+    _fold_worker_state['indicator_tables'] = (
+        None if optimization_config.full_history_signals
+        else build_indicator_tables(data, optimization_config)
+    )
+    _fold_worker_state['backtest_config'] = backtest_config
+
+
+def _run_fold(
+        split: int, params: dict, metric: str, signals: tuple[np.ndarray, np.ndarray] | None = None
+) -> float:
+    """
+    Backtest one cross-validation split inside a fold worker process.
+    Args:
+        split (int): The index of the split.
+        params (dict): Hyperparameters for the trading strategy.
+        metric (str): The performance metric to return.
+        signals (tuple[np.ndarray, np.ndarray] | None): Precomputed buy and sell signals of the
+            split. If None, the signals are computed on the split itself.
+    Returns:
+        float: The metric of the split.
+    """
+    if signals is not None:
+        metrics, _, _, _, _, _ = run_backtest_on_arrays(
+            _fold_worker_state['splits'][split], *signals, _fold_worker_state['backtest_config'], params
+        )
+        return metrics[metric]
+
+    indicator_tables = _fold_worker_state['indicator_tables']
+    table = indicator_tables[split] if indicator_tables is not None else None
+    metrics, _, _, _, _, _ = run_backtest(
+        _fold_worker_state['splits'][split], _fold_worker_state['backtest_config'], params, table
+    )
+    return metrics[metric]
+
+
+# Per-process state of the fold workers, filled by _init_fold_worker
+_fold_worker_state: dict = {}
+
+
+class FoldPool:
+    """
+    Pool of worker processes that backtests the cross-validation splits of a trial
+    concurrently. The workers load the data once and are reused by every trial.
+    Attributes:
+        n_splits (int): The number of cross-validation splits.
+    """
+
+    def __init__(
+            self, data: pd.DataFrame, backtest_config: BacktestConfig,
+            optimization_config: OptimizationConfig
+    ):
+        self.n_splits = optimization_config.n_splits
+        tscv = TimeSeriesSplit(n_splits=self.n_splits)
+        self._split_indices = [test_idx for _, test_idx in tscv.split(data)]
+        self._work_dir = tempfile.mkdtemp(prefix='folds_')
+        share_data(data, self._work_dir)
+        self._executor = ProcessPoolExecutor(
+            max_workers=optimization_config.fold_workers,
+            initializer=_init_fold_worker,
+            initargs=(self._work_dir, backtest_config, optimization_config)
+        )
+
+    def submit(self, params: dict, metric: str, signals: pd.DataFrame | None = None) -> list[Future]:
+        """
+        Start backtesting every split with the given parameters.
+        Args:
+            params (dict): Hyperparameters for the trading strategy.
+            metric (str): The performance metric to return.
+            signals (pd.DataFrame | None): Signals computed over the full series. Only the
+                split slices of the buy and sell signals are sent to the workers.
+        Returns:
+            list[Future]: One future per split, in split order, resolving to the split metric.
+        """
+        futures = []
+        for split, test_idx in enumerate(self._split_indices):
+            split_signals = None
+            if signals is not None:
+                split_signals = (
+                    signals['buy_signal'].to_numpy()[test_idx], signals['sell_signal'].to_numpy()[test_idx]
+                )
+            futures.append(self._executor.submit(_run_fold, split, params, metric, split_signals))
+        return futures
+
+    def close(self) -> None:
+        """
+        Shut the workers down and remove the shared data files.
+        """
+        self._executor.shutdown()
+        shutil.rmtree(self._work_dir, ignore_errors=True)
+
+    def __enter__(self) -> 'FoldPool':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _optimize_worker(
+        study_name: str, storage: str, data_dir: str, backtest_config: BacktestConfig,
+        optimization_config: OptimizationConfig, metric: str, n_trials: int
+) -> tuple[dict, dict, dict, dict]:
+    """
+    Run trials of a shared study inside a worker process.
+    Args:
+        study_name (str): The name of the study to load.
+        storage (str): The database URL or journal file path holding the study.
+        data_dir (str): The directory with the shared price data.
+        backtest_config (BacktestConfig): Configuration for the backtest.
+        optimization_config (OptimizationConfig): Configuration for the optimization process.
+        metric (str): The performance metric to optimize ('Sharpe', 'Sortino', 'Calmar').
+        n_trials (int): The number of trials this worker runs.
+    Returns:
+        indicator_cache_stats (dict): The indicator cache statistics of this task.
+        result_cache_stats (dict): The result cache statistics of the worker.
+        backtest_cache_stats (dict): The backtest cache statistics of this task.
+        profile (dict): The profiler summary of the worker, empty unless profiling.
+    """
+    data = load_shared_data(data_dir)
+    indicator_tables = build_indicator_tables(data, optimization_config)
+    result_cache = make_result_cache(data, backtest_config, optimization_config, metric)
+    study = optuna.load_study(
+        study_name=study_name, storage=open_storage(storage),
+        pruner=make_pruner(optimization_config.pruner, optimization_config.n_splits)
+    )
+
+    def objective(trial):
+        return cross_validated_objective(
+            trial, data, backtest_config, optimization_config.n_splits, metric, indicator_tables,
+            full_history_signals=optimization_config.full_history_signals, result_cache=result_cache
+        )
+
+    # A worker process may run more than one task (and a forked one inherits the parent's
+    # caches), so only this task's lookups and stages are returned
+    indicator_stats = indicator_cache.stats()
+    backtest_stats = backtest_cache.stats()
+    profiler.reset()
+    if optimization_config.profile:
+        profiler.enable(optimization_config.profile_memory)
+    try:
+        if optimization_config.batch_size > 1:
+            _optimize_in_batches(
+                study, data, backtest_config, optimization_config, metric, indicator_tables, n_trials,
+                result_cache
+            )
+        else:
+            study.optimize(objective, n_trials=n_trials, n_jobs=1)
+    finally:
+        profiler.disable()
+    return (
+        get_stats_since(indicator_stats, indicator_cache.stats()), result_cache.stats(),
+        get_stats_since(backtest_stats, backtest_cache.stats()), profiler.summary()
+    )
+
+
+def _enqueue_trials(study: optuna.study.Study, params_list: list[dict] | None) -> None:
+    """
+    Enqueue parameter sets as the first trials of a new study. A resumed study already
+    ran them, so nothing is enqueued if the study has trials.
+    Args:
+        study (optuna.study.Study): The study.
+        params_list (list[dict] | None): The parameter sets to try first.
+    """
+    if not params_list or study.get_trials(deepcopy=False):
+        return
+    for params in params_list:
+        study.enqueue_trial(params, skip_if_exists=True)
+
+
+def _report_profile(study: optuna.study.Study, summary: dict) -> None:
+    """
+    Store the profiler summary of an optimization in the study and print it.
+    Args:
+        study (optuna.study.Study): The study.
+        summary (dict): The profiler summary.
+    """
+    study.set_user_attr('profile', summary)
+    print_profile(summary)
+
+
+def _merge_cache_stats(stats_list: list[dict]) -> dict:
+    """
+    Combine the cache statistics of several worker processes. Hits and misses are added up.
+    Every worker holds its own cache, and forked workers start from a copy of the parent's
+    entries, so entries and nbytes are those of the largest worker cache instead of a sum.
+    Args:
+        stats_list (list[dict]): The statistics of every worker.
+    Returns:
+        dict: The combined hits, misses and hit rate, and the entries (and nbytes, if the
+            caches report it) of one worker.
+    """
+    hits = sum(stats['hits'] for stats in stats_list)
+    misses = sum(stats['misses'] for stats in stats_list)
+    merged = {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+        'entries': max(stats['entries'] for stats in stats_list)
+    }
+    if all('nbytes' in stats for stats in stats_list):
+        merged['nbytes'] = max(stats['nbytes'] for stats in stats_list)
+    return merged
+
+
+def _optimize_in_processes(
+        data: pd.DataFrame, backtest_config: BacktestConfig,
+        optimization_config: OptimizationConfig, metric: str,
+        warm_start_params: list[dict] | None = None
+) -> optuna.study.Study:
+    """
+    Run the optimization on a pool of worker processes sharing one storage.
+    The price data is written once to memory-mapped files instead of being pickled
+    to every worker.
+    Args:
+        data (pd.DataFrame): The historical price data for backtesting.
+        backtest_config (BacktestConfig): Configuration for the backtest.
+        optimization_config (OptimizationConfig): Configuration for the optimization process.
+        metric (str): The performance metric to optimize ('Sharpe', 'Sortino', 'Calmar').
+        warm_start_params (list[dict] | None): Parameter sets to enqueue as the first trials.
+    Returns:
+        optuna.study.Study: The study object containing optimization results.
+    """
+    study_name = optimization_config.study_name
+    work_dir = tempfile.mkdtemp(prefix='optimization_')
+    storage = optimization_config.storage or os.path.join(work_dir, 'study.log')
+    try:
+        share_data(data, work_dir)
+        study = load_or_create_study(
+            storage, study_name, optimization_config.direction,
+            make_pruner(optimization_config.pruner, optimization_config.n_splits)
+        )
+        _enqueue_trials(study, warm_start_params)
+        n_trials = get_remaining_trials(study, optimization_config.n_trials)
+        n_workers = optimization_config.n_jobs if optimization_config.n_jobs > 0 else os.cpu_count()
+        n_workers = max(min(n_workers, n_trials), 1)
+        # Build memory-mapped indicator tables once so the workers only load them
+        if optimization_config.precompute_indicators and optimization_config.indicator_table_dir:
+            build_indicator_tables(data, optimization_config)
+
+        base, extra = divmod(n_trials, n_workers)
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            futures = [
+                executor.submit(
+                    _optimize_worker, study_name, storage, work_dir, backtest_config,
+                    optimization_config, metric, base + (worker < extra)
+                )
+                for worker in range(n_workers)
+            ]
+            indicator_stats, result_stats, backtest_stats, profiles = zip(
+                *(future.result() for future in futures)
+            )
+
+        if optimization_config.storage is None:
+            # Move the finished study to memory before the temporary journal is removed
+            memory_storage = optuna.storages.InMemoryStorage()
+            optuna.copy_study(
+                from_study_name=study_name, from_storage=open_storage(storage), to_storage=memory_storage
+            )
+            study = optuna.load_study(study_name=study_name, storage=memory_storage)
+        study.set_user_attr('trial_summary', get_trial_summary(study))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    study.set_user_attr('result_cache', _merge_cache_stats(result_stats))
+    if backtest_config.cache_indicators:
+        study.set_user_attr('indicator_cache', _merge_cache_stats(indicator_stats))
+    if backtest_config.cache_backtests:
+        study.set_user_attr('backtest_cache', _merge_cache_stats(backtest_stats))
+    if optimization_config.profile:
+        _report_profile(study, merge_profiles(profiles))
+    return study
+
+
+def optimize_hyperparameters(
+        data: pd.DataFrame, backtest_config: BacktestConfig,
+        optimization_config: OptimizationConfig, metric: str,
+        indicator_tables: list[IndicatorTable] | None = None,
+        warm_start_params: list[dict] | None = None
 ) -> optuna.study.Study:
     """
     Optimize hyperparameters using Optuna.
@@ -49,24 +655,102 @@ def optimize_hyperparameters(
         backtest_config (BacktestConfig): Configuration for the backtest.
         optimization_config (OptimizationConfig): Configuration for the optimization process.
         metric (str): The performance metric to optimize ('Sharpe', 'Sortino', 'Calmar').
+        indicator_tables (list[IndicatorTable] | None): Indicator tables to use instead of
+            building them, one per split (a single one for the full series when
+            full_history_signals is set). Only supported by the 'thread' backend.
+        warm_start_params (list[dict] | None): Parameter sets to enqueue as the first trials,
+            e.g. the best trials of an earlier study.
     Returns:
         optuna.study.Study: The study object containing optimization results.
     """
+    if optimization_config.parallel_backend not in ('thread', 'process'):
+        raise ValueError(
+            f"Unknown parallel backend '{optimization_config.parallel_backend}'. "
+            "Choose from ['thread', 'process']."
+        )
+
+    if optimization_config.parallel_backend == 'process' and optimization_config.fold_workers > 1:
+        raise ValueError("fold_workers can't be combined with the 'process' parallel backend.")
+
+    if optimization_config.batch_size > 1 and optimization_config.fold_workers > 1:
+        raise ValueError("fold_workers can't be combined with batch_size > 1.")
+
+    if optimization_config.parallel_backend == 'process' and indicator_tables is not None:
+        raise ValueError("indicator_tables can't be combined with the 'process' parallel backend.")
+
+    # tracemalloc's peak is process-wide, so concurrent trial threads would reset each other's
+    if (
+            optimization_config.profile and optimization_config.profile_memory
+            and optimization_config.parallel_backend == 'thread'
+            and optimization_config.n_jobs != 1 and optimization_config.batch_size == 1
+    ):
+        raise ValueError(
+            "profile_memory needs n_jobs=1 with the 'thread' parallel backend "
+            "(or the 'process' backend)."
+        )
+
+    if optimization_config.parallel_backend == 'process':
+        print("\nStarting hyperparameter optimization on worker processes...\n")
+        return _optimize_in_processes(
+            data, backtest_config, optimization_config, metric, warm_start_params
+        )
+
+    fold_pool = None
+    if optimization_config.fold_workers > 1:
+        print("\nStarting fold workers...")
+        fold_pool = FoldPool(data, backtest_config, optimization_config)
+    # Fold workers compute split signals themselves unless the signals come from the full series
+    if indicator_tables is None and (fold_pool is None or optimization_config.full_history_signals):
+        if optimization_config.precompute_indicators:
+            print("\nPrecomputing indicators for the search space...")
+        indicator_tables = build_indicator_tables(data, optimization_config)
+
     print("\nStarting hyperparameter optimization...\n")
 
+    result_cache = make_result_cache(data, backtest_config, optimization_config, metric)
+
     def objective(trial):
         return cross_validated_objective(
-            trial, data, backtest_config, optimization_config.n_splits, metric
+            trial, data, backtest_config, optimization_config.n_splits, metric,
+            indicator_tables, fold_pool, optimization_config.full_history_signals, result_cache
         )
 
-    study = optuna.create_study(
-        direction=optimization_config.direction,
-        study_name='Hyperparameter Optimization'
-    )
-    study.optimize(
-        objective,
-        n_trials=optimization_config.n_trials,
-        n_jobs=optimization_config.n_jobs,
-        show_progress_bar=optimization_config.show_progress_bar
+    study = load_or_create_study(
+        optimization_config.storage, optimization_config.study_name, optimization_config.direction,
+        make_pruner(optimization_config.pruner, optimization_config.n_splits)
     )
-    return study
\ No newline at end of file
+    _enqueue_trials(study, warm_start_params)
+    n_trials = get_remaining_trials(study, optimization_config.n_trials)
+    # The backtest cache is shared, so the study's hit rate is the change of its counters
+    backtest_stats = backtest_cache.stats()
+    if optimization_config.profile:
+        profiler.reset()
+        profiler.enable(optimization_config.profile_memory)
+    try:
+        if optimization_config.batch_size > 1:
+            _optimize_in_batches(
+                study, data, backtest_config, optimization_config, metric, indicator_tables,
+                n_trials, result_cache
+            )
+        else:
+            study.optimize(
+                objective,
+                n_trials=n_trials,
+                n_jobs=optimization_config.n_jobs,
+                show_progress_bar=optimization_config.show_progress_bar
+            )
+    finally:
+        profiler.disable()
+        if fold_pool is not None:
+            fold_pool.close()
+    study.set_user_attr('trial_summary', get_trial_summary(study))
+    study.set_user_attr('result_cache', result_cache.stats())
+    if backtest_config.cache_indicators:
+        study.set_user_attr('indicator_cache', indicator_cache.stats())
+    if backtest_config.cache_backtests:
+        study.set_user_attr('backtest_cache', get_stats_since(backtest_stats, backtest_cache.stats()))
+    if indicator_tables is not None:
+        study.set_user_attr('indicator_tables', [table.stats() for table in indicator_tables])
+    if optimization_config.profile:
+        _report_profile(study, profiler.summary())
+    return study
@@ -56,4 +56,41 @@ def print_returns_tables(
     print(f'Final Capital: ${final_capital:,.4f}')
     print(f'Net Profit: ${final_capital - initial_capital:,.4f}')
     print(f'Total Return on Investment: {(final_capital - initial_capital) / initial_capital * 100:.4f}%')
-    print(f'Buy and Hold estrategy ROI for Comparison: {buy_and_hold_roi * 100:.4f}%')
\ No newline at end of file
+    print(f'Buy and Hold estrategy ROI for Comparison: {buy_and_hold_roi * 100:.4f}%')
+
+
+def print_cache_stats(stats: dict, name: str) -> None:
+    """
+    Print the hit/miss counters of a cache.
+    Args:
+        stats (dict): The cache statistics with 'hits', 'misses' and 'hit_rate' keys.
+        name (str): The name of the cache.
+    """
+    print(f'\n{name} cache: {stats["hits"]} hits, {stats["misses"]} misses '
+          f'({stats["hit_rate"] * 100:.2f}% hit rate)')
+
+
+def print_trial_summary(trial_summary: dict) -> None:
+    """
+    Print how many trials of the study completed, were pruned or failed.
+    Args:
+        trial_summary (dict): The number of trials per state.
+    """
+    print('\nTrials:')
+    for state, count in trial_summary.items():
+        print(f'  {state.capitalize()}: {count}')
+
+
+def print_profile(profile: dict) -> None:
+    """
+    Print the profiled stages of an optimization, slowest first.
+    Args:
+        profile (dict): The profiler summary: calls, total and self seconds and allocated MB per stage.
+    """
+    total = sum(stats['self_seconds'] for stats in profile.values())
+    print('\nProfile:')
+    print(f'  {"Stage":<24} {"Calls":>8} {"Total (s)":>11} {"Self (s)":>10} {"Self %":>7} {"Alloc (MB)":>11}')
+    for stage, stats in sorted(profile.items(), key=lambda item: item[1]['self_seconds'], reverse=True):
+        share = stats['self_seconds'] / total * 100 if total else 0.0
+        print(f'  {stage:<24} {stats["calls"]:>8} {stats["seconds"]:>11.3f} {stats["self_seconds"]:>10.3f} '
+              f'{share:>6.1f}% {stats["allocated_mb"]:>11.1f}')
@@ -0,0 +1,236 @@
+import functools
+import threading
+import time
+import tracemalloc
+from contextlib import nullcontext
+from typing import Callable
+
+# Shared no-op context returned while profiling is disabled
+_DISABLED = nullcontext()
+
+
+class _Stage:
+    """
+    Context manager timing one run of a profiled stage. Time spent in nested stages is
+    subtracted from the stage's self time, so a stage's own work (e.g. the bar loop of an
+    engine) shows apart from the functions it calls.
+    """
+    __slots__ = ('profiler', 'name', 'start', 'child_seconds', 'memory_start', 'child_peak')
+
+    def __init__(self, profiler: 'Profiler', name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self) -> '_Stage':
+        stack = self.profiler._stack()
+        self.child_seconds = 0.0
+        if self.profiler.track_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            # The peak is reset for this stage, so hand the one reached so far to the parent
+            if stack:
+                stack[-1].child_peak = max(stack[-1].child_peak, peak)
+            self.memory_start = current
+            self.child_peak = 0
+            tracemalloc.reset_peak()
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        seconds = time.perf_counter() - self.start
+        stack = self.profiler._stack()
+        stack.pop()
+        allocated = 0
+        if self.profiler.track_memory:
+            peak = max(tracemalloc.get_traced_memory()[1], self.child_peak)
+            allocated = max(peak - self.memory_start, 0)
+            if stack:
+                stack[-1].child_peak = max(stack[-1].child_peak, peak)
+        if stack:
+            stack[-1].child_seconds += seconds
+        self.profiler._record(self.name, seconds, seconds - self.child_seconds, allocated)
+
+
+class Profiler:
+    """
+    Opt-in registry adding up the wall time, call count and allocations of named stages
+    (indicator functions, get_signals, the backtest phases, the metrics) across trials.
+    While disabled, stage() returns a shared no-op context and a profiled function costs a
+    single flag check per call.
+    Attributes:
+        enabled (bool): Whether stages are being recorded.
+        track_memory (bool): Whether the memory allocated by every stage is measured with
+            tracemalloc. It slows the profiled code down noticeably. The tracemalloc peak is
+            process-wide and every stage resets it, so the measures are only right while one
+            thread at a time runs profiled stages.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.track_memory = False
+        self._owns_tracemalloc = False
+        self._totals: dict[str, list] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def enable(self, track_memory: bool = False) -> None:
+        """
+        Start recording stages.
+        Args:
+            track_memory (bool): Whether to measure the allocations of every stage too.
+        """
+        self.track_memory = track_memory
+        self._owns_tracemalloc = track_memory and not tracemalloc.is_tracing()
+        if self._owns_tracemalloc:
+            tracemalloc.start()
+        self.enabled = True
+
+    def disable(self) -> None:
+        """
+        Stop recording stages. The recorded totals are kept until reset.
+        """
+        self.enabled = False
+        self.track_memory = False
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+
+    def reset(self) -> None:
+        """
+        Clear the recorded totals.
+        """
+        with self._lock:
+            self._totals.clear()
+
+    def stage(self, name: str):
+        """
+        Return a context manager timing the code it wraps as the stage name.
+        Args:
+            name (str): The name of the stage.
+        Returns:
+            A context manager, a no-op one if profiling is disabled.
+        """
+        if not self.enabled:
+            return _DISABLED
+        return _Stage(self, name)
+
+    def trial(self, *trials):
+        """
+        Return a context manager collecting the self time of the stages run by the current
+        thread inside it and storing them in the 'profile' user attribute of Optuna trials.
+        Trials backtested together in a batch all get the timings of the batch.
+        Args:
+            trials (optuna.trial.Trial): The trials being run.
+        Returns:
+            A context manager, a no-op one if profiling is disabled.
+        """
+        if not self.enabled:
+            return _DISABLED
+        return _TrialProfile(self, trials)
+
+    def summary(self) -> dict:
+        """
+        Return the recorded totals of every stage.
+        Returns:
+            dict: Per stage, its calls, total and self seconds, and the memory it allocated in
+                MB: the peak above the memory in use when a call starts, summed over the calls.
+        """
+        with self._lock:
+            return {
+                name: {
+                    'calls': calls,
+                    'seconds': seconds,
+                    'self_seconds': self_seconds,
+                    'allocated_mb': allocated / 2**20,
+                }
+                for name, (calls, seconds, self_seconds, allocated) in self._totals.items()
+            }
+
+    def _stack(self) -> list:
+        """
+        Return the stages open on the current thread.
+        """
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record(self, name: str, seconds: float, self_seconds: float, allocated: int) -> None:
+        """
+        Add one run of a stage to the totals and to the trial open on the current thread.
+        """
+        with self._lock:
+            totals = self._totals.setdefault(name, [0, 0.0, 0.0, 0])
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] += self_seconds
+            totals[3] += allocated
+        trial_totals = getattr(self._local, 'trial', None)
+        if trial_totals is not None:
+            trial_totals[name] = trial_totals.get(name, 0.0) + self_seconds
+
+
+class _TrialProfile:
+    """
+    Context manager collecting the self time of the stages trials run on their thread.
+    """
+    __slots__ = ('profiler', 'trials', 'previous')
+
+    def __init__(self, profiler: Profiler, trials: tuple):
+        self.profiler = profiler
+        self.trials = trials
+
+    def __enter__(self) -> '_TrialProfile':
+        self.previous = getattr(self.profiler._local, 'trial', None)
+        self.profiler._local.trial = {}
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        timings = self.profiler._local.trial
+        self.profiler._local.trial = self.previous
+        for trial in self.trials:
+            trial.set_user_attr('profile', timings)
+
+
+def merge_profiles(summaries: list[dict]) -> dict:
+    """
+    Add up the profiler summaries of several processes.
+    Args:
+        summaries (list[dict]): The Profiler.summary of every process.
+    Returns:
+        dict: The combined summary.
+    """
+    merged = {}
+    for summary in summaries:
+        for name, stats in summary.items():
+            totals = merged.setdefault(
+                name, {'calls': 0, 'seconds': 0.0, 'self_seconds': 0.0, 'allocated_mb': 0.0}
+            )
+            totals['calls'] += stats['calls']
+            totals['seconds'] += stats['seconds']
+            totals['self_seconds'] += stats['self_seconds']
+            totals['allocated_mb'] += stats['allocated_mb']
+    return merged
+
+
+def profiled(name: str) -> Callable:
+    """
+    Decorator recording every call of a function as the stage name of the shared profiler.
+    Args:
+        name (str): The name of the stage.
+    Returns:
+        Callable: The decorator.
+    """
+    def decorator(function: Callable) -> Callable:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return function(*args, **kwargs)
+            with _Stage(profiler, name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# Shared profiler used by the decorated functions
+profiler = Profiler()
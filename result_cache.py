@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import threading
+
+
+class ResultCache:
+    """
+    Cross-validated scores of parameter sets that were already backtested, so that repeated
+    parameter sets (enqueued trials, duplicate samples, reruns) are scored once. Entries are
+    keyed by a hash of the parameters and of a context holding everything else the score
+    depends on (data fingerprint, backtest configuration, metric, split settings), and can be
+    appended to a JSON lines file shared by reruns and worker processes.
+    Attributes:
+        path (str | None): The JSON lines file the scores are persisted to.
+        hits (int): The number of lookups that found a score.
+        misses (int): The number of lookups that did not.
+    """
+
+    def __init__(self, context: dict, path: str | None = None):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._context = json.dumps(context, sort_keys=True, default=str)
+        self._scores: dict[str, float] = {}
+        self._lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            with open(path) as file:
+                for line in file:
+                    # A line cut off by an interrupted run is skipped
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self._scores[entry['key']] = entry['score']
+
+    def key(self, params: dict) -> str:
+        """
+        Return the cache key of a parameter set in this context.
+        Args:
+            params (dict): Hyperparameters for the trading strategy.
+        Returns:
+            str: The key.
+        """
+        payload = self._context + json.dumps(params, sort_keys=True, default=str)
+        return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+    def get(self, params: dict) -> float | None:
+        """
+        Look a parameter set up.
+        Args:
+            params (dict): Hyperparameters for the trading strategy.
+        Returns:
+            float | None: The cached score, or None if the parameters were not scored yet.
+        """
+        key = self.key(params)
+        with self._lock:
+            score = self._scores.get(key)
+            if score is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return score
+
+    def put(self, params: dict, score: float) -> None:
+        """
+        Store the score of a parameter set.
+        Args:
+            params (dict): Hyperparameters for the trading strategy.
+            score (float): The cross-validated score.
+        """
+        key = self.key(params)
+        with self._lock:
+            self._scores[key] = score
+            if self.path is not None:
+                with open(self.path, 'a') as file:
+                    file.write(json.dumps({'key': key, 'score': score}) + '\n')
+
+    def stats(self) -> dict:
+        """
+        Return the hit/miss counters and the number of cached scores.
+        Returns:
+            dict: Hits, misses, hit rate and entries.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._scores)
+            }
@@ -0,0 +1,408 @@
+import math
+import sys
+from collections import deque
+
+import pandas as pd
+
+NAN = float('nan')
+# pandas flags a variance update as unstable when it shrinks the sum of squares by this factor
+INV_COND_TOL = sys.float_info.epsilon * 1e3
+
+
+def _divide(numerator: float, denominator: float) -> float:
+    """
+    Divide like NumPy does: x/0 gives +-inf and 0/0 gives NaN instead of raising.
+    """
+    if denominator == 0:
+        if numerator == 0 or numerator != numerator:
+            return NAN
+        return math.copysign(math.inf, numerator) * math.copysign(1.0, denominator)
+    return numerator / denominator
+
+
+class StreamingEWM:
+    """
+    Exponentially weighted mean with adjust=False, updated one value at a time.
+    Follows the same recurrence as pandas' ewm().mean() so the values are identical.
+    Attributes:
+        value (float): The current mean, NaN until min_periods observations were seen.
+    """
+
+    def __init__(self, alpha: float, min_periods: int = 0):
+        self._new_wt = alpha
+        self._old_wt = 1. - alpha
+        self._min_periods = max(min_periods, 1)
+        self._weighted = NAN
+        self._nobs = 0
+        self.value = NAN
+
+    @classmethod
+    def from_span(cls, span: int) -> 'StreamingEWM':
+        """
+        Create the EWM pandas uses for ewm(span=span, adjust=False).
+        Args:
+            span (int): The span of the EMA.
+        Returns:
+            StreamingEWM: The streaming EMA.
+        """
+        com = (span - 1) / 2.0
+        return cls(1. / (1. + com))
+
+    def update(self, x: float) -> float:
+        """
+        Add a new value.
+        Args:
+            x (float): The new observation.
+        Returns:
+            float: The updated mean.
+        """
+        is_observation = x == x
+        self._nobs += is_observation
+        if self._weighted == self._weighted:
+            if is_observation and self._weighted != x:
+                self._weighted = (self._old_wt * self._weighted + self._new_wt * x) / (self._old_wt + self._new_wt)
+        elif is_observation:
+            self._weighted = x
+        self.value = self._weighted if self._nobs >= self._min_periods else NAN
+        return self.value
+
+
+class StreamingRollingMean:
+    """
+    Rolling mean over a ring buffer of the last window values, with the compensated
+    add/remove updates pandas' rolling().mean() uses.
+    Attributes:
+        value (float): The current mean, NaN until the window is full.
+    """
+
+    def __init__(self, window: int):
+        self._window = window
+        self._buffer = deque()
+        self._nobs = 0
+        self._sum = 0.
+        self._neg_ct = 0
+        self._compensation_add = 0.
+        self._compensation_remove = 0.
+        self._consecutive = 0
+        self._prev_value = NAN
+        self.value = NAN
+
+    def update(self, x: float) -> float:
+        """
+        Add a new value, dropping the one that leaves the window.
+        Args:
+            x (float): The new observation.
+        Returns:
+            float: The updated mean.
+        """
+        if math.isinf(x):
+            # pandas' rolling functions treat infinite values as missing
+            x = NAN
+        if not self._buffer:
+            self._prev_value = x
+        self._buffer.append(x)
+        if len(self._buffer) > self._window:
+            old = self._buffer.popleft()
+            if old == old:
+                self._nobs -= 1
+                y = -old - self._compensation_remove
+                t = self._sum + y
+                self._compensation_remove = t - self._sum - y
+                self._sum = t
+                if math.copysign(1.0, old) < 0:
+                    self._neg_ct -= 1
+
+        if x == x:
+            self._nobs += 1
+            y = x - self._compensation_add
+            t = self._sum + y
+            self._compensation_add = t - self._sum - y
+            self._sum = t
+            if math.copysign(1.0, x) < 0:
+                self._neg_ct += 1
+            self._consecutive = self._consecutive + 1 if x == self._prev_value else 1
+            self._prev_value = x
+
+        if self._nobs >= self._window:
+            result = self._sum / self._nobs
+            if self._consecutive >= self._nobs:
+                result = self._prev_value
+            elif self._neg_ct == 0 and result < 0:
+                result = 0.
+            elif self._neg_ct == self._nobs and result > 0:
+                result = 0.
+            self.value = result
+        else:
+            self.value = NAN
+        return self.value
+
+
+class StreamingRollingStd:
+    """
+    Rolling population standard deviation (ddof=0) over a ring buffer of the last window
+    values, with the compensated Welford updates pandas' rolling().std() uses, including
+    its recomputation of the window when an update cancels catastrophically.
+    Attributes:
+        value (float): The current standard deviation, NaN until the window is full.
+    """
+
+    def __init__(self, window: int, ddof: int = 0):
+        self._window = window
+        self._ddof = ddof
+        self._buffer = deque()
+        self._nobs = 0
+        self._mean = 0.
+        self._ssqdm = 0.
+        self._compensation_add = 0.
+        self._compensation_remove = 0.
+        self._unstable = False
+        self.value = NAN
+
+    def _add(self, x: float) -> None:
+        if x != x:
+            return
+        prev_ssqdm = self._ssqdm
+        self._nobs += 1
+        prev_mean = self._mean - self._compensation_add
+        y = x - self._compensation_add
+        t = y - self._mean
+        self._compensation_add = t + self._mean - y
+        self._mean += t / self._nobs
+        self._ssqdm += (x - prev_mean) * (x - self._mean)
+        if prev_ssqdm * INV_COND_TOL > self._ssqdm:
+            self._unstable = True
+
+    def _remove(self, x: float) -> None:
+        if x != x:
+            return
+        prev_ssqdm = self._ssqdm
+        self._nobs -= 1
+        if self._nobs:
+            prev_mean = self._mean - self._compensation_remove
+            y = x - self._compensation_remove
+            t = y - self._mean
+            self._compensation_remove = t + self._mean - y
+            self._mean -= t / self._nobs
+            self._ssqdm -= (x - prev_mean) * (x - self._mean)
+            if prev_ssqdm * INV_COND_TOL > self._ssqdm:
+                self._unstable = True
+        else:
+            self._mean = 0.
+            self._ssqdm = 0.
+            self._unstable = False
+
+    def update(self, x: float) -> float:
+        """
+        Add a new value, dropping the one that leaves the window.
+        Args:
+            x (float): The new observation.
+        Returns:
+            float: The updated standard deviation.
+        """
+        if math.isinf(x):
+            x = NAN
+        self._buffer.append(x)
+        if len(self._buffer) > self._window:
+            self._remove(self._buffer.popleft())
+        self._add(x)
+
+        if self._unstable:
+            # Rebuild the state from the window, as pandas does after a loss of precision
+            self._nobs = 0
+            self._mean = self._ssqdm = self._compensation_add = self._compensation_remove = 0.
+            for value in self._buffer:
+                self._add(value)
+            self._unstable = False
+
+        if self._nobs >= self._window and self._nobs > self._ddof:
+            variance = self._ssqdm / (self._nobs - self._ddof)
+            self.value = math.sqrt(variance) if variance >= 0 else 0.
+        else:
+            self.value = NAN
+        return self.value
+
+
+class StreamingRollingExtreme:
+    """
+    Rolling maximum or minimum of the last window values using a monotonic deque.
+    Attributes:
+        value (float): The current extreme, NaN until the window is full.
+    """
+
+    def __init__(self, window: int, maximum: bool):
+        self._window = window
+        self._maximum = maximum
+        self._candidates = deque()
+        self._count = 0
+        self.value = NAN
+
+    def update(self, x: float) -> float:
+        """
+        Add a new value.
+        Args:
+            x (float): The new observation.
+        Returns:
+            float: The extreme of the last window values.
+        """
+        candidates = self._candidates
+        if self._maximum:
+            while candidates and candidates[-1][1] <= x:
+                candidates.pop()
+        else:
+            while candidates and candidates[-1][1] >= x:
+                candidates.pop()
+        candidates.append((self._count, x))
+        if candidates[0][0] <= self._count - self._window:
+            candidates.popleft()
+        self._count += 1
+
+        self.value = candidates[0][1] if self._count >= self._window else NAN
+        return self.value
+
+
+class StreamingRSI:
+    """
+    Wilder-smoothed Relative Strength Index, matching ta.momentum.RSIIndicator.
+    Attributes:
+        value (float): The current RSI, NaN during the warm-up.
+    """
+
+    def __init__(self, window: int):
+        self._up = StreamingEWM(1 / window, min_periods=window)
+        self._down = StreamingEWM(1 / window, min_periods=window)
+        self._prev_close = NAN
+        self.value = NAN
+
+    def update(self, close: float) -> float:
+        """
+        Add a new close price.
+        Args:
+            close (float): The close price of the new bar.
+        Returns:
+            float: The updated RSI.
+        """
+        diff = close - self._prev_close
+        self._prev_close = close
+        up = diff if diff > 0 else 0.0
+        down = -(diff if diff < 0 else 0.0)
+        ema_up = self._up.update(up)
+        ema_down = self._down.update(down)
+
+        if ema_down == 0:
+            self.value = 100.
+        else:
+            self.value = 100 - (100 / (1 + _divide(ema_up, ema_down)))
+        return self.value
+
+
+class StreamingCrossover:
+    """
+    Tracks a fast and a slow line and reports when the fast one crosses the slow one.
+    """
+
+    def __init__(self):
+        self._prev_fast = NAN
+        self._prev_slow = NAN
+
+    def update(self, fast: float, slow: float) -> tuple[bool, bool]:
+        """
+        Add the new values of both lines.
+        Args:
+            fast (float): The fast line.
+            slow (float): The slow line.
+        Returns:
+            buy_signal (bool): True if the fast line crossed above the slow line.
+            sell_signal (bool): True if the fast line crossed below the slow line.
+        """
+        buy_signal = fast > slow and self._prev_fast <= self._prev_slow
+        sell_signal = fast < slow and self._prev_fast >= self._prev_slow
+        self._prev_fast, self._prev_slow = fast, slow
+        return buy_signal, sell_signal
+
+
+class StreamingSignals:
+    """
+    Incremental version of indicators.get_signals: keeps O(1) state per indicator and
+    turns every new bar into the same buy and sell signals the batch functions produce.
+    The indicators replicate pandas and ta, which the batch kernels match only up to
+    rounding (see indicator_kernels.rolling_mean_std for the Bollinger std), so a signal
+    can only differ on a bar whose indicator lies within that rounding of its threshold.
+    """
+
+    def __init__(self, params: dict):
+        self.params = params
+        self._rsi = StreamingRSI(params['rsi_window'])
+        self._ema_short = StreamingEWM.from_span(params['ema_short_window'])
+        self._ema_long = StreamingEWM.from_span(params['ema_long_window'])
+        self._ema_crossover = StreamingCrossover()
+        self._macd_short = StreamingEWM.from_span(params['macd_short_window'])
+        self._macd_long = StreamingEWM.from_span(params['macd_long_window'])
+        self._macd_signal = StreamingEWM.from_span(params['macd_signal_window'])
+        self._macd_crossover = StreamingCrossover()
+        self._bollinger_mean = StreamingRollingMean(params['bollinger_window'])
+        self._bollinger_std = StreamingRollingStd(params['bollinger_window'])
+        self._lowest_low = StreamingRollingExtreme(params['stoch_k_window'], maximum=False)
+        self._highest_high = StreamingRollingExtreme(params['stoch_k_window'], maximum=True)
+        self._stoch_d = StreamingRollingMean(params['stoch_smooth_window'])
+
+    def update(self, high: float, low: float, close: float) -> tuple[bool, bool]:
+        """
+        Add a new bar.
+        Args:
+            high (float): The high price of the bar.
+            low (float): The low price of the bar.
+            close (float): The close price of the bar.
+        Returns:
+            buy_signal (bool): True if at least two indicators give a buy signal.
+            sell_signal (bool): True if at least two indicators give a sell signal.
+        """
+        params = self.params
+
+        rsi = self._rsi.update(close)
+        rsi_buy, rsi_sell = rsi < params['rsi_lower'], rsi > params['rsi_upper']
+
+        ema_buy, ema_sell = self._ema_crossover.update(
+            self._ema_short.update(close), self._ema_long.update(close)
+        )
+
+        macd = self._macd_short.update(close) - self._macd_long.update(close)
+        macd_buy, macd_sell = self._macd_crossover.update(macd, self._macd_signal.update(macd))
+
+        mavg = self._bollinger_mean.update(close)
+        mstd = self._bollinger_std.update(close)
+        num_std_dev = params['bollinger_num_std_dev']
+        bollinger_buy = close < mavg - num_std_dev * mstd
+        bollinger_sell = close > mavg + num_std_dev * mstd
+
+        smin = self._lowest_low.update(low)
+        smax = self._highest_high.update(high)
+        k_percent = _divide(100 * (close - smin), smax - smin)
+        d_percent = self._stoch_d.update(k_percent)
+        lower, upper = params['stoch_lower_threshold'], params['stoch_upper_threshold']
+        stochastic_buy = k_percent < lower and d_percent < lower
+        stochastic_sell = k_percent > upper and d_percent > upper
+
+        buy_signal = rsi_buy + ema_buy + macd_buy + bollinger_buy + stochastic_buy >= 2
+        sell_signal = rsi_sell + ema_sell + macd_sell + bollinger_sell + stochastic_sell >= 2
+        return buy_signal, sell_signal
+
+
+def stream_signals(data: pd.DataFrame, params: dict) -> pd.DataFrame:
+    """
+    Replay a DataFrame bar by bar through StreamingSignals, e.g. to check it against
+    indicators.get_signals or to warm the state up before a live feed.
+    Args:
+        data (pd.DataFrame): DataFrame containing price data with 'Close', 'High', and 'Low' columns.
+        params (dict): A dictionary containing parameters for each technical indicator.
+    Returns:
+        pd.DataFrame: The 'buy_signal' and 'sell_signal' of every bar.
+    """
+    engine = StreamingSignals(params)
+    signals = [
+        engine.update(high, low, close)
+        for high, low, close in zip(
+            data['High'].astype(float).tolist(), data['Low'].astype(float).tolist(),
+            data['Close'].astype(float).tolist()
+        )
+    ]
+    return pd.DataFrame(signals, columns=['buy_signal', 'sell_signal'], index=data.index)
@@ -0,0 +1,73 @@
+import optuna
+
+STUDY_NAME = 'Hyperparameter Optimization'
+
+
+def open_storage(storage: str) -> optuna.storages.BaseStorage:
+    """
+    Open a persistent Optuna storage.
+    Args:
+        storage (str): A database URL such as 'sqlite:///study.db', or the path of a journal file.
+    Returns:
+        optuna.storages.BaseStorage: The storage.
+    """
+    if '://' in storage:
+        return optuna.storages.RDBStorage(storage)
+    return optuna.storages.JournalStorage(optuna.storages.journal.JournalFileBackend(storage))
+
+
+def load_or_create_study(
+        storage: str | None, study_name: str = STUDY_NAME, direction: str = 'maximize',
+        pruner: optuna.pruners.BasePruner | None = None
+) -> optuna.study.Study:
+    """
+    Create a study, or resume the one with the same name if the storage already holds it.
+    Trials left running by an interrupted run are marked as failed, so only one process may
+    resume a study at a time.
+    Args:
+        storage (str | None): A database URL or journal file path. None keeps the study in memory.
+        study_name (str): The name of the study.
+        direction (str): The optimization direction ('maximize' or 'minimize').
+        pruner (optuna.pruners.BasePruner | None): The pruner of the study.
+    Returns:
+        optuna.study.Study: The study.
+    """
+    study = optuna.create_study(
+        direction=direction,
+        study_name=study_name,
+        storage=open_storage(storage) if storage else None,
+        pruner=pruner,
+        load_if_exists=True
+    )
+    for trial in study.get_trials(deepcopy=False, states=(optuna.trial.TrialState.RUNNING,)):
+        study.tell(trial.number, state=optuna.trial.TrialState.FAIL)
+    return study
+
+
+def get_remaining_trials(study: optuna.study.Study, n_trials: int) -> int:
+    """
+    Return how many trials a resumed study still needs to reach n_trials finished trials.
+    Args:
+        study (optuna.study.Study): The study.
+        n_trials (int): The total number of trials the study should have.
+    Returns:
+        int: The number of trials left to run.
+    """
+    finished = study.get_trials(
+        deepcopy=False, states=(optuna.trial.TrialState.COMPLETE, optuna.trial.TrialState.PRUNED)
+    )
+    return max(n_trials - len(finished), 0)
+
+
+def load_best_trial(storage: str, study_name: str = STUDY_NAME) -> tuple[dict, float]:
+    """
+    Load the best hyperparameters of a stored study.
+    Args:
+        storage (str): A database URL or journal file path.
+        study_name (str): The name of the study.
+    Returns:
+        best_params (dict): The best hyperparameters.
+        best_value (float): The best value of the optimization metric.
+    """
+    study = optuna.load_study(study_name=study_name, storage=open_storage(storage))
+    return study.best_params, study.best_value
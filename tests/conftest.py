@@ -0,0 +1,37 @@
+import os
+import sys
+
+import numpy as np
+import optuna
+import pytest
+
+# The modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark import make_synthetic_data
+from trial_params import get_trial_params
+
+optuna.logging.set_verbosity(optuna.logging.WARNING)
+
+
+def sample_params(n: int, seed: int = 0) -> list[dict]:
+    """
+    Draw parameter sets from the optimizer's search space.
+    Args:
+        n (int): The number of parameter sets.
+        seed (int): The seed of the random sampler.
+    Returns:
+        list[dict]: The parameter sets.
+    """
+    study = optuna.create_study(sampler=optuna.samplers.RandomSampler(seed=seed))
+    return [get_trial_params(study.ask()) for _ in range(n)]
+
+
+@pytest.fixture(scope='session')
+def data():
+    return make_synthetic_data(4000, seed=1)
+
+
+@pytest.fixture(scope='session')
+def params_list():
+    return sample_params(6)
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from backtest import run_backtest, run_backtest_batch
+from config import BacktestConfig
+from indicators import get_signal_arrays
+from metrics import get_metrics_from_flags
+
+
+def reference_backtest(
+        close: np.ndarray, buy_signal: np.ndarray, sell_signal: np.ndarray,
+        config: BacktestConfig, params: dict
+) -> tuple[dict, int, int, list, float]:
+    """
+    The original bar-by-bar backtest: every bar checks every open position against the close,
+    then values the portfolio by walking the open positions in the order they were opened.
+    Returns:
+        The first five values of the run_backtest tuple.
+    """
+    capital = float(config.initial_capital)
+    commission = float(config.commission)
+    portfolio_value = [capital]
+    longs, shorts = [], []  # [quantity, price, sl, tp] of the open positions
+    long_wins, short_wins = [], []
+    n_long_trades = n_short_trades = 0
+    for price, buy, sell in zip(close.tolist(), buy_signal.tolist(), sell_signal.tolist()):
+        for position in longs.copy():
+            quantity, entry_price, sl, tp = position
+            if price > tp or price < sl:
+                capital += price * quantity * (1-commission)
+                long_wins.append(price > entry_price)
+                longs.remove(position)
+        for position in shorts.copy():
+            quantity, entry_price, sl, tp = position
+            if price > sl or price < tp:
+                capital += entry_price * quantity + (entry_price-price) * quantity * (1-commission)
+                short_wins.append(price < entry_price)
+                shorts.remove(position)
+        for is_signal, positions, sign in ((buy, longs, 1), (sell, shorts, -1)):
+            if not is_signal:
+                continue
+            quantity = (capital * params['capital_fraction']) / price
+            cost = quantity * price * (1+commission)
+            if capital >= cost:
+                capital -= cost
+                positions.append([
+                    quantity, price, price * (1 - sign*params['stop_loss']), price * (1 + sign*params['take_profit'])
+                ])
+                if sign == 1:
+                    n_long_trades += 1
+                else:
+                    n_short_trades += 1
+        long_value = sum([quantity * price for quantity, *_ in longs])
+        short_value = sum([quantity * (entry_price-price) + entry_price * quantity for quantity, entry_price, *_ in shorts])
+        portfolio_value.append(capital + long_value + short_value)
+
+    # Open positions are valued at the last close, without commission
+    for quantity, entry_price, *_ in longs:
+        capital += price * quantity
+    for quantity, entry_price, *_ in shorts:
+        capital += entry_price * quantity + (entry_price-price) * quantity
+    long_wins += [price > entry_price for _, entry_price, *_ in longs]
+    short_wins += [price < entry_price for _, entry_price, *_ in shorts]
+
+    metrics = get_metrics_from_flags(
+        portfolio_value, np.array(long_wins, dtype=bool), np.array(short_wins, dtype=bool),
+        config.periods_per_year
+    )
+    return metrics, n_long_trades, n_short_trades, portfolio_value, capital
+
+
+def assert_same_result(result: tuple, expected: tuple) -> None:
+    """
+    Check that two run_backtest tuples are identical, bit for bit.
+    """
+    np.testing.assert_equal(result[0], expected[0])
+    assert result[1:5] == expected[1:5]
+    if len(expected) > 5:
+        np.testing.assert_array_equal(result[5], expected[5])
+
+
+@pytest.mark.parametrize('engine', ['loop', 'vectorized'])
+def test_engines_match_the_reference(data, params_list, engine):
+    close = data['Close'].to_numpy(dtype=float)
+    for params in params_list:
+        buy_signal, sell_signal = get_signal_arrays(data, params)
+        expected = reference_backtest(close, buy_signal, sell_signal, BacktestConfig(), params)
+        assert_same_result(run_backtest(data, BacktestConfig(engine=engine), params)[:5], expected)
+
+
+@pytest.mark.parametrize('execution', ['close', 'intrabar'])
+def test_engines_and_batch_agree(data, params_list, execution):
+    results = run_backtest_batch(data, BacktestConfig(execution=execution), params_list)
+    for params, batch_result in zip(params_list, results):
+        loop_result = run_backtest(data, BacktestConfig(execution=execution), params)
+        assert_same_result(run_backtest(data, BacktestConfig(engine='vectorized', execution=execution), params), loop_result)
+        assert_same_result(batch_result, loop_result)
@@ -0,0 +1,43 @@
+from backtest import run_backtest, run_backtest_batch
+from backtest_cache import backtest_cache
+from config import BacktestConfig
+from indicator_cache import indicator_cache
+from indicator_table import IndicatorTable
+from result_cache import ResultCache
+from test_backtest import assert_same_result
+
+
+def test_cached_backtests_match_uncached(data, params_list):
+    indicator_cache.clear()
+    backtest_cache.clear()
+    cached_config = BacktestConfig(cache_indicators=True, cache_backtests=True)
+    for _ in range(2):
+        for params in params_list:
+            assert_same_result(run_backtest(data, cached_config, params), run_backtest(data, BacktestConfig(), params))
+    assert indicator_cache.stats()['hits'] > 0 and backtest_cache.stats()['hits'] > 0
+
+    # A cached result is a copy: changing it leaves the cache intact
+    result = run_backtest(data, cached_config, params_list[0])
+    result[3][-1] = 0.0
+    assert_same_result(run_backtest(data, cached_config, params_list[0]), run_backtest(data, BacktestConfig(), params_list[0]))
+
+
+def test_indicator_table_matches_computed_indicators(data, params_list):
+    table = IndicatorTable.build(data)
+    for params, batch_result in zip(params_list, run_backtest_batch(data, BacktestConfig(), params_list, table)):
+        assert_same_result(run_backtest(data, BacktestConfig(), params, table), run_backtest(data, BacktestConfig(), params))
+        assert_same_result(batch_result, run_backtest(data, BacktestConfig(), params))
+    assert table.stats()['hits'] > 0 and table.stats()['misses'] == 0
+
+
+def test_result_cache_persists_scores(tmp_path, params_list):
+    path = str(tmp_path / 'scores.jsonl')
+    cache = ResultCache({'metric': 'Calmar'}, path)
+    for score, params in enumerate(params_list):
+        cache.put(params, float(score))
+
+    reloaded = ResultCache({'metric': 'Calmar'}, path)
+    assert [reloaded.get(params) for params in params_list] == [float(score) for score in range(len(params_list))]
+    # Scores of another context are never served
+    assert ResultCache({'metric': 'Sharpe'}, path).get(params_list[0]) is None
+    assert reloaded.stats()['hit_rate'] == 1.0
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmark import make_synthetic_data
+from indicator_kernels import ema, rolling_max, rolling_mean, rolling_mean_std, rolling_min, stochastic, wilder_rsi
+from trial_params import WINDOW_RANGES
+
+
+def windows(*names: str) -> range:
+    """
+    Return every window of the search space covering the given parameters.
+    """
+    return range(min(WINDOW_RANGES[name][0] for name in names), max(WINDOW_RANGES[name][1] for name in names) + 1)
+
+
+def max_rel_error(kernel: np.ndarray, reference) -> float:
+    """
+    Check that a kernel has the NaNs of its reference and return the largest relative difference.
+    """
+    reference = np.asarray(reference, dtype=float)
+    assert np.array_equal(np.isnan(kernel), np.isnan(reference))
+    defined = ~np.isnan(reference)
+    error = np.abs(kernel[defined] - reference[defined])
+    return float((error / np.maximum(np.abs(reference[defined]), 1e-12)).max(initial=0.0))
+
+
+@pytest.fixture(scope='module')
+def prices():
+    return make_synthetic_data(20_000, seed=2)
+
+
+def test_ema_matches_pandas(prices):
+    close = prices['Close'].astype(float)
+    for span in windows('ema_short_window', 'ema_long_window', 'macd_short_window', 'macd_long_window'):
+        expected = close.ewm(span=span, adjust=False).mean().to_numpy()
+        np.testing.assert_array_equal(ema(close.to_numpy(), 2 / (span + 1)), expected)
+
+
+def test_rolling_mean_std_matches_pandas(prices):
+    # Looser on the std: pandas' online updates drift (see rolling_mean_std)
+    close = prices['Close'].astype(float)
+    for window in windows('bollinger_window'):
+        mean, std = rolling_mean_std(close.to_numpy(), window)
+        assert max_rel_error(mean, close.rolling(window).mean()) < 1e-13
+        assert max_rel_error(std, close.rolling(window).std(ddof=0)) < 1e-7
+
+
+def test_rolling_mean_std_is_exact_on_flat_windows():
+    values = np.concatenate((np.linspace(100, 200, 50), np.full(40, 123.456), np.linspace(200, 100, 50)))
+    mean, std = rolling_mean_std(values, 20, block=16)
+    flat = slice(50 + 19, 90)
+    assert (mean[flat] == 123.456).all() and (std[flat] == 0.0).all()
+
+
+def test_rolling_mean_and_extremes_match_pandas(prices):
+    # rolling_mean takes one cumulative sum over the whole series, so its rounding grows with
+    # the sum of the prices
+    close = prices['Close'].astype(float).copy()
+    close.iloc[[100, 5000]] = np.nan
+    for window in windows('stoch_k_window', 'stoch_smooth_window'):
+        assert max_rel_error(rolling_mean(close.to_numpy(), window), close.rolling(window).mean()) < 1e-11
+        np.testing.assert_array_equal(rolling_max(close.to_numpy(), window), close.rolling(window).max())
+        np.testing.assert_array_equal(rolling_min(close.to_numpy(), window), close.rolling(window).min())
+
+
+def test_rsi_matches_ta(prices):
+    ta = pytest.importorskip('ta')
+    close = prices['Close'].astype(float)
+    for window in windows('rsi_window'):
+        expected = ta.momentum.RSIIndicator(close, window=window).rsi()
+        assert max_rel_error(wilder_rsi(close.to_numpy(), window), expected) < 1e-14
+
+
+def test_stochastic_matches_ta(prices):
+    ta = pytest.importorskip('ta')
+    close = prices['Close'].astype(float)
+    high, low = prices['High'].to_numpy(dtype=float), prices['Low'].to_numpy(dtype=float)
+    for k_window in windows('stoch_k_window'):
+        for smooth_window in windows('stoch_smooth_window'):
+            k_percent, d_percent = stochastic(high, low, close.to_numpy(), k_window, smooth_window)
+            indicator = ta.momentum.StochasticOscillator(
+                high=prices['High'], low=prices['Low'], close=close, window=k_window, smooth_window=smooth_window
+            )
+            assert max_rel_error(k_percent, indicator.stoch()) == 0.0
+            assert max_rel_error(d_percent, indicator.stoch_signal()) < 1e-9
@@ -0,0 +1,23 @@
+import numpy as np
+
+from indicators import get_signal_arrays
+from streaming import stream_signals
+
+
+def test_streaming_matches_batch_signals(data, params_list):
+    for params in params_list:
+        buy_signal, sell_signal = get_signal_arrays(data, params)
+        signals = stream_signals(data, params)
+        np.testing.assert_array_equal(signals['buy_signal'].to_numpy(), buy_signal)
+        np.testing.assert_array_equal(signals['sell_signal'].to_numpy(), sell_signal)
+
+
+def test_streaming_matches_batch_signals_on_flat_prices(data, params_list):
+    # Flat stretches give zero deviations and ranges, where rounding differences would show
+    data = data.copy()
+    data.loc[1000:1199, ['Open', 'High', 'Low', 'Close']] = 25_000.0
+    for params in params_list:
+        buy_signal, sell_signal = get_signal_arrays(data, params)
+        signals = stream_signals(data, params)
+        np.testing.assert_array_equal(signals['buy_signal'].to_numpy(), buy_signal)
+        np.testing.assert_array_equal(signals['sell_signal'].to_numpy(), sell_signal)
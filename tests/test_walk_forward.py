@@ -0,0 +1,30 @@
+import optuna
+import pytest
+
+from config import BacktestConfig, OptimizationConfig
+from indicator_table import IndicatorTable
+from optimizer import cross_validated_objective
+from walk_forward import _split_tables, get_walk_forward_windows
+
+
+@pytest.mark.parametrize('anchored', [False, True])
+@pytest.mark.parametrize('full_history_signals', [False, True])
+def test_precomputed_tables_keep_the_objective(data, params_list, anchored, full_history_signals):
+    # The tables walk_forward hands to a window's optimization must score every parameter
+    # set exactly like indicators computed on the window
+    optimization_config = OptimizationConfig(
+        n_splits=3, precompute_indicators=True, full_history_signals=full_history_signals
+    )
+    table = IndicatorTable.build(data)
+    for train_start, train_stop, _ in get_walk_forward_windows(len(data), 2000, 1000, anchored):
+        train_data = data.iloc[train_start:train_stop].reset_index(drop=True)
+        tables = _split_tables(table, data, train_start, train_stop, optimization_config)
+        for params in params_list:
+            scores = [
+                cross_validated_objective(
+                    optuna.trial.FixedTrial(params), train_data, BacktestConfig(), 3, 'Calmar',
+                    indicator_tables, full_history_signals=full_history_signals
+                )
+                for indicator_tables in (None, tables)
+            ]
+            assert scores[0] == scores[1]
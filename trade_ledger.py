@@ -0,0 +1,160 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from profiling import profiled
+
+LONG = 1
+SHORT = -1
+
+# One record per trade. Times are int64 nanoseconds since the epoch.
+TRADE_DTYPE = np.dtype([
+    ('side', np.int8),
+    ('entry_bar', np.int64),
+    ('exit_bar', np.int64),
+    ('entry_time', np.int64),
+    ('exit_time', np.int64),
+    ('entry_price', np.float64),
+    ('exit_price', np.float64),
+    ('quantity', np.float64),
+    ('pnl', np.float64),
+    ('is_win', np.bool_),
+    ('closed', np.bool_),
+])
+
+
+def get_bar_times(data: pd.DataFrame) -> np.ndarray:
+    """
+    Return the bar timestamps as int64 nanoseconds, the format the ledger stores.
+    Args:
+        data (pd.DataFrame): The price data with a 'Datetime' column.
+    Returns:
+        np.ndarray: The time of every bar.
+    """
+    return data['Datetime'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+
+
+class TradeLedger:
+    """
+    Trades of a backtest stored in a preallocated NumPy structured array (see TRADE_DTYPE).
+    Positions still open at the end of the backtest are recorded at the last bar and price
+    with closed set to False, like the engines value them.
+    Attributes:
+        times (np.ndarray): The int64 time of every bar.
+        commission (float): The commission rate, used to compute the PnL.
+    """
+
+    def __init__(self, capacity: int, times: np.ndarray, commission: float):
+        self.times = times
+        self.commission = commission
+        self._trades = np.zeros(capacity, dtype=TRADE_DTYPE)
+        self._count = 0
+
+    def record(
+            self, side: int, entry_bar: int, exit_bar: int, entry_price: float, exit_price: float,
+            quantity: float, is_win: bool, closed: bool = True
+    ) -> None:
+        """
+        Record one trade.
+        Args:
+            side (int): LONG or SHORT.
+            entry_bar (int): The bar the position was opened on.
+            exit_bar (int): The bar the position was closed on.
+            entry_price (float): The entry price.
+            exit_price (float): The exit price.
+            quantity (float): The quantity of the asset traded.
+            is_win (bool): Whether the trade was closed at a profit.
+            closed (bool): False for a position still open at the end of the backtest.
+        """
+        self._trades[self._count] = (
+            side, entry_bar, exit_bar, self.times[entry_bar], self.times[exit_bar],
+            entry_price, exit_price, quantity, 0.0, is_win, closed
+        )
+        self._count += 1
+
+    def record_many(
+            self, side: int, entry_bar: np.ndarray, exit_bar: np.ndarray, entry_price: np.ndarray,
+            exit_price: np.ndarray, quantity: np.ndarray, is_win: np.ndarray, closed: np.ndarray
+    ) -> None:
+        """
+        Record many trades of one side at once.
+        Args:
+            side (int): LONG or SHORT.
+            entry_bar, exit_bar (np.ndarray): The entry and exit bar of every trade.
+            entry_price, exit_price (np.ndarray): The entry and exit price of every trade.
+            quantity (np.ndarray): The quantity of every trade.
+            is_win (np.ndarray): Whether every trade was closed at a profit.
+            closed (np.ndarray): False for positions still open at the end of the backtest.
+        """
+        trades = self._trades[self._count:self._count + len(entry_bar)]
+        trades['side'] = side
+        trades['entry_bar'], trades['exit_bar'] = entry_bar, exit_bar
+        trades['entry_time'], trades['exit_time'] = self.times[entry_bar], self.times[exit_bar]
+        trades['entry_price'], trades['exit_price'] = entry_price, exit_price
+        trades['quantity'], trades['is_win'], trades['closed'] = quantity, is_win, closed
+        self._count += len(entry_bar)
+
+    @profiled('backtest.ledger')
+    def finish(self) -> np.ndarray:
+        """
+        Compute the PnL of the recorded trades and return them in chronological order.
+        The PnL is the cash a trade returned minus the cash it took, commissions included.
+        Returns:
+            np.ndarray: The trades, sorted by entry bar with longs before shorts.
+        """
+        trades = self._trades[:self._count]
+        commission = self.commission
+        # Open positions are valued without commission, like the engines do
+        fee = np.where(trades['closed'], 1 - commission, 1.0)
+        entry_value = trades['quantity'] * trades['entry_price']
+        long_pnl = trades['exit_price'] * trades['quantity'] * fee - entry_value * (1 + commission)
+        short_pnl = (trades['entry_price'] - trades['exit_price']) * trades['quantity'] * fee - entry_value * commission
+        trades['pnl'] = np.where(trades['side'] == LONG, long_pnl, short_pnl)
+        return trades[np.lexsort((-trades['side'], trades['entry_bar']))]
+
+
+def get_win_flags(trades: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Split the win flags of a ledger by side, as the metrics expect them.
+    Args:
+        trades (np.ndarray): A trade ledger.
+    Returns:
+        long_is_win (np.ndarray): Win flags of the long trades.
+        short_is_win (np.ndarray): Win flags of the short trades.
+    """
+    return trades['is_win'][trades['side'] == LONG], trades['is_win'][trades['side'] == SHORT]
+
+
+def trades_to_frame(trades: np.ndarray) -> pd.DataFrame:
+    """
+    Convert a trade ledger to a DataFrame with readable sides and timestamps.
+    Args:
+        trades (np.ndarray): A trade ledger.
+    Returns:
+        pd.DataFrame: One row per trade.
+    """
+    frame = pd.DataFrame(trades)
+    frame['side'] = np.where(trades['side'] == LONG, 'long', 'short')
+    frame['entry_time'] = pd.to_datetime(trades['entry_time'])
+    frame['exit_time'] = pd.to_datetime(trades['exit_time'])
+    return frame
+
+
+def save_trades(trades: np.ndarray, path: str) -> None:
+    """
+    Write a trade ledger in bulk. The format follows the extension: '.parquet' (needs pyarrow
+    or fastparquet), '.csv', or '.npy' for the raw structured array.
+    Args:
+        trades (np.ndarray): A trade ledger.
+        path (str): The file to write.
+    """
+    extension = os.path.splitext(path)[1]
+    if extension == '.npy':
+        np.save(path, trades)
+    elif extension == '.parquet':
+        trades_to_frame(trades).to_parquet(path, index=False)
+    elif extension == '.csv':
+        trades_to_frame(trades).to_csv(path, index=False)
+    else:
+        raise ValueError(f"Unknown trade ledger format '{extension}'. Use '.parquet', '.csv' or '.npy'.")
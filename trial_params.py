@@ -1,3 +1,17 @@
+# Integer window ranges explored by the optimizer (inclusive bounds)
+WINDOW_RANGES = {
+    'rsi_window': (8, 50),
+    'ema_short_window': (5, 20),
+    'ema_long_window': (21, 100),
+    'macd_short_window': (5, 20),
+    'macd_long_window': (21, 100),
+    'macd_signal_window': (5, 30),
+    'bollinger_window': (10, 60),
+    'stoch_k_window': (5, 30),
+    'stoch_smooth_window': (2, 10),
+}
+
+
 def get_trial_params(trial) -> dict:
     """
     Suggest hyperparameters for the trading strategy using Optuna.
@@ -7,22 +21,22 @@ def get_trial_params(trial) -> dict:
         params (dict): A dictionary containing the suggested hyperparameters.
     """
     params = {
-        'rsi_window': trial.suggest_int('rsi_window', 8, 50),
+        'rsi_window': trial.suggest_int('rsi_window', *WINDOW_RANGES['rsi_window']),
         'rsi_lower': trial.suggest_int('rsi_lower', 5, 40),
         'rsi_upper': trial.suggest_int('rsi_upper', 60, 90),
 
-        'ema_short_window': trial.suggest_int('ema_short_window', 5, 20),
-        'ema_long_window': trial.suggest_int('ema_long_window', 21, 100),
+        'ema_short_window': trial.suggest_int('ema_short_window', *WINDOW_RANGES['ema_short_window']),
+        'ema_long_window': trial.suggest_int('ema_long_window', *WINDOW_RANGES['ema_long_window']),
 
-        'macd_short_window': trial.suggest_int('macd_short_window', 5, 20),
-        'macd_long_window': trial.suggest_int('macd_long_window', 21, 100),
-        'macd_signal_window': trial.suggest_int('macd_signal_window', 5, 30),
+        'macd_short_window': trial.suggest_int('macd_short_window', *WINDOW_RANGES['macd_short_window']),
+        'macd_long_window': trial.suggest_int('macd_long_window', *WINDOW_RANGES['macd_long_window']),
+        'macd_signal_window': trial.suggest_int('macd_signal_window', *WINDOW_RANGES['macd_signal_window']),
 
-        'bollinger_window': trial.suggest_int('bollinger_window', 10, 60),
+        'bollinger_window': trial.suggest_int('bollinger_window', *WINDOW_RANGES['bollinger_window']),
         'bollinger_num_std_dev': trial.suggest_float('bollinger_num_std_dev', 0.5, 3.5),
 
-        'stoch_k_window': trial.suggest_int("stoch_k_window", 5, 30),
-        'stoch_smooth_window': trial.suggest_int("stoch_smooth_window", 2, 10),
+        'stoch_k_window': trial.suggest_int("stoch_k_window", *WINDOW_RANGES['stoch_k_window']),
+        'stoch_smooth_window': trial.suggest_int("stoch_smooth_window", *WINDOW_RANGES['stoch_smooth_window']),
         'stoch_lower_threshold': trial.suggest_float("stoch_lower_threshold", 5, 30),
         'stoch_upper_threshold': trial.suggest_float("stoch_upper_threshold", 70, 95),
 
@@ -1,17 +1,12 @@
 import pandas as pd
 
-def clean_split_data(
-        data: pd.DataFrame, train: float, test: float, validation: float
-) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+def clean_data(data: pd.DataFrame) -> pd.DataFrame:
     """
-    Clean the input DataFrame by removing rows with NaN values and fixing Datetime.
+    Clean the raw Binance data by removing rows with NaN values and fixing Datetime.
     Args:
         data (pd.DataFrame): The input data to be cleaned.
-        train (float): Proportion of data to be used for training.
-        test (float): Proportion of data to be used for testing.
-        validation (float): Proportion of data to be used for validation.
     Returns:
-        Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]: The cleaned and split data.
+        pd.DataFrame: The cleaned data sorted by Datetime.
     """
     data = data.copy()
     data[['Date', 'Hour']] = data['Date'].str.split(' ', expand=True)
@@ -22,8 +17,22 @@ def clean_split_data(
     )
     data.drop(columns=['Date', 'Hour', 'Unix'], inplace=True)
     data = data[~data.Datetime.isnull()]
-    data = data.sort_values('Datetime').reset_index(drop=True)
+    return data.sort_values('Datetime').reset_index(drop=True)
 
+
+def split_data(
+        data: pd.DataFrame, train: float, test: float, validation: float
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Split cleaned data chronologically into train, test and validation sets.
+    Args:
+        data (pd.DataFrame): The cleaned data.
+        train (float): Proportion of data to be used for training.
+        test (float): Proportion of data to be used for testing.
+        validation (float): Proportion of data to be used for validation.
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]: The split data.
+    """
     n = len(data)
     train_end = int(n*train)
     test_end = int(n*(1 - validation))
@@ -35,33 +44,20 @@ def clean_split_data(
     return train_data, test_data, validation_data
 
 
-def get_portfolio_value(
-        capital: float, long_positions: list, short_positions:list,
-        current_price: float, commission: float
-) -> float:
+def clean_split_data(
+        data: pd.DataFrame, train: float, test: float, validation: float
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
     """
-    Estimate the portfolio value for graphing purposes.
+    Clean the input DataFrame by removing rows with NaN values and fixing Datetime.
     Args:
-        capital (float): The current capital available.
-        long_positions (list): A list of active long positions.
-        short_positions (list): A list of active short positions.
-        current_price (float): The current market price of the asset.
-        commission (float): Commission
+        data (pd.DataFrame): The input data to be cleaned.
+        train (float): Proportion of data to be used for training.
+        test (float): Proportion of data to be used for testing.
+        validation (float): Proportion of data to be used for validation.
     Returns:
-        float: The total portfolio value.
+        Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]: The cleaned and split data.
     """
-    value = capital
-
-    long_val = sum([
-        pos.quantity * current_price for pos in long_positions
-    ])
-
-    short_val = sum([
-        pos.quantity * (pos.price - current_price) + pos.price * pos.quantity
-        for pos in short_positions
-    ])
-
-    return value + long_val + short_val
+    return split_data(clean_data(data), train, test, validation)
 
 
 def get_returns_table(portfolio_value: list, dates: list) -> dict:
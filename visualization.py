@@ -3,19 +3,34 @@ import matplotlib.ticker as mtick # For formatting y-axis with commas
 import numpy as np
 import seaborn as sns
 import pandas as pd
-sns.set_theme()
 
-plt.rcParams['figure.figsize'] = [14, 8]
-plt.rcParams['axes.titlesize'] = 16
-plt.rcParams['axes.labelsize'] = 13
-plt.rcParams['axes.titleweight'] = 'bold'
-plt.rcParams['axes.labelweight'] = 'bold'
-plt.rcParams['grid.alpha'] = 0.8
-plt.rcParams['grid.linestyle'] = '--'
-plt.rcParams['legend.fontsize'] = 13
-plt.rcParams['legend.loc'] = 'best'
-plt.rcParams['legend.fancybox'] = True
-plt.rcParams['figure.dpi'] = 200
+PLOT_STYLE = {
+    'figure.figsize': [14, 8],
+    'axes.titlesize': 16,
+    'axes.labelsize': 13,
+    'axes.titleweight': 'bold',
+    'axes.labelweight': 'bold',
+    'grid.alpha': 0.8,
+    'grid.linestyle': '--',
+    'legend.fontsize': 13,
+    'legend.loc': 'best',
+    'legend.fancybox': True,
+    'figure.dpi': 200
+}
+_style_applied = False
+
+
+def set_plot_style() -> None:
+    """
+    Apply the seaborn theme and the plot style, once, before the first plot. Importing this
+    module doesn't change the global matplotlib settings.
+    """
+    global _style_applied
+    if _style_applied:
+        return
+    sns.set_theme()
+    plt.rcParams.update(PLOT_STYLE)
+    _style_applied = True
 
 
 # Plot training portfolio value
@@ -30,6 +45,7 @@ def plot_training_portfolio_value(
         train_data: pd.DataFrame: training data
     Returns:
     """
+    set_plot_style()
     plt.figure()
 
     plt.plot(train_data['Datetime'], train_data['Close'] / train_data['Close'].iloc[0] * portfolio_values[0],
@@ -69,6 +85,7 @@ def plot_portfolio_value(
     valid_adjusted = valid_values - valid_values[0] + test_values[-1]
     combined_values = np.concatenate([test_values, valid_adjusted[1:]])
 
+    set_plot_style()
     plt.figure()
 
     plt.plot(test_data['Datetime'], test_data['Close'] / test_data['Close'].iloc[0] * test_values[0],
@@ -0,0 +1,330 @@
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+
+import numpy as np
+import optuna
+import pandas as pd
+from sklearn.model_selection import TimeSeriesSplit
+
+from backtest import prepare_signals, run_backtest_on_signals
+from config import BacktestConfig, OptimizationConfig, WalkForwardConfig
+from indicator_table import IndicatorTable
+from metrics import get_metrics_from_flags
+from optimizer import optimize_hyperparameters, share_data, load_shared_data
+from trade_ledger import get_win_flags
+
+
+def get_walk_forward_windows(
+        n_bars: int, train_bars: int, test_bars: int, anchored: bool = False
+) -> list[tuple[int, int, int]]:
+    """
+    Split a series into walk-forward windows. Each window optimizes on its train bars and
+    trades the test bars right after them; the windows advance by test_bars.
+    Args:
+        n_bars (int): The number of bars of the series.
+        train_bars (int): The number of bars of the first (and, if rolling, every) train window.
+        test_bars (int): The number of out-of-sample bars of each window. The last window
+            may be shorter.
+        anchored (bool): Whether every train window starts at the first bar.
+    Returns:
+        list[tuple[int, int, int]]: The train start, train stop (= test start) and test stop
+            of every window.
+    """
+    windows = []
+    for train_stop in range(train_bars, n_bars, test_bars):
+        train_start = 0 if anchored else train_stop - train_bars
+        windows.append((train_start, train_stop, min(train_stop + test_bars, n_bars)))
+    return windows
+
+
+def _split_tables(
+        table: IndicatorTable, data: pd.DataFrame, start: int, stop: int,
+        optimization_config: OptimizationConfig
+) -> list[IndicatorTable] | None:
+    """
+    Slice the indicator table of the full series into the table the optimizer uses for one
+    train window, when that gives the same indicators as computing them on the window.
+    The slice keeps the warm-up history before start, which the window's own indicators
+    don't have, so it only matches for full history signals on a window starting at the
+    first bar (every window of an anchored walk-forward). Cross-validation splits start
+    their indicators afresh, so no slice of the full series can stand in for them.
+    Args:
+        table (IndicatorTable): The table built on the full series.
+        data (pd.DataFrame): The full price series.
+        start (int): The first bar of the train window.
+        stop (int): The bar after the last one of the train window.
+        optimization_config (OptimizationConfig): Configuration for the optimization process.
+    Returns:
+        list[IndicatorTable] | None: The table of the train window, or None if the window
+            can't reuse the full series table.
+    """
+    if optimization_config.full_history_signals and start == 0:
+        return [table.slice(data, start, stop)]
+    return None
+
+
+def _best_params(study: optuna.study.Study, n: int) -> list[dict]:
+    """
+    Return the parameters of the best complete trials of a study.
+    Args:
+        study (optuna.study.Study): The study.
+        n (int): The number of trials.
+    Returns:
+        list[dict]: The parameters of up to n trials, best first.
+    """
+    trials = study.get_trials(deepcopy=False, states=(optuna.trial.TrialState.COMPLETE,))
+    reverse = study.direction == optuna.study.StudyDirection.MAXIMIZE
+    trials = sorted(trials, key=lambda trial: trial.value, reverse=reverse)
+    return [trial.params for trial in trials[:n]]
+
+
+def _init_window_worker(data_dir: str, table_dir: str | None) -> None:
+    """
+    Load the shared data and the memory-mapped indicator table once per window worker process.
+    Args:
+        data_dir (str): The directory with the shared price data.
+        table_dir (str | None): The directory of the indicator table, or None if the
+            indicators are not precomputed.
+    """
+    data = load_shared_data(data_dir)
+    _window_worker_state['data'] = data
+    _window_worker_state['table'] = (
+        IndicatorTable.build(data, directory=table_dir) if table_dir is not None else None
+    )
+
+
+def _optimize_window(
+        index: int, window: tuple[int, int, int], warm_start_params: list[dict] | None,
+        backtest_config: BacktestConfig, optimization_config: OptimizationConfig,
+        walk_forward_config: WalkForwardConfig, metric: str
+) -> tuple[dict, float, list[dict], dict]:
+    """
+    Optimize the hyperparameters of one walk-forward window on its train bars.
+    Args:
+        index (int): The index of the window, used to name its study.
+        window (tuple[int, int, int]): The train start, train stop and test stop of the window.
+        warm_start_params (list[dict] | None): Parameter sets to enqueue as the first trials.
+        backtest_config (BacktestConfig): Configuration for the backtest.
+        optimization_config (OptimizationConfig): Configuration for the optimization process.
+        walk_forward_config (WalkForwardConfig): Configuration for the walk-forward optimization.
+        metric (str): The performance metric to optimize ('Sharpe', 'Sortino', 'Calmar').
+    Returns:
+        best_params (dict): The best hyperparameters of the window.
+        best_value (float): Their cross-validated metric on the train bars.
+        top_params (list[dict]): The best trials, to warm-start later windows with.
+        trial_summary (dict): The number of trials per state.
+    """
+    data = _window_worker_state['data']
+    table = _window_worker_state['table']
+    train_start, train_stop, _ = window
+    train_data = data.iloc[train_start:train_stop].reset_index(drop=True)
+
+    indicator_tables = None
+    if table is not None and optimization_config.parallel_backend == 'thread':
+        indicator_tables = _split_tables(table, data, train_start, train_stop, optimization_config)
+
+    window_config = replace(optimization_config, study_name=f'{optimization_config.study_name} (window {index})')
+    if indicator_tables is None:
+        # Rebuilding the tables for every window costs more than the window's trials save,
+        # so windows that can't reuse the full series table compute indicators per trial
+        window_config = replace(window_config, precompute_indicators=False)
+
+    study = optimize_hyperparameters(
+        train_data, backtest_config, window_config, metric, indicator_tables, warm_start_params
+    )
+    return (
+        study.best_params, study.best_value,
+        _best_params(study, walk_forward_config.warm_start_trials),
+        study.user_attrs['trial_summary']
+    )
+
+
+# Per-process state of the window workers, filled by _init_window_worker
+_window_worker_state: dict = {}
+
+
+def _window_workers(walk_forward_config: WalkForwardConfig, windows: list) -> int:
+    """
+    Return the number of windows optimized concurrently.
+    Args:
+        walk_forward_config (WalkForwardConfig): Configuration for the walk-forward optimization.
+        windows (list): The walk-forward windows.
+    Returns:
+        int: The number of window workers.
+    """
+    return max(min(walk_forward_config.window_workers, len(windows)), 1)
+
+
+def _table_dir(optimization_config: OptimizationConfig, work_dir: str) -> str:
+    """
+    Return the directory the indicator table of the full series is memory-mapped to when
+    it is shared with window worker processes.
+    Args:
+        optimization_config (OptimizationConfig): Configuration for the optimization process.
+        work_dir (str): The temporary directory of the walk-forward run.
+    Returns:
+        str: indicator_table_dir, or a directory inside work_dir if it is not set.
+    """
+    return optimization_config.indicator_table_dir or os.path.join(work_dir, 'indicators')
+
+
+def _optimize_windows(
+        data: pd.DataFrame, windows: list[tuple[int, int, int]], backtest_config: BacktestConfig,
+        optimization_config: OptimizationConfig, walk_forward_config: WalkForwardConfig,
+        metric: str, table: IndicatorTable | None, work_dir: str
+) -> list[tuple[dict, float, list[dict], dict]]:
+    """
+    Optimize every walk-forward window. With window_workers > 1 the windows run in waves of
+    window_workers concurrent windows, each warm-started from the window at the same position
+    in the previous wave.
+    Args:
+        data (pd.DataFrame): The historical price data.
+        windows (list[tuple[int, int, int]]): The walk-forward windows.
+        backtest_config (BacktestConfig): Configuration for the backtest.
+        optimization_config (OptimizationConfig): Configuration for the optimization process.
+        walk_forward_config (WalkForwardConfig): Configuration for the walk-forward optimization.
+        metric (str): The performance metric to optimize ('Sharpe', 'Sortino', 'Calmar').
+        table (IndicatorTable | None): The indicator table of the full series, if precomputed.
+        work_dir (str): A temporary directory for the data shared with the worker processes.
+    Returns:
+        list[tuple]: The _optimize_window result of every window, in order.
+    """
+    n_workers = _window_workers(walk_forward_config, windows)
+    results = [None] * len(windows)
+
+    def warm_start(index):
+        if walk_forward_config.warm_start_trials <= 0 or index < n_workers:
+            return None
+        return results[index - n_workers][2]
+
+    def run_args(index):
+        return (
+            index, windows[index], warm_start(index), backtest_config, optimization_config,
+            walk_forward_config, metric
+        )
+
+    if n_workers == 1:
+        _window_worker_state['data'] = data
+        _window_worker_state['table'] = table
+        try:
+            for index in range(len(windows)):
+                results[index] = _optimize_window(*run_args(index))
+        finally:
+            _window_worker_state.clear()
+        return results
+
+    share_data(data, work_dir)
+    # The workers memory-map the table from the directory it was written to
+    table_dir = _table_dir(optimization_config, work_dir) if table is not None else None
+    with ProcessPoolExecutor(
+            max_workers=n_workers, initializer=_init_window_worker, initargs=(work_dir, table_dir)
+    ) as executor:
+        for wave_start in range(0, len(windows), n_workers):
+            wave = range(wave_start, min(wave_start + n_workers, len(windows)))
+            futures = [executor.submit(_optimize_window, *run_args(index)) for index in wave]
+            for index, future in zip(wave, futures):
+                results[index] = future.result()
+    return results
+
+
+def walk_forward(
+        data: pd.DataFrame, backtest_config: BacktestConfig,
+        optimization_config: OptimizationConfig, walk_forward_config: WalkForwardConfig,
+        metric: str
+) -> tuple[dict, pd.DataFrame, pd.Series, float, np.ndarray]:
+    """
+    Walk-forward optimization: re-optimize the hyperparameters on a rolling or anchored
+    window, trade the next out-of-sample window with them, and stitch the out-of-sample
+    equity curves together, each window starting with the capital the previous one ended with.
+    With precompute_indicators the indicators are computed once over the full series and
+    every window's out-of-sample signals read them, as they always keep the history before
+    their window. The in-sample optimization reuses them only with full_history_signals on
+    anchored windows with the thread backend, the one case where that matches computing
+    them on the window (see _split_tables); other windows compute their indicators per
+    trial, so precomputing never changes the objective.
+    Args:
+        data (pd.DataFrame): The historical price data.
+        backtest_config (BacktestConfig): Configuration for the backtest.
+        optimization_config (OptimizationConfig): Configuration of each window's optimization.
+            Each window gets its own study, named after study_name and the window index.
+        walk_forward_config (WalkForwardConfig): Configuration for the walk-forward optimization.
+        metric (str): The performance metric to optimize ('Sharpe', 'Sortino', 'Calmar').
+    Returns:
+        metrics (dict): The performance metrics of the stitched out-of-sample equity curve.
+        windows (pd.DataFrame): One row per window with its dates, parameters, in-sample and
+            out-of-sample metric, trades and final capital.
+        portfolio_value (pd.Series): The stitched out-of-sample portfolio value over time.
+        final_capital (float): The capital at the end of the last window.
+        trades (np.ndarray): The out-of-sample trade ledger, with bars indexing the full series.
+    Raises:
+        ValueError: If the data is too short for one window.
+    """
+    data = data.reset_index(drop=True)
+    windows = get_walk_forward_windows(
+        len(data), walk_forward_config.train_bars, walk_forward_config.test_bars,
+        walk_forward_config.anchored
+    )
+    if not windows:
+        raise ValueError(
+            f'The data has {len(data)} bars, not enough for a walk-forward window of '
+            f'{walk_forward_config.train_bars} train bars.'
+        )
+
+    work_dir = tempfile.mkdtemp(prefix='walk_forward_')
+    try:
+        table = None
+        if optimization_config.precompute_indicators:
+            print("\nPrecomputing indicators for the full series...")
+            table_dir = optimization_config.indicator_table_dir
+            if _window_workers(walk_forward_config, windows) > 1:
+                table_dir = _table_dir(optimization_config, work_dir)
+            table = IndicatorTable.build(data, directory=table_dir)
+        results = _optimize_windows(
+            data, windows, backtest_config, optimization_config, walk_forward_config, metric,
+            table, work_dir
+        )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    dates = data['Datetime']
+    capital = float(backtest_config.initial_capital)
+    values, times = [capital], [dates.iloc[windows[0][1] - 1]]
+    ledgers, rows = [], []
+
+    for index, ((train_start, train_stop, test_stop), (params, best_value, _, summary)) in enumerate(
+            zip(windows, results)
+    ):
+        config = replace(backtest_config, initial_capital=capital)
+        history_table = table.slice(data, 0, test_stop) if table is not None else None
+        signals = prepare_signals(data.iloc[:test_stop], config, params, history_table)
+        test_signals = signals.iloc[train_stop:].reset_index(drop=True)
+        metrics, n_long_trades, n_short_trades, portfolio_value, capital, trades = run_backtest_on_signals(
+            test_signals, config, params
+        )
+
+        values.extend(portfolio_value[1:])
+        times.extend(dates.iloc[train_stop:test_stop])
+        trades['entry_bar'] += train_stop
+        trades['exit_bar'] += train_stop
+        ledgers.append(trades)
+        rows.append({
+            'window': index,
+            'train_start': dates.iloc[train_start],
+            'test_start': dates.iloc[train_stop],
+            'test_end': dates.iloc[test_stop - 1],
+            'in_sample': best_value,
+            'out_of_sample': metrics[metric],
+            'n_long_trades': n_long_trades,
+            'n_short_trades': n_short_trades,
+            'final_capital': capital,
+            'params': params,
+            **summary
+        })
+
+    trades = np.concatenate(ledgers)
+    metrics = get_metrics_from_flags(values, *get_win_flags(trades), backtest_config.periods_per_year)
+    portfolio_value = pd.Series(values, index=pd.DatetimeIndex(times, name='Datetime'), name='Value')
+    return metrics, pd.DataFrame(rows), portfolio_value, capital, trades